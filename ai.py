@@ -1,34 +1,15 @@
 
 from flask import Blueprint, request, jsonify
-import os
 import traceback
 import mysql.connector
-from mysql.connector import Error
 from ai_scheduler import AIScheduler
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from database import get_db_connection, notify_events_changed
+from event_aggregates import record_insert
+from day_intervals import parse_duration
+from job_queue import job_handler, submit, job_reply, QueueFull
 
 ai_bp = Blueprint('ai', __name__)
 
-DB_HOST = os.getenv("DB_HOST")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_DATABASE = os.getenv("DB_DATABASE")
-
-def get_db_connection():
-    try:
-        return mysql.connector.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_DATABASE
-        )
-    except Error as e:
-        print(f"❌ DB Connection Error: {e}")
-        return None
-
 @ai_bp.route('/api/<string:user_id>/ai/generate-schedule', methods=['POST'])
 def generate_schedule(user_id):
     
@@ -37,14 +18,28 @@ def generate_schedule(user_id):
     if not prompt:
         return jsonify({'message': 'Prompt is required'}), 400
 
+    # {"async": true} queues the LLM call; poll status_url for the tasks
+    if data.get('async'):
+        try:
+            job_id = submit("generate_schedule", user_id, {"prompt": prompt})
+        except QueueFull as e:
+            return jsonify({'message': str(e)}), 429, {'Retry-After': '5'}
+        except mysql.connector.Error as e:
+            return jsonify({'message': 'Failed to queue schedule generation.', 'error': str(e)}), 500
+        return jsonify(job_reply(job_id, user_id)), 202
+
     try:
         ai_scheduler = AIScheduler()
-        tasks = ai_scheduler.generate_tasks(prompt)
+        tasks = ai_scheduler.generate_tasks(prompt, user_id=user_id)
         return jsonify(tasks), 200
     except Exception as e:
         # Temporarily return detailed error for debugging
         return jsonify({'message': 'Failed to generate tasks from AI.', 'error': str(e), 'error_type': type(e).__name__}), 500
 
+@job_handler("generate_schedule", retry=True)
+def _generate_schedule_job(user_id, payload):
+    return AIScheduler().generate_tasks(payload['prompt'], user_id=user_id)
+
 @ai_bp.route('/api/<string:user_id>/ai/add-task-simple', methods=['POST'])
 def add_ai_task_to_schedule(user_id):
 
@@ -55,6 +50,7 @@ def add_ai_task_to_schedule(user_id):
     date = data.get('date')
     time = data.get('time')
     reminder_setting = data.get('reminder')
+    duration_minutes = parse_duration(data)
 
     if not all([title, description, category, date, time, reminder_setting]):
         return jsonify({'message': 'All task fields are required'}), 400
@@ -68,13 +64,15 @@ def add_ai_task_to_schedule(user_id):
         query = (
             """
             INSERT INTO events 
-            (user_id, title, description, category, date, time, done, reminder_setting)
-            VALUES (%s, %s, %s, %s, %s, %s, FALSE, %s)
+            (user_id, title, description, category, date, time, done, reminder_setting, duration_minutes)
+            VALUES (%s, %s, %s, %s, %s, %s, FALSE, %s, %s)
             """
         )
-        values = (user_id, title, description, category, date, time, reminder_setting)
+        values = (user_id, title, description, category, date, time, reminder_setting, duration_minutes)
         cursor.execute(query, values)
+        record_insert(cursor, user_id, date)
         conn.commit()
+        notify_events_changed(user_id)
         return jsonify({'message': 'Task added to schedule successfully'}), 201
     except mysql.connector.Error as err:
         conn.rollback()
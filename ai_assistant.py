@@ -1,72 +1,42 @@
 import os
 import re
 import json
-from flask import Blueprint, request, jsonify, session
+import time
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
 from dotenv import load_dotenv
 
-# Optional imports
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
-    print("Warning: google.generativeai not available")
-
-try:
-    import cohere
-except ImportError:
-    cohere = None
-    print("Warning: cohere not available")
-
-from database import get_db_connection # Make sure you can import your DB connection
+from database import get_db_connection, db_cursor # Make sure you can import your DB connection
 from mysql.connector import Error
 from datetime import datetime, timedelta
 
-try:
-    from groq import Groq
-except ImportError:
-    Groq = None
-    print("Warning: groq not available")
+from llm_router import generate, chat, chat_stream, LLMUnavailable
+from date_parser import parse_date, parse_time, resolve_event_when
+import date_parser
+from chat_intent import pre_classify, PENDING_DELETE_KEY
+from chat_events import (create_detected_events, detect_and_extract, delete_matching_events, confirm_pending_deletion,
+                         handle_event_deletion, prepare_event_row)
+from job_queue import job_handler, submit, job_reply, QueueFull
+from chat_history import open_conversation, load_window, with_summary, append_turn
+from schedule_context import build_schedule_context
+from event_batch import insert_events
 
 load_dotenv()
 
 ai_assistant_bp = Blueprint('ai_assistant', __name__)
 
-# API configurations
-api_key = os.getenv("GOOGLE_GEMINI_API_KEY")
-cohere_api_key = os.getenv("COHERE_API_KEY")
-groq_api_key = os.getenv("GROQ_API_KEY")
-
-if api_key and genai:
-    genai.configure(api_key=api_key)
-else:
-    print("Warning: GOOGLE_GEMINI_API_KEY not found in .env file or genai not available.")
-
-# Initialize backup AI clients
-co = None
-groq_client = None
-
-if cohere_api_key and cohere:
-    try:
-        co = cohere.Client(cohere_api_key)
-    except Exception as e:
-        print(f"Warning: Failed to initialize Cohere client: {e}")
-        co = None
-else:
-    co = None
-    
-if groq_api_key and Groq:
-    try:
-        groq_client = Groq(api_key=groq_api_key)
-    except Exception as e:
-        print(f"Warning: Failed to initialize Groq client: {e}")
-        groq_client = None
-
 # --- SMART AI EVENT DETECTION AND CREATION ---
 def detect_and_create_events(user_message, user_id):
     """
     Uses AI to intelligently detect if the user message contains events
     and automatically creates them. Only returns JSON when events are found.
+    Returns (created, message, pending): pending holds session values for
+    the caller to store, e.g. an event waiting for conflict confirmation.
     """
+    # Greetings, thanks and general questions don't need an LLM to tell
+    intent, confidence, skip_llm = pre_classify(user_message)
+    if skip_llm:
+        print(f"Pre-classified as {intent} ({confidence:.2f}), skipping AI detection")
+        return False, f"Pre-classified: {intent}", {}
     
     # First, use AI to determine if this message contains events
     today = datetime.now().strftime('%A, %Y-%m-%d')
@@ -104,49 +74,35 @@ def detect_and_create_events(user_message, user_id):
     deletion_keywords = ['delete', 'cancel', 'remove', 'clear']
     has_deletion_keywords = any(keyword in user_message_lower for keyword in deletion_keywords)
     
-    try:
-        # Try Groq first (fastest and most reliable)
-        if groq_client:
-            response = groq_client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[{"role": "user", "content": detection_prompt}],
-                max_tokens=20,
-                temperature=0.1
-            )
-            event_detection_result = response.choices[0].message.content.strip()
-            print(f"Groq detection result: {event_detection_result}")
-    except Exception as groq_error:
-        print(f"Groq detection failed: {groq_error}")
-        
-        try:
-            # Fallback to Cohere
-            if co and not event_detection_result:
-                response = co.chat(
-                    model="command-r-03-2025",
-                    message=detection_prompt,
-                    max_tokens=20,
-                    temperature=0.1
-                )
-                event_detection_result = response.text.strip()
-                print(f"Cohere detection result: {event_detection_result}")
-        except Exception as cohere_error:
-            print(f"Cohere detection failed: {cohere_error}")
-            
+    # Intent and extraction in one round trip; the separate detection and
+    # extraction calls below only run if that reply can't be used.
+    detected = detect_and_extract(user_message)
+    if detected is not None:
+        print(f"Combined detection result: {detected['intent']}")
+        if detected['intent'] == "EVENTS_FOUND":
             try:
-                # Final fallback to Gemini (if working)
-                if api_key and genai and not event_detection_result:
-                    model = genai.GenerativeModel('gemini-pro')
-                    response = model.generate_content(detection_prompt)
-                    event_detection_result = response.text.strip()
-                    print(f"Gemini detection result: {event_detection_result}")
-            except Exception as gemini_error:
-                print(f"All AI detection failed: {gemini_error}")
-                # IMPROVED: If all AI fails but we have deletion keywords, force DELETE_EVENTS
-                if has_deletion_keywords:
-                    event_detection_result = "DELETE_EVENTS"
-                    print("🔄 Forcing DELETE_EVENTS due to deletion keywords")
-                else:
-                    return False, "AI detection services unavailable"
+                return create_detected_events(user_message, user_id, detected['events'])
+            except Exception as e:
+                print(f"Event creation error: {e}")
+                return False, f"Error creating events: {str(e)}", {}
+        if detected['intent'] == "DELETE_EVENTS":
+            return delete_matching_events(user_message, user_id, detected)
+        if has_deletion_keywords:
+            print(f"🔄 Deletion keywords detected in '{user_message}', trying deletion anyway")
+            return handle_event_deletion(user_message, user_id)
+        return False, f"AI determined: {detected['intent']}", {}
+    
+    try:
+        event_detection_result, _ = generate(detection_prompt, max_tokens=20, temperature=0.1, label="Event detection", hedge=True)
+        print(f"Detection result: {event_detection_result}")
+    except LLMUnavailable as e:
+        print(f"All AI detection failed: {e}")
+        # IMPROVED: If all AI fails but we have deletion keywords, force DELETE_EVENTS
+        if has_deletion_keywords:
+            event_detection_result = "DELETE_EVENTS"
+            print("🔄 Forcing DELETE_EVENTS due to deletion keywords")
+        else:
+            return False, "AI detection services unavailable", {}
     
     # IMPROVED: Override AI decision if deletion keywords are clearly present
     if has_deletion_keywords and not event_detection_result:
@@ -159,7 +115,7 @@ def detect_and_create_events(user_message, user_id):
         if has_deletion_keywords:
             print(f"🔄 Deletion keywords detected in '{user_message}', trying deletion anyway")
             return handle_event_deletion(user_message, user_id)
-        return False, f"AI determined: {event_detection_result or 'No clear result'}"
+        return False, f"AI determined: {event_detection_result or 'No clear result'}", {}
     
     # If deletion request detected, handle event deletion
     if "DELETE_EVENTS" in event_detection_result:
@@ -179,46 +135,16 @@ def detect_and_create_events(user_message, user_id):
         1. Title (what is the event)
         2. Description (brief relevant description with context)
         3. Category (from allowed categories only)
-        4. Date (convert relative dates like "tomorrow", "next week" to YYYY-MM-DD format)
-        5. Time (MUST be in HH:MM format, NEVER use "TBD")
-        6. Reminder setting (default "15 minutes" unless specified)
+        4. When: the user's exact words for its day and time, copied verbatim
+           (e.g. "tomorrow at 2pm", "on 7", "friday evening"); "" if none given
+        5. Reminder setting (default "15 minutes" unless specified)
         
         ALLOWED CATEGORIES (choose most appropriate):
         work, home, sports, fun, health, fitness, personal, learning, finance, errands, cleaning, gardening, cooking, pets, meeting, commute, networking, admin, social, entertainment, travel, hobby, volunteering, important, to-do, later, family
         
-        TIME REQUIREMENTS:
-        - ALWAYS provide a time in HH:MM format (e.g. "09:00", "14:30")
-        - NEVER use "TBD", "unknown", or empty time
-        - Default times: morning events "09:00", afternoon "14:00", evening "19:00"
-        - For school/learning events, use "09:00" as default
-        
-        DATE INTERPRETATION EXAMPLES:
-        - Current date: {datetime.now().strftime('%Y-%m-%d')} (September 29, 2025)
-        this is only example
-        - "on 1" → "2025-10-01" (October 1st)
-        - "on 2" → "2025-10-02" (October 2nd)  
-        - "on 5" → "2025-10-05" (October 5th)
-        - "on 7" → "2025-10-07" (October 7th)
-        - "on 15" → "2025-10-15" (October 15th)
-        - "on 25" → "2025-10-25" (October 25th)
-        - "tomorrow" → {(datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')}
-        - "today" → {datetime.now().strftime('%Y-%m-%d')}
-        
-        CRITICAL RULE: Match the EXACT day number from user input!
-        
-        VALIDATION: 
-        - If user says "on 7", the date MUST be "2025-10-07"
-        - If user says "on 15", the date MUST be "2025-10-15"  
-        - NEVER use today's date unless user says "today"
-        - NEVER use "2025-09-29" unless user specifically mentions today
-        
         Rules:
-        - If no date specified, assume today
-        - If no time specified, ALWAYS use "09:00" as default (NEVER use "TBD" or empty time)
+        - Do not convert dates or times; they are resolved from "when" locally
         - Handle multiple events in one message
-        - Convert times like "2pm" to "14:00"
-        - For "on [number]", interpret as that EXACT day number of current/next month
-        - NEVER change the day number: "on 5" = day 5, "on 15" = day 15, etc.
         - Use "meeting" category for meetings, calls, appointments
         - Use "health" for doctor/dentist appointments
         - Use "fitness" for gym/workout activities
@@ -231,8 +157,7 @@ def detect_and_create_events(user_message, user_id):
                     "title": "Event Title",
                     "description": "Detailed description with context",
                     "category": "meeting",
-                    "date": "YYYY-MM-DD",
-                    "time": "HH:MM",
+                    "when": "tomorrow at 2pm",
                     "reminder_setting": "15 minutes"
                 }}
             ]
@@ -243,45 +168,11 @@ def detect_and_create_events(user_message, user_id):
         events_json = None
         
         try:
-            # Try Groq for extraction
-            if groq_client:
-                print(f"[DEBUG] Extraction prompt for '{user_message}':")
-                print(f"[DEBUG] Date interpretation should map 'on 5' to October 5th")
-                response = groq_client.chat.completions.create(
-                    model="llama-3.1-8b-instant",
-                    messages=[{"role": "user", "content": extraction_prompt}],
-                    max_tokens=500,
-                    temperature=0.1
-                )
-                events_json = response.choices[0].message.content.strip()
-                print(f"Groq extraction result: {events_json}")
-        except Exception as groq_error:
-            print(f"Groq extraction failed: {groq_error}")
-            
-            try:
-                # Fallback to Cohere for extraction
-                if co:
-                    response = co.chat(
-                        model="command-r-03-2025",
-                        message=extraction_prompt,
-                        max_tokens=500,
-                        temperature=0.1
-                    )
-                    events_json = response.text.strip()
-                    print(f"Cohere extraction result: {events_json}")
-            except Exception as cohere_error:
-                print(f"Cohere extraction failed: {cohere_error}")
-                
-                try:
-                    # Final fallback to Gemini for extraction
-                    if api_key:
-                        model = genai.GenerativeModel('gemini-pro')
-                        response = model.generate_content(extraction_prompt)
-                        events_json = response.text.strip()
-                        print(f"Gemini extraction result: {events_json}")
-                except Exception as gemini_error:
-                    print(f"All AI extraction failed: {gemini_error}")
-                    return False, "AI extraction services unavailable"
+            events_json, _ = generate(extraction_prompt, max_tokens=500, temperature=0.1, label="Event extraction")
+            print(f"Extraction result: {events_json}")
+        except LLMUnavailable as e:
+            print(f"All AI extraction failed: {e}")
+            return False, "AI extraction services unavailable", {}
         
         # Parse and save events
         if events_json:
@@ -292,581 +183,39 @@ def detect_and_create_events(user_message, user_id):
                 if json_start != -1 and json_end > json_start:
                     clean_json = events_json[json_start:json_end]
                     events_data = json.loads(clean_json)
-                    
-                    if 'events' in events_data and events_data['events']:
-                        # Validate and fix date interpretation
-                        for event in events_data['events']:
-                            # Fix common date interpretation errors
-                            original_date = event.get('date', '')
-                            fixed_date = fix_date_interpretation(user_message, original_date)
-                            if fixed_date != original_date:
-                                print(f"[DATE FIX] Changed {original_date} → {fixed_date} based on '{user_message}'")
-                                event['date'] = fixed_date
-                        
-                        # Check for conflicts before creating events
-                        all_conflicts = []
-                        events_to_create = []
-                        
-                        for event in events_data['events']:
-                            if all(key in event for key in ['title', 'date', 'time']):
-                                # Check for conflicts
-                                conflicts = check_event_conflicts(
-                                    user_id, 
-                                    event['date'], 
-                                    event['time'], 
-                                    event['title']
-                                )
-                                
-                                if conflicts:
-                                    # Store the pending event in session for later confirmation
-                                    from flask import session
-                                    session['pending_event_with_conflict'] = event
-                                    
-                                    # Generate conflict warning
-                                    warning_msg = create_conflict_warning_message(
-                                        conflicts, 
-                                        event['title'], 
-                                        event['date'], 
-                                        event['time']
-                                    )
-                                    return False, warning_msg
-                                else:
-                                    events_to_create.append(event)
-                        
-                        # No conflicts found, create all events
-                        created_count = 0
-                        for event in events_to_create:
-                            if create_event_in_db(user_id, event):
-                                created_count += 1
-                        
-                        if created_count > 0:
-                            return True, f"✅ Successfully created {created_count} event(s) automatically!"
-                        else:
-                            return False, "Failed to save events to database"
-                    else:
-                        return False, "No valid events found in AI response"
+                    return create_detected_events(user_message, user_id, events_data.get('events'))
                 else:
-                    return False, "Could not parse JSON from AI response"
+                    return False, "Could not parse JSON from AI response", {}
                     
             except json.JSONDecodeError as e:
                 print(f"JSON parsing error: {e}")
-                return False, "Invalid JSON format from AI"
+                return False, "Invalid JSON format from AI", {}
             except Exception as e:
                 print(f"Event creation error: {e}")
-                return False, f"Error creating events: {str(e)}"
-    
-    return False, "No events detected by AI"
-
-
-def handle_event_deletion(user_message, user_id):
-    """
-    Handles event deletion requests using AI to identify which events to delete.
-    """
-    today = datetime.now().strftime('%A, %Y-%m-%d')
-    
-    # First, get user's current events to help with deletion
-    current_events = get_user_events_for_deletion(user_id)
-    
-    if not current_events:
-        return False, "No events found to delete"
-    
-    # Create context of current events for AI with ACTUAL database IDs
-    events_context = "Current events:\n"
-    for event in current_events:
-        events_context += f"ID {event['id']}: {event['title']} - {event['date']} at {event['time']}\n"
-    
-    deletion_prompt = f"""
-    You are an AI assistant that identifies which events to delete based on user requests.
-    
-    Today is {today}.
-    Current time: {datetime.now().strftime('%H:%M')}
-    
-    User message: "{user_message}"
-    
-    {events_context}
-    
-    The user wants to delete/cancel events. Based on their message, determine which events should be deleted.
-    
-    IMPORTANT: Use the actual database ID numbers shown above (like "ID 35", "ID 40", etc.)
-    
-    MATCHING RULES:
-    - If user says "delete task" or "delete my task" → match ANY event/task
-    - If user says "delete ai assistance" or "delete ai_assistance" → match events with "ai" or "assistance" in title
-    - If user says "cancel meeting" → match events with "meeting" in title
-    - If user says "remove appointment" → match events with "appointment" in title
-    - If user says "delete all" or "clear schedule" → match ALL events
-    - For partial matches: "cancel gym" matches "Gym workout", "AI assistance", etc.
-    
-    Consider:
-    - Specific titles mentioned (even partial matches)
-    - Time references (today, tomorrow, this week)  
-    - Event types (meeting, appointment, task, etc.)
-    - Partial matches (user says "cancel meeting" matches any event with "meeting" in title)
-    - Generic requests like "delete task" should match available events
-    
-    Respond with ONLY this JSON format using the ACTUAL database IDs:
-    {{
-        "delete_events": [
-            {{
-                "id": actual_database_id_number,
-                "title": "Event Title",
-                "reason": "Why this event matches the deletion request"
-            }}
-        ]
-    }}
-    
-    If no events match the deletion criteria, respond with:
-    {{"delete_events": []}}
-    """
-    
-    # Get AI analysis for which events to delete
-    deletion_analysis = None
-    
-    try:
-        # Try Groq first (fastest and most reliable)
-        if groq_client:
-            response = groq_client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[{"role": "user", "content": deletion_prompt}],
-                max_tokens=500,
-                temperature=0.1
-            )
-            deletion_analysis = response.choices[0].message.content.strip()
-            print(f"Groq deletion analysis: {deletion_analysis}")
-    except Exception as groq_error:
-        print(f"Groq deletion analysis failed: {groq_error}")
-        
-        try:
-            # Fallback to Cohere
-            if co and not deletion_analysis:
-                response = co.chat(
-                    model="command-r-03-2025",
-                    message=deletion_prompt,
-                    max_tokens=500,
-                    temperature=0.1
-                )
-                deletion_analysis = response.text.strip()
-                print(f"Cohere deletion analysis: {deletion_analysis}")
-        except Exception as cohere_error:
-            print(f"Cohere deletion analysis failed: {cohere_error}")
-            
-            try:
-                # Final fallback to Gemini (if working)
-                if api_key and genai and not deletion_analysis:
-                    model = genai.GenerativeModel('gemini-pro')
-                    response = model.generate_content(deletion_prompt)
-                    deletion_analysis = response.text.strip()
-                    print(f"Gemini deletion analysis: {deletion_analysis}")
-            except Exception as gemini_error:
-                print(f"All AI deletion analysis failed: {gemini_error}")
-                return False, "AI deletion analysis services unavailable"
-    
-    # Parse deletion analysis
-    if deletion_analysis:
-        try:
-            # Extract JSON from response with improved parsing
-            json_start = deletion_analysis.find('{')
-            json_end = deletion_analysis.rfind('}') + 1
-            if json_start != -1 and json_end > json_start:
-                clean_json = deletion_analysis[json_start:json_end]
-                
-                # Try to fix common JSON formatting issues
-                clean_json = clean_json.replace('\n', ' ').replace('\t', ' ')
-                # Fix missing commas between objects
-                clean_json = re.sub(r'}\s*{', '}, {', clean_json)
-                # Fix trailing commas
-                clean_json = re.sub(r',\s*}', '}', clean_json)
-                clean_json = re.sub(r',\s*]', ']', clean_json)
-                
-                print(f"Cleaned JSON for parsing: {clean_json[:200]}...")
-                
-                deletion_data = json.loads(clean_json)
-                
-                if 'delete_events' in deletion_data and deletion_data['delete_events']:
-                    deleted_count = 0
-                    deleted_titles = []
-                    
-                    for event_to_delete in deletion_data['delete_events']:
-                        event_id = event_to_delete.get('id')
-                        if event_id and delete_event_from_db(user_id, event_id):
-                            deleted_count += 1
-                            deleted_titles.append(event_to_delete.get('title', 'Unknown'))
-                    
-                    if deleted_count > 0:
-                        titles_text = ', '.join(deleted_titles)
-                        return True, f"✅ Successfully deleted {deleted_count} event(s): {titles_text}"
-                    else:
-                        return False, "Failed to delete events from database"
-                else:
-                    return False, "No matching events found to delete"
-            else:
-                print("No valid JSON structure found in AI response")
-                return False, "AI response format error"
-                    
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error in deletion: {e}")
-            print(f"Raw AI response: {deletion_analysis}")
-            
-            # Fallback: try to extract event IDs using regex
-            try:
-                id_matches = re.findall(r'"id":\s*(\d+)', deletion_analysis)
-                if id_matches:
-                    deleted_count = 0
-                    deleted_titles = []
-                    
-                    for event_id in id_matches[:10]:  # Limit to 10 for safety
-                        try:
-                            if delete_event_from_db(user_id, int(event_id)):
-                                deleted_count += 1
-                                deleted_titles.append(f"Task ID {event_id}")
-                        except Exception as delete_error:
-                            print(f"Failed to delete event ID {event_id}: {delete_error}")
-                            continue
-                    
-                    if deleted_count > 0:
-                        titles_text = ', '.join(deleted_titles)
-                        return True, f"✅ Successfully deleted {deleted_count} event(s): {titles_text}"
-                
-            except Exception as regex_error:
-                print(f"Regex fallback failed: {regex_error}")
-            
-            return False, "Could not parse deletion analysis"
-        except Exception as e:
-            print(f"Event deletion error: {e}")
-            return False, f"Error processing deletion: {str(e)}"
-    
-    return False, "Could not analyze deletion request"
-
-
-def fix_date_interpretation(user_message, ai_date):
-    """
-    Fix common date interpretation errors by the AI
-    Enhanced to handle multiple months and date patterns
-    """
-    import re
-    from datetime import datetime, timedelta
-    
-    current_date = datetime.now()
-    today = current_date.strftime('%Y-%m-%d')
-    current_day = current_date.day
-    current_month = current_date.month
-    
-    # Extract "on X" patterns from user message
-    on_pattern = re.search(r'\bon\s+(\d+)\b', user_message.lower())
-    
-    if on_pattern:
-        day_number = int(on_pattern.group(1))
-        
-        # If AI used today's date but user said "on X", fix it
-        if ai_date == today and day_number != current_day:
-            if 1 <= day_number <= 31:
-                # Determine the target month based on context
-                target_month = current_month
-                target_year = current_date.year
-                
-                from calendar import monthrange
-                current_month_max_day = monthrange(target_year, target_month)[1]
-                
-                # Check if the day makes sense in the current month context
-                if day_number < current_day or day_number > current_month_max_day:
-                    # Move to next month
-                    target_month += 1
-                    if target_month > 12:
-                        target_month = 1
-                        target_year += 1
-                
-                # Ensure day exists in target month
-                max_day_in_month = monthrange(target_year, target_month)[1]
-                
-                if day_number <= max_day_in_month:
-                    return f"{target_year}-{target_month:02d}-{day_number:02d}"
-                else:
-                    # Day doesn't exist in target month, try next month
-                    target_month += 1
-                    if target_month > 12:
-                        target_month = 1
-                        target_year += 1
-                    max_day_in_month = monthrange(target_year, target_month)[1]
-                    if day_number <= max_day_in_month:
-                        return f"{target_year}-{target_month:02d}-{day_number:02d}"
-    
-    # Extract month + day patterns (e.g., "October 7", "Nov 15", "December 25")
-    month_day_pattern = re.search(
-        r'\b(january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+(\d+)\b',
-        user_message.lower()
-    )
-    
-    if month_day_pattern:
-        month_name = month_day_pattern.group(1).lower()
-        day_number = int(month_day_pattern.group(2))
-        
-        # Month name to number mapping
-        month_map = {
-            'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3,
-            'april': 4, 'apr': 4, 'may': 5, 'june': 6, 'jun': 6,
-            'july': 7, 'jul': 7, 'august': 8, 'aug': 8, 'september': 9, 'sep': 9,
-            'october': 10, 'oct': 10, 'november': 11, 'nov': 11, 'december': 12, 'dec': 12
-        }
-        
-        if month_name in month_map:
-            target_month = month_map[month_name]
-            target_year = current_date.year
-            
-            # If the month has passed, use next year
-            if target_month < current_month or (target_month == current_month and day_number < current_day):
-                target_year += 1
-            
-            # Validate day exists in target month
-            from calendar import monthrange
-            max_day_in_month = monthrange(target_year, target_month)[1]
-            
-            if 1 <= day_number <= max_day_in_month:
-                return f"{target_year}-{target_month:02d}-{day_number:02d}"
-    
-    return ai_date
-
-
-def check_event_conflicts(user_id, new_event_date, new_event_time, new_event_title):
-    """
-    Check for potential conflicts with existing events on the same date/time
-    """
-    try:
-        conn = get_db_connection()
-        if not conn:
-            return []
-            
-        cursor = conn.cursor(dictionary=True)
-        
-        # Check for events on the same date
-        query = """
-        SELECT id, title, date, time, category 
-        FROM events 
-        WHERE user_id = %s AND date = %s AND done = FALSE
-        ORDER BY time
-        """
-        
-        cursor.execute(query, (user_id, new_event_date))
-        existing_events = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        conflicts = []
-        
-        if existing_events:
-            # Parse new event time
-            new_hour, new_min = map(int, new_event_time.split(':'))
-            new_minutes_total = new_hour * 60 + new_min
-            
-            for event in existing_events:
-                existing_time = event['time']
-                existing_hour, existing_min = map(int, existing_time.split(':'))
-                existing_minutes_total = existing_hour * 60 + existing_min
-                
-                # Check if times are close (within 2 hours)
-                time_diff = abs(new_minutes_total - existing_minutes_total)
-                
-                if time_diff <= 120:  # Within 2 hours
-                    conflicts.append({
-                        'id': event['id'],
-                        'title': event['title'],
-                        'time': existing_time,
-                        'category': event['category'],
-                        'time_diff_minutes': time_diff
-                    })
-        
-        return conflicts
-        
-    except Exception as e:
-        print(f"Error checking conflicts: {e}")
-        return []
-
-
-def create_conflict_warning_message(conflicts, new_event_title, new_event_date, new_event_time):
-    """
-    Generate a user-friendly conflict warning message
-    """
-    if not conflicts:
-        return None
-        
-    warning = f"⚠️ **SCHEDULING CONFLICT DETECTED**\n\n"
-    warning += f"You want to add: **{new_event_title}** on {new_event_date} at {new_event_time}\n\n"
-    warning += f"But you already have:\n"
+                return False, f"Error creating events: {str(e)}", {}
     
-    for conflict in conflicts:
-        time_diff = conflict['time_diff_minutes']
-        if time_diff == 0:
-            warning += f"• **{conflict['title']}** at {conflict['time']} (EXACT SAME TIME!)\n"
-        elif time_diff <= 30:
-            warning += f"• **{conflict['title']}** at {conflict['time']} (only {time_diff} minutes apart)\n"
-        else:
-            hours = time_diff // 60
-            minutes = time_diff % 60
-            if hours > 0:
-                warning += f"• **{conflict['title']}** at {conflict['time']} ({hours}h {minutes}m apart)\n"
-            else:
-                warning += f"• **{conflict['title']}** at {conflict['time']} ({minutes} minutes apart)\n"
-    
-    warning += f"\n🤔 **Are you sure you want to add this event?**\n"
-    warning += f"Reply 'yes' to confirm or 'no' to cancel."
-    
-    return warning
+    return False, "No events detected by AI", {}
 
 
-def get_user_events_for_deletion(user_id):
-    """Get all user's upcoming events for deletion analysis."""
-    try:
-        conn = get_db_connection()
-        if not conn:
-            return []
-            
-        cursor = conn.cursor()
-        
-        # Get ALL events from today onwards (no limit for deletion analysis)
-        today = datetime.now().strftime('%Y-%m-%d')
-        query = """
-        SELECT id, title, description, date, time, category 
-        FROM events 
-        WHERE user_id = %s AND date >= %s AND done = 0
-        ORDER BY date, time
-        """
-        
-        cursor.execute(query, (user_id, today))
-        events = []
-        
-        for row in cursor.fetchall():
-            events.append({
-                'id': row[0],
-                'title': row[1],
-                'description': row[2],
-                'date': row[3],
-                'time': row[4],
-                'category': row[5]
-            })
-        
-        cursor.close()
-        conn.close()
-        
-        return events
-        
-    except Error as e:
-        print(f"Database error getting events for deletion: {e}")
-        return []
-    except Exception as e:
-        print(f"Error getting events for deletion: {e}")
-        return []
-
-
-def delete_event_from_db(user_id, event_id):
-    """Delete a specific event from the database."""
-    try:
-        conn = get_db_connection()
-        if not conn:
-            return False
-            
-        cursor = conn.cursor()
-        
-        # Delete the event (with user_id check for security)
-        query = "DELETE FROM events WHERE id = %s AND user_id = %s"
-        cursor.execute(query, (event_id, user_id))
-        
-        deleted_rows = cursor.rowcount
-        conn.commit()
-        
-        cursor.close()
-        conn.close()
-        
-        print(f"✅ Deleted event ID {event_id} for user {user_id}")
-        return deleted_rows > 0
-        
-    except Error as e:
-        print(f"Database error deleting event: {e}")
-        if conn:
-            conn.rollback()
-            conn.close()
-        return False
-    except Exception as e:
-        print(f"Error deleting event: {e}")
-        return False
+# Not retried: a rerun could create the same events twice.
+@job_handler("assistant_chat_events")
+def _chat_events_job(user_id, payload):
+    event_created, creation_message, pending = detect_and_create_events(payload['message'], user_id)
+    # The job-status endpoint moves 'pending' into the polling user's session
+    return {"events_created": event_created, "creation_message": creation_message, "pending": pending}
 
 
 def create_event_in_db(user_id, event_data):
     """Helper function to create a single event in the database with exact JSON format."""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False
-            
-        cursor = conn.cursor()
-        
-        # Validate and fix time format
-        event_time = event_data.get('time', '09:00')
-        if event_time == 'TBD' or not event_time or ':' not in event_time:
-            event_time = '09:00'  # Default time
-        
-        # Ensure time is in HH:MM format
-        if len(event_time.split(':')[0]) == 1:
-            event_time = '0' + event_time  # Convert "9:00" to "09:00"
-        
-        event_data['time'] = event_time  # Update the event data
-        
-        # Calculate reminder_datetime based on reminder_setting
-        event_datetime_str = f"{event_data['date']} {event_time}"
-        event_datetime = datetime.strptime(event_datetime_str, '%Y-%m-%d %H:%M')
-        
-        # Parse reminder setting and calculate reminder_datetime
-        reminder_setting = event_data.get('reminder_setting', '15 minutes')
-        reminder_datetime = None
-        
-        if reminder_setting and reminder_setting != "No Reminder":
-            if "minute" in reminder_setting:
-                minutes = int(reminder_setting.split()[0])
-                reminder_datetime = event_datetime - timedelta(minutes=minutes)
-            elif "hour" in reminder_setting:
-                hours = int(reminder_setting.split()[0])
-                reminder_datetime = event_datetime - timedelta(hours=hours)
-            elif "day" in reminder_setting:
-                days = int(reminder_setting.split()[0])
-                reminder_datetime = event_datetime - timedelta(days=days)
-            else:
-                # Default to 15 minutes
-                reminder_datetime = event_datetime - timedelta(minutes=15)
-        
-        # Insert event into database
-        query = """
-        INSERT INTO events (user_id, title, description, category, date, time, done, reminder_setting, reminder_datetime)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        values = (
-            user_id,
-            event_data['title'],
-            event_data.get('description', ''),
-            event_data.get('category', 'personal'),  # Default to personal if not specified
-            event_data['date'],
-            event_data['time'],
-            0,  # done = False (0)
-            reminder_setting,
-            reminder_datetime
-        )
-        
-        cursor.execute(query, values)
-        conn.commit()
-        
-        cursor.close()
-        conn.close()
-        
+        insert_events(user_id, [prepare_event_row(user_id, event_data)])
         print(f"✅ Event created: {event_data['title']} on {event_data['date']} at {event_data['time']}")
         print(f"   Category: {event_data.get('category', 'personal')}")
-        print(f"   Reminder: {reminder_setting} -> {reminder_datetime}")
-        
+        print(f"   Reminder: {event_data.get('reminder_setting', '15 minutes')}")
         return True
         
     except Error as e:
         print(f"Database error creating event: {e}")
-        if conn:
-            conn.rollback()
-            conn.close()
         return False
     except Exception as e:
         print(f"Error creating event: {e}")
@@ -874,85 +223,6 @@ def create_event_in_db(user_id, event_data):
 
 
 # --- PATTERN-BASED FALLBACK FUNCTIONS (Kept for backup) ---
-        try:
-            chat_completion = groq_client.chat.completions.create(
-                messages=[
-                    {"role": "user", "content": extraction_prompt}
-                ],
-                model="llama3-8b-8192",  # Try standard model if available
-                temperature=0.1
-            )
-            response_text = chat_completion.choices[0].message.content.strip()
-            
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                event_details = json.loads(json_match.group())
-        except Exception as e:
-            print(f"Groq extraction failed: {e}")
-            # If Groq fails too, try another model
-            try:
-                chat_completion = groq_client.chat.completions.create(
-                    messages=[
-                        {"role": "user", "content": extraction_prompt}
-                    ],
-                    model="llama-3.1-8b-instant",  # Alternative Groq model
-                    temperature=0.1
-                )
-                response_text = chat_completion.choices[0].message.content.strip()
-                
-                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                if json_match:
-                    event_details = json.loads(json_match.group())
-            except Exception as e2:
-                print(f"Groq alternative model also failed: {e2}")
-    
-    if not event_details or 'events' not in event_details:
-        # PATTERN-BASED FALLBACK: Create events even when AI APIs fail
-        print("AI APIs failed - attempting pattern-based event extraction")
-        event_details = extract_events_with_patterns(user_message)
-        
-        if not event_details or 'events' not in event_details or len(event_details['events']) == 0:
-            return False, "Could not extract event details"
-    
-    # Create all events in the database
-    created_events = []
-    conn = get_db_connection()
-    
-    if not conn:
-        return False, "Database connection failed"
-    
-    try:
-        cursor = conn.cursor()
-        
-        for event in event_details['events']:
-            if all(key in event for key in ['title', 'date', 'time']):
-                query = "INSERT INTO events (user_id, title, description, date, time, done) VALUES (%s, %s, %s, %s, %s, %s)"
-                values = (
-                    user_id,
-                    event['title'],
-                    event.get('description', ''),
-                    event['date'],
-                    event['time'],
-                    0
-                )
-                cursor.execute(query, values)
-                created_events.append(event['title'])
-        
-        conn.commit()
-        
-        if created_events:
-            return True, f"Created {len(created_events)} events: {', '.join(created_events)}"
-        else:
-            return False, "No valid events to create"
-            
-    except Error as e:
-        print(f"Database error creating events: {e}")
-        return False, f"Database error: {e}"
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
-
 def extract_events_with_patterns(user_message):
     """
     Pattern-based event extraction as fallback when AI APIs are unavailable.
@@ -965,25 +235,8 @@ def extract_events_with_patterns(user_message):
     message_lower = user_message.lower()
     
     # Date extraction and parsing
-    today = datetime.now()
-    date_map = {
-        'today': today.strftime('%Y-%m-%d'),
-        'tomorrow': (today + timedelta(days=1)).strftime('%Y-%m-%d'),
-        'monday': get_next_weekday(today, 0).strftime('%Y-%m-%d'),
-        'tuesday': get_next_weekday(today, 1).strftime('%Y-%m-%d'),
-        'wednesday': get_next_weekday(today, 2).strftime('%Y-%m-%d'),
-        'thursday': get_next_weekday(today, 3).strftime('%Y-%m-%d'),
-        'friday': get_next_weekday(today, 4).strftime('%Y-%m-%d'),
-        'saturday': get_next_weekday(today, 5).strftime('%Y-%m-%d'),
-        'sunday': get_next_weekday(today, 6).strftime('%Y-%m-%d'),
-    }
-    
-    # Extract date
-    event_date = today.strftime('%Y-%m-%d')  # Default to today
-    for day_word, day_date in date_map.items():
-        if day_word in message_lower:
-            event_date = day_date
-            break
+    anchor = date_parser.today(None)
+    event_date = (parse_date(message_lower, anchor) or anchor).strftime('%Y-%m-%d')  # Default to today
     
     events = []
     
@@ -1060,26 +313,6 @@ def extract_events_with_patterns(user_message):
     
     return {"events": events} if events else {"events": []}
 
-def parse_time(time_str):
-    """Parse time string and return formatted 24-hour time"""
-    import re
-    
-    time_match = re.search(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)?', time_str.lower())
-    if time_match:
-        hour = int(time_match.group(1))
-        minute = int(time_match.group(2)) if time_match.group(2) else 0
-        period = time_match.group(3)
-        
-        if period == 'pm' and hour != 12:
-            hour += 12
-        elif period == 'am' and hour == 12:
-            hour = 0
-        elif not period and hour < 8:  # Assume PM for times before 8 without AM/PM
-            hour += 12
-            
-        return f"{hour:02d}:{minute:02d}"
-    return None
-
 def clean_title(title):
     """Clean and format the event title"""
     # Remove common filler words
@@ -1106,13 +339,6 @@ def clean_title(title):
     # Otherwise capitalize words
     return ' '.join(word.capitalize() for word in title.split() if word)
 
-def get_next_weekday(current_date, weekday):
-    """Get the next occurrence of a weekday (0=Monday, 6=Sunday)"""
-    days_ahead = weekday - current_date.weekday()
-    if days_ahead <= 0:  # Target day already happened this week
-        days_ahead += 7
-    return current_date + timedelta(days_ahead)
-
 
 @ai_assistant_bp.route("/api/ai/test", methods=['POST'])
 def ai_test_no_auth():
@@ -1129,7 +355,7 @@ def ai_test_no_auth():
         print(f"[DEBUG] Testing message: '{user_message}' for user: {user_id}")
         result = detect_and_create_events(user_message, user_id)
         if isinstance(result, tuple):
-            success, message = result
+            success, message, _ = result
             response_data = {
                 "success": success,
                 "message": message,
@@ -1165,42 +391,14 @@ def ai_test_no_auth():
 
 
 # --- HELPER FUNCTION TO GET SCHEDULE ---
-def _get_user_schedule(user_id):
-    """Fetches all upcoming events from the database."""
-    conn = get_db_connection()
-    if not conn:
-        return "Database connection failed."
-    
+def _get_user_schedule(user_id, user_message=""):
+    """Upcoming events relevant to the message, within the schedule token budget."""
     try:
-        cursor = conn.cursor(dictionary=True)
-        # Get ALL events from today onwards (no date limit)
-        today = datetime.now().strftime('%Y-%m-%d')
-        
-        query = "SELECT title, date, time FROM events WHERE user_id = %s AND date >= %s AND done = FALSE ORDER BY date, time LIMIT 50"
-        cursor.execute(query, (user_id, today))
-        events = cursor.fetchall()
-        
-        if not events:
-            return "The user's schedule is clear."
-            
-        # Format the events into a clean string for the AI
-        schedule_string = "Here is the user's complete schedule:\n"
-        for event in events:
-            schedule_string += f"- On {event['date']} at {event['time']}: {event['title']}\n"
-        
-        # Add count info if we hit the limit
-        if len(events) == 50:
-            schedule_string += "\n(Showing first 50 upcoming events)\n"
-            
-        return schedule_string
-        
+        return build_schedule_context(user_id, user_message)
     except Error as e:
         print(f"Database error fetching schedule: {e}")
         return "Could not retrieve schedule due to a database error."
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+
 
 @ai_assistant_bp.route("/api/ai/debug", methods=['POST'])
 def ai_debug():
@@ -1215,6 +413,33 @@ def ai_debug():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _chat_system_prompt(schedule_context):
+    """System prompt for Scout's chat replies, with the user's current schedule."""
+    return f"""
+        You are Scout, a friendly and professional AI assistant integrated into the HelpScout application.
+        Your goal is to help users organize their work, plan tasks, and manage schedules effectively.
+        
+        IMPORTANT: You have AUTOMATIC event detection enabled. When users mention events naturally in conversation 
+        (like "I have a meeting at 10am and lunch at 1pm tomorrow"), you automatically create them in their calendar.
+        
+        CAPABILITIES:
+        - Handle ALL events and tasks (no time limitations)
+        - Create, delete, and manage events for any date
+        - Process multiple events in a single message
+        - Smart conflict detection and scheduling assistance
+        
+        - Be concise, encouraging, and clear in your responses.
+        - When asked to generate lists, always use markdown bullet points.
+        - Use the current date of {datetime.now().strftime('%A, %Y-%m-%d')} for any time-related questions.
+        - You can handle multiple events in a single message automatically.
+
+        ---
+        CURRENT SCHEDULE:
+        {schedule_context}
+        ---
+        """
+
+
 @ai_assistant_bp.route("/api/ai/chat", methods=['POST'])
 def ai_chat_automatic():
     """
@@ -1232,15 +457,33 @@ def ai_chat_automatic():
         if not user_message or not user_id:
             return jsonify({"error": "No message or user_id provided"}), 400
 
-        # Note: Conflict handling removed for stateless operation
-        
-        # 1. FIRST: Check for automatic event creation (including multiple events)
-        event_created, creation_message = detect_and_create_events(user_message, user_id)
+        # 1. FIRST: Check for automatic event creation (including multiple events).
+        # A "yes" to a pending bulk-delete question runs that delete instead.
+        # With {"async": true} it runs as a job instead; poll events_job.status_url.
+        events_job = None
+        confirmed = confirm_pending_deletion(user_message, user_id)
+        if confirmed:
+            event_created, creation_message = confirmed
+        elif data.get("async"):
+            try:
+                events_job = job_reply(submit("assistant_chat_events", user_id, {"message": user_message}), user_id)
+            except QueueFull as e:
+                return jsonify({"error": str(e)}), 429, {"Retry-After": "5"}
+            event_created, creation_message = False, ""
+        else:
+            event_created, creation_message, pending = detect_and_create_events(user_message, user_id)
+            session.update(pending)
+            if PENDING_DELETE_KEY in pending:
+                # Bulk delete: the ids are in the session until the user confirms
+                return jsonify({
+                    "reply": creation_message,
+                    "events_created": False,
+                    "confirmation_required": True
+                })
         
         # Handle conflict warnings
         if not event_created and "SCHEDULING CONFLICT DETECTED" in creation_message:
-            # This is a conflict warning - we need to store the pending event for user confirmation
-            # For now, just return the conflict message
+            # The conflicting event is in the session, waiting for user confirmation
             return jsonify({
                 "reply": creation_message,
                 "events_created": False,
@@ -1248,119 +491,21 @@ def ai_chat_automatic():
             })
         
         # 2. Get updated schedule after potential event creation
-        schedule_context = _get_user_schedule(user_id)
+        schedule_context = _get_user_schedule(user_id, user_message)
         
-        # 3. Prepare chat history
-        history = session.get('chat_history', [])
-        history.append({'role': 'user', 'parts': [{'text': user_message}]})
+        # 3. Load the conversation (stored server-side; the client keeps only its id)
+        conversation_id, summary = open_conversation(user_id, data.get("conversation_id"))
+        messages = load_window(conversation_id) + [{"role": "user", "content": user_message}]
 
         # 4. Create enhanced system prompt
-        system_prompt = f"""
-        You are Scout, a friendly and professional AI assistant integrated into the HelpScout application.
-        Your goal is to help users organize their work, plan tasks, and manage schedules effectively.
-        
-        IMPORTANT: You have AUTOMATIC event detection enabled. When users mention events naturally in conversation 
-        (like "I have a meeting at 10am and lunch at 1pm tomorrow"), you automatically create them in their calendar.
-        
-        CAPABILITIES:
-        - Handle ALL events and tasks (no time limitations)
-        - Create, delete, and manage events for any date
-        - Process multiple events in a single message
-        - Smart conflict detection and scheduling assistance
-        
-        - Be concise, encouraging, and clear in your responses.
-        - When asked to generate lists, always use markdown bullet points.
-        - Use the current date of {datetime.now().strftime('%A, %Y-%m-%d')} for any time-related questions.
-        - You can handle multiple events in a single message automatically.
-
-        ---
-        CURRENT SCHEDULE:
-        {schedule_context}
-        ---
-        """
-        
-        # 5. Generate AI response with 3-tier fallback (Gemini first)
-        ai_response_text = None
+        system_prompt = with_summary(_chat_system_prompt(schedule_context), summary)
         
-        # Try Gemini first (Google's flagship model)
-        if api_key and genai:
-            try:
-                model = genai.GenerativeModel('gemini-pro')
-                # Note: system_instruction not supported in gemini-pro, will include in prompt
-                chat = model.start_chat(history=history)
-                response = chat.send_message(user_message)
-                ai_response_text = response.text
-                print("✓ Used Gemini API for chat response")
-            except Exception as e:
-                print(f"Gemini API failed: {e}")
-        
-        # Fallback to Cohere if Gemini fails
-        if not ai_response_text and co:
-            try:
-                # Convert history for Cohere
-                cohere_prompt = system_prompt + "\n\nConversation:\n"
-                for msg in history:
-                    if msg['role'] == 'user':
-                        cohere_prompt += f"User: {msg['parts'][0]['text']}\n"
-                    elif msg['role'] == 'model':
-                        cohere_prompt += f"Assistant: {msg['parts'][0]['text']}\n"
-                cohere_prompt += f"User: {user_message}\nAssistant:"
-                
-                response = co.chat(
-                    model="command-r-03-2025",
-                    message=cohere_prompt,
-                    max_tokens=1000,
-                    temperature=0.3
-                )
-                ai_response_text = response.text.strip()
-                print("✓ Used Cohere API (command-r-03-2025) as fallback for chat response")
-            except Exception as e:
-                print(f"Cohere API failed: {e}")
-        
-        # Final fallback to Groq if both fail
-        if not ai_response_text and groq_client:
-            try:
-                # Convert history to Groq format
-                groq_messages = [{"role": "system", "content": system_prompt}]
-                for msg in history:
-                    if msg['role'] == 'user':
-                        groq_messages.append({"role": "user", "content": msg['parts'][0]['text']})
-                    elif msg['role'] == 'model':
-                        groq_messages.append({"role": "assistant", "content": msg['parts'][0]['text']})
-                
-                chat_completion = groq_client.chat.completions.create(
-                    messages=groq_messages,
-                    model="llama-3.1-8b-instant",
-                    temperature=0.3,
-                    max_tokens=1000
-                )
-                ai_response_text = chat_completion.choices[0].message.content
-                print("✓ Used Groq API as final fallback for chat response")
-            except Exception as e:
-                print(f"Groq API failed: {e}")
-        if not ai_response_text and co:
-            try:
-                # Prepare chat history for Cohere
-                cohere_messages = []
-                for msg in history:
-                    if msg['role'] == 'user':
-                        cohere_messages.append({"role": "user", "content": msg['parts'][0]['text']})
-                    elif msg['role'] == 'model':
-                        cohere_messages.append({"role": "assistant", "content": msg['parts'][0]['text']})
-                
-                # Prepare a simple prompt for Cohere
-                full_prompt = f"{system_prompt}\n\nUser: {user_message}\n\nAssistant:"
-                
-                response = co.chat(
-                    model="command-r-03-2025",
-                    message=full_prompt,
-                    max_tokens=1000,
-                    temperature=0.3
-                )
-                ai_response_text = response.text.strip()
-                print("✓ Used Cohere API as final fallback for chat response")
-            except Exception as e:
-                print(f"Cohere API failed: {e}")
+        # 5. Generate AI response through the provider router
+        try:
+            ai_response_text, _ = chat(messages, system=system_prompt, max_tokens=1000, temperature=0.3, label="Chat response")
+        except LLMUnavailable as e:
+            print(f"All AI chat providers failed: {e}")
+            ai_response_text = None
         
         # If all APIs failed
         if not ai_response_text:
@@ -1370,17 +515,116 @@ def ai_chat_automatic():
         if event_created:
             ai_response_text = f"✅ {creation_message}\n\n{ai_response_text}"
 
-        # 7. Update chat history
-        history.append({'role': 'model', 'parts': [{'text': ai_response_text}]})
-        session['chat_history'] = history
-        session.modified = True
+        # 7. Store the turn
+        append_turn(conversation_id, user_id, user_message, ai_response_text)
 
         return jsonify({
             "reply": ai_response_text,
             "events_created": event_created,
-            "creation_message": creation_message if event_created else None
+            "creation_message": creation_message if event_created else None,
+            "events_job": events_job,
+            "conversation_id": conversation_id
         })
 
     except Exception as e:
         print(f"An error occurred in ai_chat_automatic: {e}")
-        return jsonify({"error": "An error occurred while processing your message."}), 500
\ No newline at end of file
+        return jsonify({"error": "An error occurred while processing your message."}), 500
+
+
+def _sse(event, data):
+    """One Server-Sent Events frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@ai_assistant_bp.route("/api/ai/chat/stream", methods=['POST'])
+def ai_chat_stream():
+    """
+    Streaming variant of /api/ai/chat over Server-Sent Events. The stream opens
+    immediately, then sends:
+      event: events  {"events_created", "creation_message", "conflict_detected",
+                      "confirmation_required", "pending"}
+      event: token   {"text"} for each reply chunk, as the provider produces it
+      event: done    {"provider", "reply", "ttfb_ms", "conversation_id"}
+    or event: error {"error"} if no provider could answer.
+    The session can't be written once the stream is open, so a bulk-delete
+    question's "pending" is sent to the client, which passes it back as
+    "pending" with the user's answer.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No JSON data provided"}), 400
+
+    user_id = data.get("user_id")
+    user_message = data.get("message")
+    if not user_message or not user_id:
+        return jsonify({"error": "No message or user_id provided"}), 400
+
+    try:
+        conversation_id, summary = open_conversation(user_id, data.get("conversation_id"))
+        messages = load_window(conversation_id) + [{"role": "user", "content": user_message}]
+    except Error as e:
+        print(f"Could not load chat history: {e}")
+        return jsonify({"error": "An error occurred while processing your message."}), 500
+
+    confirmed = confirm_pending_deletion(user_message, user_id,
+                                          (data.get("pending") or {}).get(PENDING_DELETE_KEY))
+
+    def generate_events():
+        started = time.monotonic()
+        yield ": stream open\n\n"
+        try:
+            if confirmed:
+                event_created, creation_message, pending = (*confirmed, {})
+            else:
+                event_created, creation_message, pending = detect_and_create_events(user_message, user_id)
+        except Exception as e:
+            print(f"Event detection failed in ai_chat_stream: {e}")
+            event_created, creation_message, pending = False, "", {}
+
+        # The session cookie went out with the headers, so pending values
+        # (e.g. the conflicting event) are sent to the client instead
+        conflict = not event_created and "SCHEDULING CONFLICT DETECTED" in creation_message
+        confirmation_required = PENDING_DELETE_KEY in pending
+        yield _sse("events", {
+            "events_created": event_created,
+            "creation_message": creation_message if event_created or conflict or confirmation_required else None,
+            "conflict_detected": conflict,
+            "confirmation_required": confirmation_required,
+            "pending": pending
+        })
+        if conflict or confirmation_required:
+            yield _sse("done", {"provider": None, "reply": creation_message, "ttfb_ms": None,
+                                "conversation_id": conversation_id})
+            return
+
+        system_prompt = with_summary(_chat_system_prompt(_get_user_schedule(user_id, user_message)), summary)
+        parts, provider, ttfb_ms = [], None, None
+        try:
+            for provider, chunk in chat_stream(messages, system=system_prompt, max_tokens=1000,
+                                               temperature=0.3, label="Chat response"):
+                if ttfb_ms is None:
+                    ttfb_ms = round((time.monotonic() - started) * 1000)
+                parts.append(chunk)
+                yield _sse("token", {"text": chunk})
+        except LLMUnavailable as e:
+            print(f"AI chat stream failed: {e}")
+            yield _sse("error", {"error": "All AI services are currently unavailable. Please try again later."})
+            return
+
+        reply = "".join(parts)
+        if event_created:
+            reply = f"✅ {creation_message}\n\n{reply}"
+        print(f"💬 Streamed chat reply via {provider} (first token after {ttfb_ms} ms)")
+        try:
+            append_turn(conversation_id, user_id, user_message, reply)
+        except Error as e:
+            print(f"Could not store streamed chat turn: {e}")
+        yield _sse("done", {"provider": provider, "reply": reply, "ttfb_ms": ttfb_ms,
+                            "conversation_id": conversation_id})
+
+    # Keeps the request context alive for code that reads it while streaming
+    return Response(stream_with_context(generate_events()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+        "X-Conversation-Id": conversation_id
+    })
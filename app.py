@@ -1,4 +1,6 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask.json.provider import DefaultJSONProvider
+from datetime import date, datetime, timedelta
 import os
 import sys
 import traceback
@@ -9,7 +11,7 @@ import os
 from werkzeug.utils import secure_filename
 from bcrypt import hashpw, gensalt, checkpw
 import uuid
-from login_register import auth_bp, init_db
+from login_register import auth_bp
 from collaboration import collaboration_bp
 from ai import ai_bp
 from ai_assistant import ai_assistant_bp
@@ -21,11 +23,41 @@ load_dotenv()
 from home_routes import home_bp
 from tasks import tasks_bp
 from schedule import schedule_bp
+from database import init_db, pool_stats, MigrationError
+from llm_router import router_stats
+from chat_intent import classifier_stats
+from llm_cache import cache_stats
+from jobs import jobs_bp
+from recurring_tasks import recurring_bp
+from job_queue import start_workers, queue_stats
+from schedule_context import context_stats
+from event_aggregates import rebuild_day_summary, repair_user_counters
+import click
+
+
+class APIJSONProvider(DefaultJSONProvider):
+    """
+    Serializes native DATE/TIME/DATETIME columns in the same string formats
+    the API returned when they were stored as VARCHAR.
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, datetime):
+            return o.strftime('%Y-%m-%d %H:%M:%S')
+        if isinstance(o, date):
+            return o.strftime('%Y-%m-%d')
+        if isinstance(o, timedelta):
+            # mysql-connector returns TIME columns as timedelta
+            minutes = int(o.total_seconds()) // 60
+            return f"{minutes // 60:02d}:{minutes % 60:02d}"
+        return DefaultJSONProvider.default(o)
 
 
 # Create the Flask application instance
 app = Flask(__name__)
 app = Flask(__name__, template_folder='../', static_folder='static')
+app.json = APIJSONProvider(app)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', os.urandom(24))
 
 
@@ -40,6 +72,8 @@ app.register_blueprint(ai_scheduler_bp)
 app.register_blueprint(home_bp)
 app.register_blueprint(tasks_bp)
 app.register_blueprint(schedule_bp)
+app.register_blueprint(jobs_bp)
+app.register_blueprint(recurring_bp)
 
 # --- Database and Uploads Configuration ---
 @app.route("/")
@@ -64,7 +98,13 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": os.getenv('BUILD_TIMESTAMP', 'unknown'),
-        "python_version": os.getenv('PYTHON_VERSION', 'unknown')
+        "python_version": os.getenv('PYTHON_VERSION', 'unknown'),
+        "db_pool": pool_stats(),
+        "llm_providers": router_stats(),
+        "intent_classifier": classifier_stats(),
+        "llm_cache": cache_stats(),
+        "job_queue": queue_stats(),
+        "schedule_context": context_stats()
     })
 
 @app.route("/home")
@@ -153,14 +193,32 @@ def handle_exception(e):
     
     return jsonify(payload), status_code
 
+# --- Maintenance commands (flask --app app <command>) ---
+@app.cli.command("rebuild-day-summary")
+@click.option("--user-id", default=None, help="Only rebuild this user's rows.")
+def rebuild_day_summary_command(user_id):
+    """Recompute user_day_summary from the events table (backfill / repair)."""
+    rows = rebuild_day_summary(user_id)
+    print(f"✅ Rebuilt user_day_summary: {rows} day rows")
+
+@app.cli.command("repair-user-counters")
+@click.option("--user-id", default=None, help="Only check this user.")
+def repair_user_counters_command(user_id):
+    """Recompute users.tasks_total/tasks_done from events and fix any drift."""
+    fixed = repair_user_counters(user_id)
+    print(f"✅ Repaired task counters for {fixed} user(s)")
+
 # --- Main entry point ---
 if __name__ == "__main__":
     try:
         init_db()
         print("✅ Database initialized successfully")
+    except MigrationError:
+        raise
     except Exception as e:
         print(f"⚠️ Database initialization failed: {e}")
         print("🚀 Starting server anyway for API testing...")
+    start_workers()
     
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -171,7 +229,11 @@ else:
     try:
         init_db()
         print("✅ Database initialized successfully")
+    except MigrationError:
+        raise
     except Exception as e:
         print(f"⚠️ Database initialization failed: {e}")
         print("🚀 Continuing anyway...")
+    # Job workers are started by gunicorn.conf.py once a server worker has
+    # loaded the app, not here: flask CLI commands import this module too
 
@@ -0,0 +1,414 @@
+import json
+import re
+from datetime import datetime, timedelta
+
+import pytz
+from flask import session
+from mysql.connector import Error
+
+import date_parser
+from chat_intent import (build_combined_prompt, parse_combined_reply, match_delete_targets,
+                         needs_delete_confirmation, delete_confirmation, is_confirmation, PENDING_DELETE_KEY)
+from database import db_cursor, notify_events_changed
+from date_parser import resolve_event_when
+from day_intervals import parse_duration
+from event_aggregates import record_delete
+from event_batch import find_conflicts, insert_events
+from llm_router import generate, LLMUnavailable
+
+# Event creation and deletion for chat messages, shared by the assistant and
+# scheduler blueprints. They differ only in the clock they read: tz_name is
+# None for the assistant (server local time) and 'Asia/Kolkata' for the
+# scheduler, whose prompts then say "IST". Every function returns the
+# (changed, message, pending) triple of detect_and_create_events(); pending
+# holds session values for the caller to store, since job workers have no
+# request context.
+
+
+def _now(tz_name):
+    return datetime.now(pytz.timezone(tz_name)) if tz_name else datetime.now()
+
+
+def _tz_label(now):
+    """' IST' style suffix for prompts and logs, '' for server local time."""
+    label = now.strftime('%Z')
+    return f" {label}" if label else ""
+
+
+def create_detected_events(user_message, user_id, events, tz_name=None):
+    """Resolves dates, checks conflicts and saves the events extracted from a chat message."""
+    if not events:
+        return False, "No valid events found in AI response", {}
+
+    # Resolve each event's date/time from the user's own words
+    anchor = date_parser.today(tz_name)
+    for event in events:
+        resolve_event_when(event, user_message, anchor)
+
+    # Conflicts for every event from one query over all their dates
+    events_to_create = [event for event in events if all(key in event for key in ['title', 'date', 'time'])]
+    for event, conflicts in zip(events_to_create, find_conflicts(user_id, events_to_create)):
+        if conflicts:
+            # The caller keeps the event in its session for confirmation; job
+            # workers have no request context, so nothing is stored here.
+            warning_msg = create_conflict_warning_message(
+                conflicts,
+                event['title'],
+                event['date'],
+                event['time']
+            )
+            return False, warning_msg, {'pending_event_with_conflict': event}
+
+    # No conflicts found, create all events in one transaction
+    rows = []
+    for event in events_to_create:
+        try:
+            rows.append(prepare_event_row(user_id, event))
+        except (ValueError, KeyError) as e:
+            print(f"Skipping event {event.get('title')!r}: {e}")
+    try:
+        created_count = insert_events(user_id, rows)
+    except Error as e:
+        print(f"Database error creating events: {e}")
+        created_count = 0
+
+    if created_count > 0:
+        label = _tz_label(_now(tz_name)).strip()
+        for row in rows:
+            print(f"✅ Event created{f' ({label})' if label else ''}: {row[1]} on {row[4]} at {row[5]}")
+        return True, f"✅ Successfully created {created_count} event(s) automatically!", {}
+    else:
+        return False, "Failed to save events to database", {}
+
+
+def detect_and_extract(user_message, tz_name=None):
+    """
+    One LLM round trip for intent + events / delete targets (see chat_intent.py).
+    Returns the parsed reply, or None if the two-step flow should run instead.
+    """
+    now = _now(tz_name)
+    prompt = build_combined_prompt(user_message, now, _tz_label(now).strip())
+    try:
+        # Parsed by the router, so an unusable reply counts against its provider
+        detected, _ = generate(prompt, max_tokens=600, temperature=0.1, parse=parse_combined_reply,
+                               label="Intent + extraction")
+        return detected
+    except LLMUnavailable as e:
+        print(f"Combined intent detection unavailable, using two-step flow: {e}")
+    return None
+
+
+def delete_matching_events(user_message, user_id, detected, tz_name=None):
+    """Deletes the events named in a combined reply, or asks the AI to pick them if none match."""
+    current_events = get_user_events_for_deletion(user_id, tz_name)
+    if not current_events:
+        return False, "No events found to delete", {}
+
+    matched = match_delete_targets(current_events, detected['delete_targets'], detected['delete_all'])
+    if not matched:
+        return handle_event_deletion(user_message, user_id, tz_name)
+    if needs_delete_confirmation(matched, current_events, detected['delete_all']):
+        question, pending = delete_confirmation(user_id, matched)
+        return False, question, pending
+
+    deleted_titles = [event['title'] for event in matched if delete_event_from_db(user_id, event['id'])]
+    if deleted_titles:
+        return True, f"✅ Successfully deleted {len(deleted_titles)} event(s): {', '.join(deleted_titles)}", {}
+    return False, "Failed to delete events from database", {}
+
+
+def confirm_pending_deletion(user_message, user_id, pending=None):
+    """
+    Runs the bulk delete parked by delete_confirmation() if this message
+    confirms it; any other message drops it. pending is the parked value when
+    it isn't in the session (see the stream endpoint). Returns (deleted,
+    message), or None when there was nothing to confirm.
+    """
+    pending = session.pop(PENDING_DELETE_KEY, None) or pending
+    if not pending or pending.get('user_id') != user_id or not is_confirmation(user_message):
+        return None
+    deleted = [event_id for event_id in pending.get('event_ids', []) if delete_event_from_db(user_id, event_id)]
+    if deleted:
+        return True, f"✅ Successfully deleted {len(deleted)} event(s)"
+    return False, "No events were deleted; they may have been removed already"
+
+
+def handle_event_deletion(user_message, user_id, tz_name=None):
+    """
+    Handles event deletion requests using AI to identify which events to delete.
+    """
+    now = _now(tz_name)
+    today = now.strftime('%A, %Y-%m-%d')
+
+    # First, get user's current events to help with deletion
+    current_events = get_user_events_for_deletion(user_id, tz_name)
+
+    if not current_events:
+        return False, "No events found to delete", {}
+
+    # Create context of current events for AI with ACTUAL database IDs
+    events_context = "Current events:\n"
+    for event in current_events:
+        events_context += f"ID {event['id']}: {event['title']} - {event['date']} at {event['time']}\n"
+
+    deletion_prompt = f"""
+    You are an AI assistant that identifies which events to delete based on user requests.
+
+    Today is {today}.
+    Current time: {now.strftime('%H:%M')}{_tz_label(now)}
+
+    User message: "{user_message}"
+
+    {events_context}
+
+    The user wants to delete/cancel events. Based on their message, determine which events should be deleted.
+
+    IMPORTANT:
+    1. Use the actual database ID numbers shown above (like "ID 35", "ID 40", etc.)
+    2. Return VALID JSON ONLY - no extra text, no markdown formatting
+    3. Each object must have proper comma separation
+
+    Consider:
+    - Specific titles mentioned (even partial matches)
+    - Time references (today, tomorrow, this week)
+    - Event types (meeting, appointment, task, etc.)
+    - Partial matches (user says "cancel meeting" matches any event with "meeting" in title)
+
+    Respond with ONLY this EXACT JSON format using the ACTUAL database IDs:
+    {{
+        "delete_events": [
+            {{
+                "id": actual_database_id_number,
+                "title": "Event Title",
+                "reason": "Why this event matches the deletion request"
+            }}
+        ]
+    }}
+
+    CRITICAL: Return VALID JSON only. No code blocks, no extra text.
+    If no events match the deletion criteria, respond with:
+    {{"delete_events": []}}
+    """
+
+    # Get AI analysis for which events to delete
+    deletion_analysis = None
+
+    try:
+        deletion_analysis, _ = generate(deletion_prompt, max_tokens=500, temperature=0.1, label="Deletion analysis")
+        print(f"Deletion analysis: {deletion_analysis}")
+    except LLMUnavailable as e:
+        print(f"All AI deletion analysis failed: {e}")
+        return False, "AI deletion analysis services unavailable", {}
+
+    if not deletion_analysis:
+        return False, "Could not analyze deletion request", {}
+
+    try:
+        picked_ids = _parse_deletion_ids(deletion_analysis)
+    except ValueError as e:
+        print(f"Deletion analysis unusable: {e}")
+        print(f"Raw AI response: {deletion_analysis}")
+        return False, "Could not parse deletion analysis", {}
+
+    # Only the user's own listed events are deleted, whatever ids the model named
+    picked = [event for event in current_events if str(event['id']) in picked_ids]
+    if not picked:
+        return False, "No matching events found to delete", {}
+    if needs_delete_confirmation(picked, current_events, False):
+        question, pending = delete_confirmation(user_id, picked)
+        return False, question, pending
+
+    deleted_titles = [event['title'] for event in picked if delete_event_from_db(user_id, event['id'])]
+    if deleted_titles:
+        return True, f"✅ Successfully deleted {len(deleted_titles)} event(s): {', '.join(deleted_titles)}", {}
+    return False, "Failed to delete events from database", {}
+
+
+def _parse_deletion_ids(deletion_analysis):
+    """
+    Event ids (as strings) named in a deletion analysis reply. Falls back to
+    scraping "id": N pairs when the JSON is broken. Raises ValueError when
+    the reply names no ids at all in a usable form.
+    """
+    json_start = deletion_analysis.find('{')
+    json_end = deletion_analysis.rfind('}') + 1
+    if json_start == -1 or json_end <= json_start:
+        raise ValueError("no JSON object in reply")
+    clean_json = deletion_analysis[json_start:json_end]
+
+    # Try to fix common JSON formatting issues
+    clean_json = clean_json.replace('\n', ' ').replace('\t', ' ')
+    # Fix missing commas between objects
+    clean_json = re.sub(r'}\s*{', '}, {', clean_json)
+    # Fix trailing commas
+    clean_json = re.sub(r',\s*}', '}', clean_json)
+    clean_json = re.sub(r',\s*]', ']', clean_json)
+
+    try:
+        deletion_data = json.loads(clean_json)
+    except json.JSONDecodeError as e:
+        print(f"JSON parsing error in deletion: {e}")
+        # The scraped ids still go through the picked / confirmation checks
+        id_matches = re.findall(r'"id":\s*(\d+)', deletion_analysis)
+        if not id_matches:
+            raise ValueError(str(e))
+        return set(id_matches)
+
+    if not isinstance(deletion_data, dict) or not isinstance(deletion_data.get('delete_events'), list):
+        raise ValueError("missing delete_events list")
+    return {str(event.get('id')) for event in deletion_data['delete_events'] if isinstance(event, dict)}
+
+
+def check_event_conflicts(user_id, new_event_date, new_event_time, new_event_title, duration_minutes=None):
+    """
+    Check for existing events overlapping the new event's time span
+    """
+    return find_conflicts(user_id, [{'date': new_event_date, 'time': new_event_time, 'title': new_event_title,
+                                     'duration_minutes': duration_minutes}])[0]
+
+
+def create_conflict_warning_message(conflicts, new_event_title, new_event_date, new_event_time):
+    """
+    Generate a user-friendly conflict warning message
+    """
+    if not conflicts:
+        return None
+
+    warning = f"⚠️ **SCHEDULING CONFLICT DETECTED**\n\n"
+    warning += f"You want to add: **{new_event_title}** on {new_event_date} at {new_event_time}\n\n"
+    warning += f"But you already have:\n"
+
+    for conflict in conflicts:
+        span = f"{conflict['time']}-{conflict['end_time']}"
+        if conflict['time_diff_minutes'] == 0:
+            warning += f"• **{conflict['title']}** at {span} (EXACT SAME TIME!)\n"
+        else:
+            overlap = conflict['overlap_minutes']
+            hours = overlap // 60
+            minutes = overlap % 60
+            if hours > 0:
+                warning += f"• **{conflict['title']}** at {span} (overlaps by {hours}h {minutes}m)\n"
+            else:
+                warning += f"• **{conflict['title']}** at {span} (overlaps by {minutes} minutes)\n"
+
+    warning += f"\n🤔 **Are you sure you want to add this event?**\n"
+    warning += f"Reply 'yes' to confirm or 'no' to cancel."
+
+    return warning
+
+
+def get_user_events_for_deletion(user_id, tz_name=None):
+    """Get all user's upcoming events for deletion analysis."""
+    try:
+        with db_cursor() as (conn, cursor):
+            # Get ALL events from today onwards (no limit for deletion analysis)
+            today = date_parser.today(tz_name).strftime('%Y-%m-%d')
+            query = """
+            SELECT id, title, description, DATE_FORMAT(date, '%Y-%m-%d'), TIME_FORMAT(time, '%H:%i'), category
+            FROM events
+            WHERE user_id = %s AND date >= %s AND done = 0
+            ORDER BY date, time
+            """
+
+            cursor.execute(query, (user_id, today))
+            events = []
+
+            for row in cursor.fetchall():
+                events.append({
+                    'id': row[0],
+                    'title': row[1],
+                    'description': row[2],
+                    'date': row[3],
+                    'time': row[4],
+                    'category': row[5]
+                })
+
+        return events
+
+    except Error as e:
+        print(f"Database error getting events for deletion: {e}")
+        return []
+    except Exception as e:
+        print(f"Error getting events for deletion: {e}")
+        return []
+
+
+def delete_event_from_db(user_id, event_id):
+    """Delete a specific event from the database."""
+    try:
+        with db_cursor() as (conn, cursor):
+            # Lock the row so the day summary sees the same date/done we delete
+            cursor.execute("SELECT date, done FROM events WHERE id = %s AND user_id = %s FOR UPDATE", (event_id, user_id))
+            event = cursor.fetchone()
+
+            # Delete the event (with user_id check for security)
+            query = "DELETE FROM events WHERE id = %s AND user_id = %s"
+            cursor.execute(query, (event_id, user_id))
+
+            deleted_rows = cursor.rowcount
+            if event and deleted_rows:
+                record_delete(cursor, user_id, event[0], event[1])
+            conn.commit()
+        notify_events_changed(user_id)
+
+        print(f"✅ Deleted event ID {event_id} for user {user_id}")
+        return deleted_rows > 0
+
+    except Error as e:
+        # Uncommitted work is rolled back when the connection returns to the pool
+        print(f"Database error deleting event: {e}")
+        return False
+    except Exception as e:
+        print(f"Error deleting event: {e}")
+        return False
+
+
+def prepare_event_row(user_id, event_data):
+    """Normalizes event_data['time'] and returns its events row (event_batch.INSERT_EVENT_SQL order)."""
+    # Validate and fix time format
+    event_time = event_data.get('time', '09:00')
+    if event_time == 'TBD' or not event_time or ':' not in event_time:
+        event_time = '09:00'  # Default time
+
+    # Ensure time is in HH:MM format
+    if len(event_time.split(':')[0]) == 1:
+        event_time = '0' + event_time  # Convert "9:00" to "09:00"
+
+    event_data['time'] = event_time  # Update the event data
+
+    # Calculate reminder_datetime based on reminder_setting; events store
+    # wall-clock times, so no timezone is attached
+    event_datetime_str = f"{event_data['date']} {event_time}"
+    event_datetime = datetime.strptime(event_datetime_str, '%Y-%m-%d %H:%M')
+
+    # Parse reminder setting and calculate reminder_datetime
+    reminder_setting = event_data.get('reminder_setting', '15 minutes')
+    reminder_datetime = None
+
+    if reminder_setting and reminder_setting != "No Reminder":
+        if "minute" in reminder_setting:
+            minutes = int(reminder_setting.split()[0])
+            reminder_datetime = event_datetime - timedelta(minutes=minutes)
+        elif "hour" in reminder_setting:
+            hours = int(reminder_setting.split()[0])
+            reminder_datetime = event_datetime - timedelta(hours=hours)
+        elif "day" in reminder_setting:
+            days = int(reminder_setting.split()[0])
+            reminder_datetime = event_datetime - timedelta(days=days)
+        else:
+            # Default to 15 minutes
+            reminder_datetime = event_datetime - timedelta(minutes=15)
+
+    values = (
+        user_id,
+        event_data['title'],
+        event_data.get('description', ''),
+        event_data.get('category', 'personal'),  # Default to personal if not specified
+        event_data['date'],
+        event_data['time'],
+        0,  # done = False (0)
+        reminder_setting,
+        reminder_datetime.strftime('%Y-%m-%d %H:%M:%S') if reminder_datetime else None,
+        parse_duration(event_data)
+    )
+    return values
@@ -0,0 +1,157 @@
+import os
+import uuid
+
+from mysql.connector import Error
+
+from database import db_cursor, DatabaseUnavailable
+from job_queue import job_handler, submit, QueueFull
+from llm_router import generate
+
+# Server-side chat history. Clients keep only a conversation_id; the turns
+# live in chat_messages. Each prompt replays the newest turns that fit in
+# CHAT_HISTORY_TOKEN_BUDGET, plus a rolling summary of everything older.
+# Once a conversation holds more than CHAT_SUMMARY_TRIGGER_TOKENS, a
+# "summarize_conversation" job folds the turns that fell out of the window
+# into the summary and deletes them, so both the prompt and the stored
+# history stay bounded.
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
+SUMMARY_TRIGGER_TOKENS = int(os.getenv("CHAT_SUMMARY_TRIGGER_TOKENS", "2000"))
+SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "300"))
+WINDOW_MAX_MESSAGES = 100
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token); no tokenizer dependency."""
+    return len(text or "") // 4 + 1
+
+
+def open_conversation(user_id, conversation_id=None):
+    """
+    Returns (conversation_id, summary) for the user's conversation, starting
+    a new one if conversation_id is missing or isn't theirs.
+    """
+    with db_cursor() as (conn, cursor):
+        if conversation_id:
+            cursor.execute(
+                "SELECT id, summary FROM chat_conversations WHERE id = %s AND user_id = %s",
+                (conversation_id, user_id)
+            )
+            row = cursor.fetchone()
+            if row:
+                return row[0], row[1]
+        conversation_id = str(uuid.uuid4())
+        cursor.execute(
+            "INSERT INTO chat_conversations (id, user_id) VALUES (%s, %s)",
+            (conversation_id, user_id)
+        )
+        conn.commit()
+    return conversation_id, None
+
+
+def _window(rows, budget):
+    """Splits rows (newest first) into (window, older) by token budget; the newest row always fits."""
+    used = 0
+    for i, row in enumerate(rows):
+        used += row['tokens']
+        if used > budget and i > 0:
+            return rows[:i], rows[i:]
+    return rows, []
+
+
+def load_window(conversation_id, budget=HISTORY_TOKEN_BUDGET):
+    """The newest messages fitting in budget tokens, oldest first, in llm_router format."""
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute("""
+            SELECT role, content, tokens FROM chat_messages
+            WHERE conversation_id = %s ORDER BY id DESC LIMIT %s
+        """, (conversation_id, WINDOW_MAX_MESSAGES))
+        rows = cursor.fetchall()
+    window, _ = _window(rows, budget)
+    return [{"role": row['role'], "content": row['content']} for row in reversed(window)]
+
+
+def with_summary(system_prompt, summary):
+    """Appends the conversation's rolling summary to a system prompt."""
+    if not summary:
+        return system_prompt
+    return f"{system_prompt}\n\nEARLIER IN THIS CONVERSATION (summary):\n{summary}\n"
+
+
+def append_turn(conversation_id, user_id, user_message, reply):
+    """Stores a user message and its reply; queues summarization once the conversation is too long."""
+    with db_cursor() as (conn, cursor):
+        cursor.executemany(
+            "INSERT INTO chat_messages (conversation_id, role, content, tokens) VALUES (%s, %s, %s, %s)",
+            [(conversation_id, "user", user_message, estimate_tokens(user_message)),
+             (conversation_id, "assistant", reply, estimate_tokens(reply))]
+        )
+        cursor.execute("UPDATE chat_conversations SET updated_at = NOW() WHERE id = %s", (conversation_id,))
+        cursor.execute(
+            "SELECT COALESCE(SUM(tokens), 0) FROM chat_messages WHERE conversation_id = %s",
+            (conversation_id,)
+        )
+        total_tokens = int(cursor.fetchone()[0])
+        conn.commit()
+
+    if total_tokens > SUMMARY_TRIGGER_TOKENS:
+        try:
+            submit("summarize_conversation", user_id, {"conversation_id": conversation_id})
+        except (QueueFull, Error, DatabaseUnavailable) as e:
+            # Retried after the next turn; until then older turns are just left out.
+            print(f"⚠️ Could not queue chat summary for {conversation_id}: {e}")
+
+
+@job_handler("summarize_conversation", retry=True)
+def _summarize_conversation_job(user_id, payload):
+    return {"folded_messages": summarize(payload['conversation_id'])}
+
+
+def summarize(conversation_id):
+    """Folds the messages outside the history window into the summary. Returns how many."""
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute("SELECT summary FROM chat_conversations WHERE id = %s", (conversation_id,))
+        conversation = cursor.fetchone()
+        cursor.execute("""
+            SELECT id, role, content, tokens FROM chat_messages
+            WHERE conversation_id = %s ORDER BY id DESC
+        """, (conversation_id,))
+        rows = cursor.fetchall()
+    if not conversation:
+        return 0
+    _, older = _window(rows, HISTORY_TOKEN_BUDGET)
+    if not older:
+        return 0
+
+    previous = conversation['summary']
+    transcript = "\n".join(
+        f"{'User' if row['role'] == 'user' else 'Assistant'}: {row['content']}" for row in reversed(older)
+    )
+    prompt = f"""
+    Update the running summary of a conversation between a user and Scout, their scheduling assistant.
+    Keep facts that matter later: events and tasks discussed, dates, times, preferences and open questions.
+    Write at most {SUMMARY_MAX_TOKENS // 2} words, plain text, no preamble.
+
+    Summary so far:
+    {previous or "(none)"}
+
+    Newer messages:
+    {transcript}
+    """
+    summary, _ = generate(prompt, max_tokens=SUMMARY_MAX_TOKENS, temperature=0.2, label="Chat summary")
+
+    with db_cursor() as (conn, cursor):
+        # Only if no other summary landed meanwhile (<=> is NULL-safe).
+        cursor.execute(
+            "UPDATE chat_conversations SET summary = %s WHERE id = %s AND summary <=> %s",
+            (summary, conversation_id, previous)
+        )
+        if not cursor.rowcount:
+            conn.rollback()
+            return 0
+        cursor.execute(
+            "DELETE FROM chat_messages WHERE conversation_id = %s AND id <= %s",
+            (conversation_id, older[0]['id'])
+        )
+        conn.commit()
+    print(f"🧾 Summarized {len(older)} chat message(s) in conversation {conversation_id}")
+    return len(older)
@@ -0,0 +1,219 @@
+import json
+import os
+import re
+import threading
+
+# Single-call intent detection + extraction for chat messages. One LLM reply
+# carries the intent together with the events to create or the events to
+# delete, replacing the separate detection and extraction round trips. The
+# chat blueprints (through chat_events.py) fall back to the two-step flow
+# whenever parse_combined_reply rejects the reply.
+INTENTS = ("EVENTS_FOUND", "DELETE_EVENTS", "NO_EVENTS", "QUESTION")
+
+# Local pre-classifier. Messages with no event, time, date or deletion cues
+# ("hi", "thanks", general questions) are answered by the chat model without
+# an intent-detection call when the confidence reaches INTENT_SKIP_CONFIDENCE.
+# Anything that might be an event goes to the LLM as before.
+SKIP_CONFIDENCE = float(os.getenv("INTENT_SKIP_CONFIDENCE", "0.8"))
+
+DELETION_KEYWORDS = ['delete', 'cancel', 'remove', 'clear']
+_DELETION_RE = re.compile(r'\b(?:' + '|'.join(DELETION_KEYWORDS) + r')\b')
+# Same time shapes extract_events_with_patterns looks for ("at 5", "2:30 pm")
+_TIME_RE = re.compile(r'\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b|\b\d{1,2}:\d{2}\b|\bat\s+\d{1,2}\b|\b(?:noon|midnight|morning|afternoon|evening|tonight)\b')
+_DATE_RE = re.compile(
+    r'\b(?:today|tomorrow|tonight|yesterday|weekend|next\s+\w+|this\s+(?:week|month)'
+    r'|mon(?:day)?|tue(?:s|sday)?|wed(?:nesday)?|thu(?:rs|rsday)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?'
+    r'|jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t|tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?'
+    r'|on\s+\d{1,2}(?:st|nd|rd|th)?|\d{4}-\d{1,2}-\d{1,2}|\d{1,2}/\d{1,2})\b'
+)
+_EVENT_RE = re.compile(
+    r'\b(?:meeting|meet|appointment|call|lunch|dinner|breakfast|brunch|workout|gym|class|lecture|session|'
+    r'interview|party|event|task|deadline|exam|doctor|dentist|flight|trip|reminder|remind|schedule|'
+    r'book|plan|add|create|calendar|agenda)s?\b'
+)
+_SMALL_TALK_RE = re.compile(
+    r'^(?:hi|hii+|hello|hey|yo|hola|thanks|thank\s+you|thx|ty|ok|okay|k|cool|great|nice|awesome|'
+    r'got\s+it|sure|yes|no|yep|nope|bye|goodbye|good\s+(?:morning|afternoon|evening|night)|'
+    r'how\s+are\s+you)(?:\s+(?:scout|there|so\s+much|a\s+lot))?[\s!.?,:)]*$'
+)
+_QUESTION_RE = re.compile(r'^(?:what|how|why|who|which|can|could|would|should|is|are|do|does|did|will|explain|tell\s+me|help)\b')
+
+_stats = {"messages": 0, "skipped": {"NO_EVENTS": 0, "QUESTION": 0}}
+_stats_lock = threading.Lock()
+
+
+def pre_classify(user_message):
+    """
+    Cheap local guess at a message's intent. Returns (intent, confidence,
+    skip_llm); skip_llm is True only for confident NO_EVENTS / QUESTION.
+    """
+    text = user_message.strip().lower()
+
+    if _DELETION_RE.search(text):
+        intent, confidence = "DELETE_EVENTS", 0.6
+    elif _TIME_RE.search(text) or _DATE_RE.search(text) or _EVENT_RE.search(text):
+        intent, confidence = "EVENTS_FOUND", 0.5
+    elif _SMALL_TALK_RE.match(text):
+        intent, confidence = "NO_EVENTS", 0.95
+    elif _QUESTION_RE.match(text) or text.endswith('?'):
+        intent, confidence = "QUESTION", 0.85
+    elif len(text.split()) <= 3:
+        intent, confidence = "NO_EVENTS", 0.8
+    else:
+        # A statement with no cues; could still describe an event in words.
+        intent, confidence = "NO_EVENTS", 0.6
+
+    skip_llm = intent in ("NO_EVENTS", "QUESTION") and confidence >= SKIP_CONFIDENCE
+    with _stats_lock:
+        _stats["messages"] += 1
+        if skip_llm:
+            _stats["skipped"][intent] += 1
+    return intent, confidence, skip_llm
+
+
+def classifier_stats():
+    """How many chat messages were pre-classified and how many LLM calls that saved."""
+    with _stats_lock:
+        return {
+            "messages": _stats["messages"],
+            "llm_calls_skipped": sum(_stats["skipped"].values()),
+            "skipped": dict(_stats["skipped"]),
+        }
+
+
+def build_combined_prompt(user_message, now, tz_label=""):
+    """Prompt asking for the intent and any events / delete targets as one JSON object."""
+    return f"""
+    You are an AI assistant that reads a chat message and decides whether it creates
+    calendar events, deletes calendar events, or neither - and extracts the details.
+
+    Today is {now.strftime('%A, %Y-%m-%d')}. Current time: {now.strftime('%H:%M')} {tz_label}
+
+    User message: "{user_message}"
+
+    INTENT (exactly one):
+    - "EVENTS_FOUND": the message contains one or more events to schedule
+      (meetings, appointments, calls, lunch, dinner, workouts, classes, etc.)
+    - "DELETE_EVENTS": the message asks to delete/cancel/remove/clear events
+    - "NO_EVENTS": general conversation, or reminders without specific events
+    - "QUESTION": a question or help request
+
+    FOR EVENTS_FOUND, extract every event:
+    - title, and a short description with context
+    - category, one of: work, home, sports, fun, health, fitness, personal, learning, finance, errands, cleaning, gardening, cooking, pets, meeting, commute, networking, admin, social, entertainment, travel, hobby, volunteering, important, to-do, later, family
+      ("meeting" for meetings/calls/appointments, "health" for doctor/dentist, "fitness" for gym, "learning" for school/classes)
+    - when: the user's exact words for this event's day and time, copied verbatim
+      (e.g. "tomorrow at 2pm", "on 7", "next friday evening"); "" if none given.
+      Do not convert them - dates and times are resolved locally.
+    - duration_minutes: how long it lasts, only if the user said so (e.g. "for 2 hours" -> 120), else null
+    - reminder_setting, default "15 minutes"
+
+    FOR DELETE_EVENTS, describe what to delete:
+    - delete_targets: one entry per event mentioned, with the words from its title
+      (e.g. "gym", "team meeting") and its date as YYYY-MM-DD if the user gave one
+    - delete_all: true only for "delete all", "clear my schedule" and the like
+
+    Respond with ONLY this JSON, no markdown:
+    {{
+        "intent": "EVENTS_FOUND",
+        "events": [
+            {{"title": "Event Title", "description": "...", "category": "meeting",
+              "when": "tomorrow at 2pm", "duration_minutes": null, "reminder_setting": "15 minutes"}}
+        ],
+        "delete_targets": [{{"title": "words from the title or null", "date": "YYYY-MM-DD or null"}}],
+        "delete_all": false
+    }}
+    Use empty lists for whatever does not apply to the intent.
+    """
+
+
+def parse_combined_reply(text):
+    """
+    Validates a reply to build_combined_prompt and returns
+    {'intent', 'events', 'delete_targets', 'delete_all'}.
+    Raises ValueError if the reply isn't usable as-is.
+    """
+    json_start = text.find('{')
+    json_end = text.rfind('}') + 1
+    if json_start == -1 or json_end <= json_start:
+        raise ValueError("no JSON object in reply")
+    data = json.loads(text[json_start:json_end])
+
+    intent = str(data.get('intent', '')).strip().upper()
+    if intent not in INTENTS:
+        raise ValueError(f"unknown intent {intent!r}")
+
+    events = data.get('events') or []
+    targets = data.get('delete_targets') or []
+    if not isinstance(events, list) or not isinstance(targets, list):
+        raise ValueError("events/delete_targets must be lists")
+
+    if intent == "EVENTS_FOUND":
+        # Dates and times are resolved from "when" by date_parser.resolve_event_when
+        events = [e for e in events if isinstance(e, dict) and e.get('title')]
+        if not events:
+            raise ValueError("EVENTS_FOUND without usable events")
+
+    return {
+        'intent': intent,
+        'events': events,
+        'delete_targets': [t for t in targets if isinstance(t, dict)],
+        'delete_all': data.get('delete_all') is True,
+    }
+
+
+# A deletion covering all of a user's events - delete_all, or a match that
+# happens to pick every event - is never run on the model's say-so alone.
+# The ids are parked in the session under PENDING_DELETE_KEY with a
+# "delete N events?" question, and deleted only if the next message confirms.
+PENDING_DELETE_KEY = 'pending_delete_event_ids'
+_CONFIRM_RE = re.compile(
+    r'^(?:yes|y|yep|yeah|sure|ok|okay|confirm(?:ed)?|do\s+it|go\s+ahead)'
+    r'(?:[\s,]+(?:please|delete\s+(?:them|all|everything)|confirm(?:ed)?))*[\s!.]*$'
+)
+
+
+def needs_delete_confirmation(matched, current_events, delete_all):
+    """True when deleting matched would be a bulk delete that has to be confirmed first."""
+    return delete_all or (len(matched) > 1 and len(matched) == len(current_events))
+
+
+def delete_confirmation(user_id, events):
+    """(question, pending) for a bulk delete; pending goes into the user's session."""
+    titles = ', '.join(event['title'] for event in events[:5])
+    more = f" and {len(events) - 5} more" if len(events) > 5 else ""
+    question = f"⚠️ Delete {len(events)} events ({titles}{more})? Reply \"yes\" to confirm."
+    return question, {PENDING_DELETE_KEY: {'user_id': user_id, 'event_ids': [event['id'] for event in events]}}
+
+
+def is_confirmation(user_message):
+    """True for a plain "yes" / "confirm" / "go ahead" reply."""
+    return bool(_CONFIRM_RE.match((user_message or '').strip().lower()))
+
+
+def match_delete_targets(current_events, targets, delete_all=False):
+    """
+    Picks the user's events named by delete targets: the target's title words
+    must all appear in the event title, and its date must match if given.
+    Returns the matching events (possibly empty). With delete_all, every
+    event; see needs_delete_confirmation().
+    """
+    if delete_all:
+        return list(current_events)
+
+    matched = []
+    for event in current_events:
+        title = (event.get('title') or '').lower()
+        for target in targets:
+            target_title = (target.get('title') or '').strip().lower()
+            target_date = (target.get('date') or '').strip()
+            if target_title in ('', 'null') and target_date in ('', 'null'):
+                continue
+            words = [w for w in target_title.split() if w != 'null']
+            if words and not all(w in title for w in words):
+                continue
+            if target_date not in ('', 'null') and str(event.get('date')) != target_date:
+                continue
+            matched.append(event)
+            break
+    return matched
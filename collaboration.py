@@ -1,6 +1,12 @@
 from flask import Blueprint, request, jsonify
-from database import get_db_connection
+from database import get_db_connection, notify_events_changed, DatabaseUnavailable
+from month_view import get_month_days
+from event_aggregates import record_insert, record_toggle, record_delete
+from day_intervals import group_free_slots, parse_slot_query, slots_reply
 from mysql.connector import Error
+import os
+
+GROUP_AVAILABILITY_MAX_USERS = int(os.getenv("GROUP_AVAILABILITY_MAX_USERS", "50"))
 
 collaboration_bp = Blueprint('collaboration', __name__)
 
@@ -98,6 +104,41 @@ def remove_collaborator(user_id):
     finally:
         if conn and conn.is_connected(): cursor.close(); conn.close()
 
+@collaboration_bp.route("/api/<user_id>/collaboration/availability")
+def get_group_availability(user_id):
+    """
+    Slots in which the user and the given accepted collaborators
+    (user_ids=a,b,c) are all free. Takes the same start/end, day_start/day_end
+    and min_minutes parameters as /api/<user_id>/schedule/free-slots.
+    """
+    member_ids = list(dict.fromkeys(i.strip() for i in request.args.get('user_ids', '').split(',') if i.strip() and i.strip() != user_id))
+    if not member_ids: return jsonify({"error": "user_ids parameter is required"}), 400
+    if len(member_ids) >= GROUP_AVAILABILITY_MAX_USERS: return jsonify({"error": f"At most {GROUP_AVAILABILITY_MAX_USERS - 1} collaborators at a time"}), 400
+    try:
+        query = parse_slot_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        placeholders = ", ".join(["%s"] * len(member_ids))
+        cursor.execute(f"SELECT IF(inviter_id = %s, invitee_id, inviter_id) FROM collaborations WHERE (inviter_id = %s OR invitee_id = %s) AND status = 'accepted' AND IF(inviter_id = %s, invitee_id, inviter_id) IN ({placeholders})", (user_id, user_id, user_id, user_id, *member_ids))
+        accepted = {row[0] for row in cursor.fetchall()}
+    except Error as e:
+        return jsonify({"error": f"An internal error occurred: {e}"}), 500
+    finally:
+        if conn and conn.is_connected(): cursor.close(); conn.close()
+    not_collaborators = [i for i in member_ids if i not in accepted]
+    if not_collaborators: return jsonify({"error": "Not accepted collaborators", "user_ids": not_collaborators}), 403
+    try:
+        days = group_free_slots([user_id, *member_ids], *query)
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
+    except Error as e:
+        return jsonify({"error": f"An internal error occurred: {e}"}), 500
+    return jsonify(dict(slots_reply(*query, days), user_ids=[user_id, *member_ids])), 200
+
 # --- Task Viewing Endpoints ---
 @collaboration_bp.route("/api/<user_id>/tasks/personal")
 def get_personal_tasks(user_id):
@@ -163,9 +204,11 @@ def create_and_assign_task(user_id):
         event_values = (assignee_id, title, description, category, event_date, event_time, False, 'none', None, False, False, False, False)
         cursor.execute(event_query, event_values)
         new_event_id = cursor.lastrowid
+        record_insert(cursor, assignee_id, event_date)
         assignment_query = "INSERT INTO assigned_tasks (assigner_id, assignee_id, event_id) VALUES (%s, %s, %s)"
         cursor.execute(assignment_query, (assigner_id, assignee_id, new_event_id))
         conn.commit()
+        notify_events_changed(assignee_id)
         return jsonify({"message": "Task created and assigned successfully", "event_id": new_event_id}), 201
     except Error as e:
         if conn and conn.is_connected(): conn.rollback()
@@ -179,10 +222,14 @@ def toggle_task_done(user_id, task_id):
     if not conn: return jsonify({"error": "Database connection failed"}), 500
     try:
         cursor = conn.cursor()
+        cursor.execute("SELECT date, done FROM events WHERE id = %s AND user_id = %s FOR UPDATE", (task_id, user_id))
+        task = cursor.fetchone()
+        if not task: return jsonify({"error": "Task not found or you don't have permission."}), 404
         query = "UPDATE events SET done = NOT done WHERE id = %s AND user_id = %s"
         cursor.execute(query, (task_id, user_id))
-        if cursor.rowcount == 0: return jsonify({"error": "Task not found or you don't have permission."}), 404
+        record_toggle(cursor, user_id, task[0], not task[1])
         conn.commit()
+        notify_events_changed(user_id)
         return jsonify({"message": "Task status updated."}), 200
     except Error as e:
         return jsonify({"error": f"An internal error occurred: {e}"}), 500
@@ -197,7 +244,7 @@ def delete_task(user_id, task_id):
     try:
         cursor = conn.cursor(dictionary=True)
         conn.start_transaction()
-        perm_query = "SELECT e.user_id, at.assigner_id FROM events e LEFT JOIN assigned_tasks at ON e.id = at.event_id WHERE e.id = %s"
+        perm_query = "SELECT e.user_id, e.date, e.done, at.assigner_id FROM events e LEFT JOIN assigned_tasks at ON e.id = at.event_id WHERE e.id = %s FOR UPDATE"
         cursor.execute(perm_query, (task_id,))
         task_info = cursor.fetchone()
         if not task_info: return jsonify({"error": "Task not found."}), 404
@@ -206,7 +253,9 @@ def delete_task(user_id, task_id):
         if not (is_owner or is_assigner): return jsonify({"error": "You do not have permission to delete this task."}), 403
         cursor.execute("DELETE FROM assigned_tasks WHERE event_id = %s", (task_id,))
         cursor.execute("DELETE FROM events WHERE id = %s", (task_id,))
+        record_delete(cursor, task_info['user_id'], task_info['date'], task_info['done'])
         conn.commit()
+        notify_events_changed(task_info['user_id'])
         return jsonify({"message": "Task successfully deleted."}), 200
     except Error as e:
         if conn and conn.is_connected(): conn.rollback()
@@ -227,30 +276,9 @@ def get_events_for_month(user_id):
     if not year or not month:
         return jsonify({"error": "Year and month parameters are required"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
     try:
-        cursor = conn.cursor(dictionary=True)
-        date_pattern = f"{year}-{int(month):02d}-%"
-        cursor.execute("SELECT date, done FROM events WHERE user_id = %s AND date LIKE %s", (user_id, date_pattern))
-        events = cursor.fetchall()
-
-        events_by_day = {}
-        for event in events:
-            day = int(event['date'].split('-')[2])
-            if day not in events_by_day:
-                events_by_day[day] = {'hasPending': False, 'hasCompleted': False}
-            if event['done']:
-                events_by_day[day]['hasCompleted'] = True
-            else:
-                events_by_day[day]['hasPending'] = True
-
-        return jsonify(events_by_day)
+        return jsonify(get_month_days(user_id, year, month))
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
     except Exception as err:
-        return jsonify({"error": str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
\ No newline at end of file
+        return jsonify({"error": str(err)}), 500
\ No newline at end of file
@@ -5,8 +5,19 @@ from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
 
 class Config:
-    DB_HOST = os.getenv("DB_HOST", "database-1.chcyc88wcx2l.eu-north-1.rds.amazonaws.com")
-    DB_USER = os.getenv("DB_USER", "admin")
-    DB_PASSWORD = os.getenv("DB_PASSWORD", "DBpicshot")
-    DB_NAME = os.getenv("DB_NAME", "eventsreminder")
-    USE_PURE = os.getenv("USE_PURE", "True").lower() == "true"
\ No newline at end of file
+    DB_HOST = os.getenv("DB_HOST")
+    DB_USER = os.getenv("DB_USER")
+    DB_PASSWORD = os.getenv("DB_PASSWORD")
+    DB_NAME = os.getenv("DB_DATABASE", os.getenv("DB_NAME"))
+    USE_PURE = os.getenv("USE_PURE", "True").lower() == "true"
+
+    # Connection pool (per gunicorn worker). The default size matches the
+    # 8 request threads each worker runs (see Procfile).
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))              # seconds to wait for a free connection
+    DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))  # recycle connections idle longer than this
+    DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))  # recycle connections older than this
+    DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))       # ping on checkout if idle longer than this
+    # Job worker threads (job_queue.py) get their own pool, so slow AI jobs
+    # never hold the connections request threads need. One per worker thread.
+    DB_JOB_POOL_SIZE = int(os.getenv("DB_JOB_POOL_SIZE", os.getenv("JOB_WORKERS", "4")))
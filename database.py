@@ -1,33 +1,701 @@
 import mysql.connector
+from mysql.connector import Error
 import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
-from dotenv import load_dotenv
+from config import Config
 
-# Load environment variables
-load_dotenv()
-
-# Database configuration details
+# Database configuration details (single source: config.Config)
 DB_CONFIG = {
-    "host": os.getenv("DB_HOST"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "database": os.getenv("DB_DATABASE"),
-    "use_pure": os.getenv("USE_PURE", "True").lower() == "true"
+    "host": Config.DB_HOST,
+    "user": Config.DB_USER,
+    "password": Config.DB_PASSWORD,
+    "database": Config.DB_NAME,
+    "use_pure": Config.USE_PURE
 }
 
+
+class DatabaseUnavailable(Error):
+    """Raised by db_cursor() when no connection could be checked out of the pool."""
+
+
+class MigrationError(Error):
+    """Raised by init_db() when a schema migration fails; the app must not start on a half-migrated schema."""
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the checkout timeout."""
+
+
+class PooledConnection:
+    """
+    Thin wrapper around a pooled MySQL connection.
+    Everything is delegated to the real connection except close(), which
+    hands the connection back to the pool instead of tearing it down.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get('_raw')
+        if raw is None:
+            raise mysql.connector.errors.OperationalError("Connection has been returned to the pool.")
+        return getattr(raw, name)
+
+    def is_connected(self):
+        # Cheap check: the lease is still held. The pool pings on checkout,
+        # so callers don't pay a round trip here on every request.
+        return self._raw is not None
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw, self._created_at)
+
+    def __del__(self):
+        # A handler that forgot to close (or raised before it could) must not
+        # leak a pool slot forever.
+        if self.__dict__.get('_raw') is not None:
+            try:
+                self._pool.note_leak()
+                self.close()
+            except Exception:
+                pass
+
+
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections shared by all request threads of a worker.
+    Connections are health-checked on checkout, recycled when idle or old, and
+    callers wait at most `timeout` seconds for a free slot.
+    """
+
+    def __init__(self, config, size=Config.DB_POOL_SIZE, timeout=Config.DB_POOL_TIMEOUT,
+                 idle_timeout=Config.DB_POOL_IDLE_TIMEOUT, max_lifetime=Config.DB_POOL_MAX_LIFETIME,
+                 ping_after=Config.DB_POOL_PING_AFTER):
+        self.config = config
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+
+        self._idle = deque()  # (raw connection, created_at, last_used)
+        self._in_use = 0
+        self._cond = threading.Condition(threading.RLock())
+        self._stats = {
+            'created': 0,
+            'reused': 0,
+            'recycled': 0,
+            'failed_health_checks': 0,
+            'connect_errors': 0,
+            'timeouts': 0,
+            'waits': 0,
+            'leaked': 0,
+            'total_wait_ms': 0.0,
+        }
+
+    def acquire(self):
+        """Checks out a healthy connection, opening a new one if the pool has room."""
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            entry = self._reserve(deadline)
+
+            if entry is None:
+                # We hold a free slot: open a brand new connection.
+                try:
+                    raw = mysql.connector.connect(**self.config)
+                except Exception:
+                    with self._cond:
+                        self._in_use -= 1
+                        self._stats['connect_errors'] += 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats['created'] += 1
+                print("Database connection successfully created.")
+                return PooledConnection(self, raw, time.monotonic())
+
+            raw, created_at, last_used = entry
+            if time.monotonic() - last_used > self.ping_after and not self._is_healthy(raw):
+                with self._cond:
+                    self._stats['failed_health_checks'] += 1
+                self._discard(raw)
+                continue
+
+            with self._cond:
+                self._stats['reused'] += 1
+            return PooledConnection(self, raw, created_at)
+
+    def _reserve(self, deadline):
+        """
+        Claims a slot. Returns an idle (raw, created_at, last_used) entry to reuse,
+        or None when the caller should open a new connection.
+        """
+        with self._cond:
+            waited_from = None
+            while True:
+                now = time.monotonic()
+                while self._idle:
+                    raw, created_at, last_used = self._idle.pop()  # LIFO keeps the warmest connections busy
+                    if now - last_used > self.idle_timeout or now - created_at > self.max_lifetime:
+                        self._stats['recycled'] += 1
+                        self._close_quietly(raw)
+                        continue
+                    self._in_use += 1
+                    self._record_wait(waited_from)
+                    return raw, created_at, last_used
+
+                if self._in_use < self.size:
+                    self._in_use += 1
+                    self._record_wait(waited_from)
+                    return None
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s (pool size {self.size})")
+                if waited_from is None:
+                    waited_from = now
+                    self._stats['waits'] += 1
+                self._cond.wait(remaining)
+
+    def _record_wait(self, waited_from):
+        if waited_from is not None:
+            self._stats['total_wait_ms'] += (time.monotonic() - waited_from) * 1000
+
+    def release(self, raw, created_at):
+        """Returns a connection to the pool, rolling back anything left uncommitted."""
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            self._discard(raw)
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            if time.monotonic() - created_at > self.max_lifetime:
+                self._stats['recycled'] += 1
+                self._close_quietly(raw)
+            else:
+                self._idle.append((raw, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, raw):
+        self._close_quietly(raw)
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def note_leak(self):
+        with self._cond:
+            self._stats['leaked'] += 1
+
+    @staticmethod
+    def _is_healthy(raw):
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self.size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+            })
+        checkouts = stats['created'] + stats['reused']
+        stats['avg_wait_ms'] = round(stats['total_wait_ms'] / stats['waits'], 2) if stats['waits'] else 0.0
+        stats['reuse_ratio'] = round(stats['reused'] / checkouts, 3) if checkouts else 0.0
+        stats['total_wait_ms'] = round(stats['total_wait_ms'], 2)
+        return stats
+
+
+_pools = {}             # name -> ConnectionPool of this process
+_pool_pid = None
+_pool_lock = threading.Lock()
+_POOL_SIZES = {'requests': Config.DB_POOL_SIZE, 'jobs': Config.DB_JOB_POOL_SIZE}
+_thread_pool = threading.local()
+
+
+def use_pool(name):
+    """Makes the calling thread check its connections out of the named pool ('requests' or 'jobs')."""
+    if name not in _POOL_SIZES:
+        raise ValueError(f"Unknown connection pool {name!r}")
+    _thread_pool.name = name
+
+
+def get_pool(name=None):
+    """
+    Returns this process's connection pool for name (default: the calling
+    thread's, see use_pool()), creating it on first use and again after a fork.
+    """
+    global _pool_pid
+    name = name or getattr(_thread_pool, 'name', 'requests')
+    pid = os.getpid()
+    if _pool_pid != pid or name not in _pools:
+        with _pool_lock:
+            if _pool_pid != pid:
+                _pools.clear()
+                _pool_pid = pid
+            if name not in _pools:
+                _pools[name] = ConnectionPool(DB_CONFIG, size=_POOL_SIZES[name])
+    return _pools[name]
+
+
+def pool_stats():
+    """Snapshot of the request pool counters (and the job pool's, once used) for health checks."""
+    stats = get_pool('requests').stats()
+    if 'jobs' in _pools and _pool_pid == os.getpid():
+        stats['jobs'] = _pools['jobs'].stats()
+    return stats
+
+
 def get_db_connection():
     """
-    Establishes and returns a new database connection.
-    This function is now available to be imported by other modules.
+    Checks out a connection from the shared pool.
+    Calling close() on the returned connection hands it back to the pool.
+    Returns None if the database is unreachable or the pool is exhausted
+    for longer than DB_POOL_TIMEOUT seconds.
     """
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        print("Database connection successfully created.")
-        return conn
+        return get_pool().acquire()
+    except PoolTimeout as e:
+        print(f"Database pool exhausted: {e}")
+        return None
     except mysql.connector.Error as e:
         print(f"Database connection failed: {e}")
         return None
 
+
+@contextmanager
+def db_cursor(dictionary=False):
+    """
+    Checks out a pooled connection and yields (conn, cursor).
+    Both are closed on exit; anything not committed is rolled back when the
+    connection goes back to the pool.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        raise DatabaseUnavailable("Database connection failed")
+    cursor = conn.cursor(dictionary=dictionary)
+    try:
+        yield conn, cursor
+    finally:
+        cursor.close()
+        conn.close()
+
+
+# --- Event Change Notifications ---
+# Caches built from the events table register here and are told whenever a
+# user's events change, so every write path invalidates them the same way.
+_event_listeners = []
+
+
+def on_events_changed(listener):
+    """Registers listener(user_id), called after a user's events are written."""
+    _event_listeners.append(listener)
+    return listener
+
+
+def notify_events_changed(user_id):
+    """Call after committing an insert, update or delete on a user's events."""
+    for listener in _event_listeners:
+        try:
+            listener(user_id)
+        except Exception as e:
+            print(f"⚠️ events-changed listener failed: {e}")
+
+
+# --- Database Initialization ---
+def init_db():
+    try:
+        server_config = {k: v for k, v in DB_CONFIG.items() if k != "database"}
+        conn = mysql.connector.connect(**server_config)
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {Config.DB_NAME}")
+        cursor.close()
+        conn.close()
+
+        with db_cursor() as (conn, cursor):
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id varchar(255) not null UNIQUE,
+                photo_url VARCHAR(255),
+                profile_bio VARCHAR(255) DEFAULT 'Productivity enthusiast and UI/UX designer.',
+                username VARCHAR(255) NOT NULL,
+                email VARCHAR(255) UNIQUE NOT NULL,
+                phone VARCHAR(20) UNIQUE NOT NULL,
+                password VARCHAR(255) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+            # Updated Events Table Schema
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id varchar(255),
+                title VARCHAR(255) NOT NULL,
+                description TEXT,
+                Category VARCHAR(255),
+                date VARCHAR(255) NOT NULL,
+                time VARCHAR(50),
+                done BOOLEAN NOT NULL DEFAULT FALSE,
+                reminder_setting VARCHAR(50),
+                reminder_datetime VARCHAR(255),
+                reminde1 boolean,
+                reminde2 boolean,
+                reminde3 boolean,
+                reminde4 boolean,
+                FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+            )
+            """)
+            conn.commit()
+            run_migrations(conn, cursor)
+        print("✅ DB + Tables ensured.")
+    except MigrationError:
+        raise
+    except Error as e:
+        print(f"❌ DB Init Error: {e}")
+
+
+# --- Schema Migrations ---
+# Each migration runs once, in order, and is recorded in schema_migrations.
+# Append new migrations to MIGRATIONS; never edit one that has shipped.
+# A failed migration raises MigrationError, which stops startup.
+
+# Migrations may be re-run after failing halfway (MySQL commits every DDL
+# statement on its own), so each step checks information_schema first.
+def _column_type(cursor, table, column):
+    """DATA_TYPE of a column ('date', 'varchar', ...), or None if the column doesn't exist."""
+    cursor.execute("""
+        SELECT DATA_TYPE FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return (row[0].decode() if isinstance(row[0], (bytes, bytearray)) else row[0]).lower()
+
+
+def _add_column(cursor, table, column, definition):
+    if _column_type(cursor, table, column) is None:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _create_index(cursor, table, index, columns):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1
+    """, (table, index))
+    if cursor.fetchone() is None:
+        cursor.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+
+
+_LEGACY_DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%d/%m/%Y')
+_LEGACY_TIME_FORMATS = ('%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p', '%I %p', '%I%p')
+
+
+def _parse_legacy(value, formats, output):
+    for fmt in formats:
+        try:
+            return datetime.strptime(value.strip(), fmt).strftime(output)
+        except ValueError:
+            continue
+    return None
+
+
+def _normalise_legacy_column(cursor, column, formats, output):
+    """
+    Rewrites every distinct value of a VARCHAR events column into output
+    format, so the column converts cleanly. Values no format reads are set
+    to NULL and logged with the ids of their rows.
+    """
+    cursor.execute(f"SELECT DISTINCT {column} FROM events WHERE {column} IS NOT NULL")
+    rewrites, unreadable = [], []
+    for (value,) in cursor.fetchall():
+        parsed = _parse_legacy(value, formats, output)
+        if parsed is None:
+            unreadable.append(value)
+        elif parsed != value:
+            rewrites.append((parsed, value))
+    if rewrites:
+        cursor.executemany(f"UPDATE events SET {column} = %s WHERE {column} = %s", rewrites)
+    for value in unreadable:
+        cursor.execute(f"SELECT id FROM events WHERE {column} = %s", (value,))
+        ids = [row[0] for row in cursor.fetchall()]
+        print(f"⚠️ events.{column} {value!r} is unreadable, set to NULL for event id(s) {ids}")
+        cursor.execute(f"UPDATE events SET {column} = NULL WHERE {column} = %s", (value,))
+
+
+def _migrate_events_native_date_time(cursor):
+    # Legacy strings ('2025-10-7', '07/10/2025', '9:30 AM') are rewritten so
+    # they convert cleanly; dates and times nothing can read (e.g. 'TBD' from
+    # older AI fallbacks) become NULL, which is why date stays nullable.
+    if _column_type(cursor, 'events', 'date') != 'date':
+        cursor.execute("ALTER TABLE events MODIFY date VARCHAR(255) NULL")
+        _normalise_legacy_column(cursor, 'date', _LEGACY_DATE_FORMATS, '%Y-%m-%d')
+        cursor.execute("ALTER TABLE events MODIFY date DATE NULL")
+    if _column_type(cursor, 'events', 'time') != 'time':
+        _normalise_legacy_column(cursor, 'time', _LEGACY_TIME_FORMATS, '%H:%M:%S')
+        cursor.execute("ALTER TABLE events MODIFY time TIME NULL")
+    # Serves every per-user date range query (calendar, today view, conflicts)
+    _create_index(cursor, 'events', 'idx_events_user_date_done', 'user_id, date, done')
+
+
+def _migrate_user_day_summary(cursor):
+    # Per-day pending/done counts maintained on write (see event_aggregates.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_day_summary (
+        user_id VARCHAR(255) NOT NULL,
+        day DATE NOT NULL,
+        pending_count INT NOT NULL DEFAULT 0,
+        done_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, day),
+        FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+    )
+    """)
+    cursor.execute("""
+        INSERT INTO user_day_summary (user_id, day, pending_count, done_count)
+        SELECT user_id, date, SUM(done = FALSE), SUM(done = TRUE)
+        FROM events
+        WHERE user_id IS NOT NULL AND date IS NOT NULL
+        GROUP BY user_id, date
+        ON DUPLICATE KEY UPDATE pending_count = VALUES(pending_count), done_count = VALUES(done_count)
+    """)
+
+
+def _migrate_user_task_counters(cursor):
+    # Running task counters for the profile page (see event_aggregates.py)
+    _add_column(cursor, 'users', 'tasks_total', 'INT NOT NULL DEFAULT 0')
+    _add_column(cursor, 'users', 'tasks_done', 'INT NOT NULL DEFAULT 0')
+    cursor.execute("""
+        UPDATE users u
+        JOIN (
+            SELECT user_id, COUNT(*) AS total, SUM(done = TRUE) AS done
+            FROM events WHERE user_id IS NOT NULL GROUP BY user_id
+        ) e ON e.user_id = u.user_id
+        SET u.tasks_total = e.total, u.tasks_done = e.done
+    """)
+
+
+def _migrate_events_reminder_due_index(cursor):
+    # reminder_datetime holds IST wall-clock strings; unparseable values can't
+    # fire anyway. NULL reminde1 (rows from the AI insert paths) means "not sent".
+    if _column_type(cursor, 'events', 'reminder_datetime') != 'datetime':
+        cursor.execute("""
+            UPDATE events SET reminder_datetime = NULL
+            WHERE reminder_datetime IS NOT NULL
+              AND reminder_datetime NOT REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}(:[0-9]{2}([.][0-9]+)?)?$'
+        """)
+        cursor.execute("UPDATE events SET reminde1 = FALSE WHERE reminde1 IS NULL")
+        cursor.execute("""
+            ALTER TABLE events
+                MODIFY reminder_datetime DATETIME NULL,
+                MODIFY reminde1 BOOLEAN NOT NULL DEFAULT FALSE
+        """)
+    # Lets reminders.py range-scan only the unsent reminders near "now"
+    _create_index(cursor, 'events', 'idx_events_reminder_due', 'reminde1, reminder_datetime')
+
+
+def _migrate_events_enhancement_status(cursor):
+    # NULL = inserted without AI enhancement (every row that predates this).
+    _add_column(cursor, 'events', 'enhancement_status', 'VARCHAR(16) NULL')
+
+
+def _migrate_jobs_table(cursor):
+    # Durable queue for AI work (see job_queue.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS jobs (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        kind VARCHAR(64) NOT NULL,
+        user_id VARCHAR(255),
+        status VARCHAR(16) NOT NULL DEFAULT 'queued',
+        payload TEXT NOT NULL,
+        result MEDIUMTEXT NULL,
+        error TEXT NULL,
+        attempts INT NOT NULL DEFAULT 0,
+        max_attempts INT NOT NULL DEFAULT 1,
+        worker VARCHAR(64) NULL,
+        created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        started_at DATETIME NULL,
+        finished_at DATETIME NULL,
+        INDEX idx_jobs_status (status, id)
+    )
+    """)
+
+
+def _migrate_chat_history(cursor):
+    # Server-side chat history (see chat_history.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS chat_conversations (
+        id VARCHAR(36) PRIMARY KEY,
+        user_id VARCHAR(255) NOT NULL,
+        summary TEXT NULL,
+        created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        INDEX idx_chat_conversations_user (user_id, updated_at)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS chat_messages (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        conversation_id VARCHAR(36) NOT NULL,
+        role VARCHAR(16) NOT NULL,
+        content TEXT NOT NULL,
+        tokens INT NOT NULL,
+        created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_chat_messages_conversation (conversation_id, id),
+        FOREIGN KEY (conversation_id) REFERENCES chat_conversations(id) ON DELETE CASCADE
+    )
+    """)
+
+
+def _migrate_events_duration(cursor):
+    # NULL = no duration given; conflict checks assume EVENT_DEFAULT_DURATION_MINUTES
+    _add_column(cursor, 'events', 'duration_minutes', 'SMALLINT UNSIGNED NULL')
+
+
+def _migrate_event_series(cursor):
+    # Recurring events stored once per series, expanded on read (see recurrence.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS event_series (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        user_id VARCHAR(255) NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        description TEXT NULL,
+        category VARCHAR(64) NULL,
+        start_date DATE NOT NULL,
+        time TIME NULL,
+        duration_minutes SMALLINT UNSIGNED NULL,
+        rrule VARCHAR(255) NOT NULL,
+        until_date DATE NULL,
+        reminder_setting VARCHAR(32) NULL,
+        reminders_sent_until DATETIME NULL,
+        created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_event_series_user (user_id, start_date),
+        INDEX idx_event_series_until (until_date)
+    )
+    """)
+    # Sparse: only occurrences marked done or cancelled have a row
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS event_series_overrides (
+        series_id BIGINT NOT NULL,
+        occurrence_date DATE NOT NULL,
+        done BOOLEAN NOT NULL DEFAULT FALSE,
+        cancelled BOOLEAN NOT NULL DEFAULT FALSE,
+        PRIMARY KEY (series_id, occurrence_date),
+        FOREIGN KEY (series_id) REFERENCES event_series(id) ON DELETE CASCADE
+    )
+    """)
+
+
+def _migrate_event_series_next_reminder(cursor):
+    # Fire time of each series' next reminder, range-scanned by reminders.py.
+    # Backfilled from reminders_sent_until, which it replaces.
+    from recurrence import parse_rrule, next_reminder_at
+    _add_column(cursor, 'event_series', 'next_reminder_at', 'DATETIME NULL')
+    _create_index(cursor, 'event_series', 'idx_event_series_next_reminder', 'next_reminder_at')
+    if _column_type(cursor, 'event_series', 'reminders_sent_until') is None:
+        return
+    cursor.execute("""
+        SELECT id, start_date, until_date, rrule, TIME_TO_SEC(time) DIV 60, reminder_setting, reminders_sent_until
+        FROM event_series WHERE reminder_setting IS NOT NULL AND time IS NOT NULL
+    """)
+    updates = []
+    for series_id, start_date, until_date, rrule, start_minute, reminder_setting, sent_until in cursor.fetchall():
+        try:
+            rule = parse_rrule(rrule)
+        except ValueError:
+            continue
+        fire_at = next_reminder_at({'rule': rule, 'start_date': start_date, 'until_date': until_date,
+                                    'start_minute': start_minute, 'reminder_setting': reminder_setting}, sent_until)
+        if fire_at is not None:
+            updates.append((fire_at, series_id))
+    if updates:
+        cursor.executemany("UPDATE event_series SET next_reminder_at = %s WHERE id = %s", updates)
+    cursor.execute("ALTER TABLE event_series DROP COLUMN reminders_sent_until")
+
+
+MIGRATIONS = [
+    (1, "events.date/time as native DATE/TIME + (user_id, date, done) index", _migrate_events_native_date_time),
+    (2, "user_day_summary table, backfilled from events", _migrate_user_day_summary),
+    (3, "users.tasks_total/tasks_done counters, backfilled from events", _migrate_user_task_counters),
+    (4, "events.reminder_datetime as DATETIME + (reminde1, reminder_datetime) index", _migrate_events_reminder_due_index),
+    (5, "events.enhancement_status for background AI enhancement", _migrate_events_enhancement_status),
+    (6, "jobs table for queued AI work", _migrate_jobs_table),
+    (7, "chat_conversations / chat_messages for server-side chat history", _migrate_chat_history),
+    (8, "events.duration_minutes for interval conflict checks", _migrate_events_duration),
+    (9, "event_series / event_series_overrides for recurring events", _migrate_event_series),
+    (10, "event_series.next_reminder_at + index, replacing reminders_sent_until", _migrate_event_series_next_reminder),
+]
+
+
+def run_migrations(conn, cursor):
+    """Applies pending schema migrations. Safe to call from several workers at once."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        description VARCHAR(255),
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    # Gunicorn workers all call init_db() on boot; only one may migrate.
+    cursor.execute("SELECT GET_LOCK('schema_migrations', 60)")
+    if not cursor.fetchone()[0]:
+        raise Error("Timed out waiting for the schema migration lock")
+    try:
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+        for version, description, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            print(f"⏳ Applying migration {version}: {description}")
+            try:
+                migrate(cursor)
+            except Error as e:
+                print(f"❌ Migration {version} failed: {e}")
+                raise MigrationError(f"Migration {version} ({description}) failed: {e}") from e
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+            conn.commit()
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK('schema_migrations')")
+        cursor.fetchone()
+
+
+# --- Query Helpers ---
+def month_bounds(year, month):
+    """
+    Returns ('YYYY-MM-01', first day of the next month) for a month.
+    Use as `date >= %s AND date < %s` so the (user_id, date, done) index is used.
+    """
+    year, month = int(year), int(month)
+    start = f"{year:04d}-{month:02d}-01"
+    end = f"{year + 1:04d}-01-01" if month == 12 else f"{year:04d}-{month + 1:02d}-01"
+    return start, end
+
 class Database:
     def __init__(self):
         self.connection = get_db_connection()
@@ -67,8 +735,11 @@ class Database:
         )
         
         try:
+            from event_aggregates import record_insert
             cursor.execute(query, values)
+            record_insert(cursor, user_id, date)
             self.connection.commit()
+            notify_events_changed(user_id)
             return cursor.lastrowid
         except Exception as e:
             self.connection.rollback()
@@ -0,0 +1,310 @@
+import re
+import time
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+import pytz
+
+# Deterministic natural-language date/time parsing for chat-created events.
+# The LLM only has to copy the words that say *when* ("next friday at 3pm",
+# "on 7", "oct 15th"); resolving them to a date and time happens here, with
+# patterns compiled once at import. Every function takes an explicit anchor
+# date (defaulting to today()) so results are reproducible and the parser can be benchmarked on its own:
+#
+#     python date_parser.py
+DEFAULT_TZ = "Asia/Kolkata"
+
+MONTHS = {
+    'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3,
+    'april': 4, 'apr': 4, 'may': 5, 'june': 6, 'jun': 6, 'july': 7, 'jul': 7,
+    'august': 8, 'aug': 8, 'september': 9, 'sept': 9, 'sep': 9,
+    'october': 10, 'oct': 10, 'november': 11, 'nov': 11, 'december': 12, 'dec': 12,
+}
+WEEKDAYS = {
+    'monday': 0, 'mon': 0, 'tuesday': 1, 'tues': 1, 'tue': 1,
+    'wednesday': 2, 'wed': 2, 'thursday': 3, 'thurs': 3, 'thur': 3, 'thu': 3,
+    'friday': 4, 'fri': 4, 'saturday': 5, 'sat': 5, 'sunday': 6, 'sun': 6,
+}
+RELATIVE_DAYS = {
+    'day after tomorrow': 2, 'today': 0, 'tonight': 0,
+    'tomorrow': 1, 'tmrw': 1, 'tmr': 1, 'yesterday': -1,
+}
+NUMBER_WORDS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5}
+PART_OF_DAY_TIMES = {'morning': '09:00', 'afternoon': '14:00', 'evening': '19:00', 'tonight': '19:00', 'night': '20:00'}
+
+_MONTH_ALT = '|'.join(sorted(MONTHS, key=len, reverse=True))
+_WEEKDAY_ALT = '|'.join(sorted(WEEKDAYS, key=len, reverse=True))
+_ORD = r'(?:st|nd|rd|th)?'
+
+_ISO_RE = re.compile(r'\b(\d{4})-(\d{1,2})-(\d{1,2})\b')
+_MONTH_DAY_RE = re.compile(rf'\b({_MONTH_ALT})\.?\s+(\d{{1,2}}){_ORD}\b(?:,?\s+(\d{{4}})\b)?')
+_DAY_MONTH_RE = re.compile(rf'\b(\d{{1,2}}){_ORD}\s+(?:of\s+)?({_MONTH_ALT})\b(?:,?\s+(\d{{4}})\b)?')
+_RELATIVE_RE = re.compile(r'\b(' + '|'.join(RELATIVE_DAYS) + r')\b')
+_IN_N_RE = re.compile(r'\bin\s+(\d{1,3}|' + '|'.join(NUMBER_WORDS) + r')\s+(day|week)s?\b')
+_WEEKDAY_RE = re.compile(rf'\b(?:(next|this|coming)\s+)?({_WEEKDAY_ALT})\b')
+_ON_DAY_RE = re.compile(rf'\bon\s+(?:the\s+)?(\d{{1,2}}){_ORD}\b(?!\s*(?::\d|am\b|pm\b|a\.m|p\.m))')
+_THE_NTH_RE = re.compile(r'\bthe\s+(\d{1,2})(?:st|nd|rd|th)\b')
+_RANGE_WORD_RE = re.compile(r'\b(this|next)\s+(week|weekend|month)\b')
+_RANGE_JOIN_RE = re.compile(r'^\s*(?:to|until|till|through|thru|and|-|–)\s*$')
+
+_TIME_AMPM_RE = re.compile(r'\b(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm|a\.m\.?|p\.m\.?)(?![a-z])')
+_TIME_24H_RE = re.compile(r'\b(\d{1,2}):(\d{2})\b')
+_TIME_AT_RE = re.compile(r'\bat\s+(\d{1,2})\b(?!\s*(?:st|nd|rd|th|%|/|-\d))|^\s*(\d{1,2})\s*$')
+_TIME_WORD_RE = re.compile(r'\b(noon|midday|midnight)\b')
+_PART_OF_DAY_RE = re.compile(r'\b(morning|afternoon|evening|tonight|night)\b')
+
+
+# --- "Today" anchors ---
+@lru_cache(maxsize=None)
+def _timezone(tz_name):
+    return pytz.timezone(tz_name)
+
+
+_anchors = {}   # tz name -> (date, epoch seconds at which it stops being today)
+
+
+def today(tz_name=DEFAULT_TZ):
+    """Today's date in tz_name (server local time if None), memoized until local midnight."""
+    now = time.time()
+    anchor = _anchors.get(tz_name)
+    if anchor and now < anchor[1]:
+        return anchor[0]
+    local = datetime.now(_timezone(tz_name)).replace(tzinfo=None) if tz_name else datetime.now()
+    midnight = datetime.combine(local.date() + timedelta(days=1), datetime.min.time())
+    _anchors[tz_name] = (local.date(), now + (midnight - local).total_seconds())
+    return local.date()
+
+
+def seconds_until_midnight(tz_name=DEFAULT_TZ):
+    """Seconds until today() rolls over in tz_name."""
+    today(tz_name)
+    return max(0.0, _anchors[tz_name][1] - time.time())
+
+
+# --- Calendar helpers ---
+def next_weekday(current_date, weekday):
+    """Next occurrence of weekday (0=Monday) strictly after current_date."""
+    days_ahead = weekday - current_date.weekday()
+    if days_ahead <= 0:
+        days_ahead += 7
+    return current_date + timedelta(days=days_ahead)
+
+
+def _day_in_coming_month(day, anchor):
+    """'on N': day N of this month if still ahead (or today), else of the next month that has it."""
+    year, month = anchor.year, anchor.month
+    if day >= anchor.day and day <= monthrange(year, month)[1]:
+        return date(year, month, day)
+    for _ in range(2):
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+        if day <= monthrange(year, month)[1]:
+            return date(year, month, day)
+    return None
+
+
+def _month_day(month, day, year, anchor):
+    """Month + day, rolled to next year if already past and no year was given."""
+    if year is None:
+        year = anchor.year
+        if (month, day) < (anchor.month, anchor.day):
+            year += 1
+    if 1 <= day <= monthrange(year, month)[1]:
+        return date(year, month, day)
+    return None
+
+
+# --- Dates ---
+def _date_matches(text, anchor):
+    """Yields (start, end, date) for every date expression in lowercased text."""
+    for m in _ISO_RE.finditer(text):
+        try:
+            yield m.start(), m.end(), date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        except ValueError:
+            pass
+    for m in _MONTH_DAY_RE.finditer(text):
+        d = _month_day(MONTHS[m.group(1)], int(m.group(2)), int(m.group(3)) if m.group(3) else None, anchor)
+        if d:
+            yield m.start(), m.end(), d
+    for m in _DAY_MONTH_RE.finditer(text):
+        d = _month_day(MONTHS[m.group(2)], int(m.group(1)), int(m.group(3)) if m.group(3) else None, anchor)
+        if d:
+            yield m.start(), m.end(), d
+    for m in _RELATIVE_RE.finditer(text):
+        yield m.start(), m.end(), anchor + timedelta(days=RELATIVE_DAYS[m.group(1)])
+    for m in _IN_N_RE.finditer(text):
+        n = NUMBER_WORDS.get(m.group(1)) or int(m.group(1))
+        yield m.start(), m.end(), anchor + timedelta(days=n * (7 if m.group(2) == 'week' else 1))
+    for m in _WEEKDAY_RE.finditer(text):
+        weekday = WEEKDAYS[m.group(2)]
+        if m.group(1) == 'this':
+            d = anchor + timedelta(days=(weekday - anchor.weekday()) % 7)
+        else:
+            d = next_weekday(anchor, weekday)
+        yield m.start(), m.end(), d
+    for pattern in (_ON_DAY_RE, _THE_NTH_RE):
+        for m in pattern.finditer(text):
+            d = _day_in_coming_month(int(m.group(1)), anchor)
+            if d:
+                yield m.start(), m.end(), d
+
+
+def find_dates(text, anchor=None):
+    """
+    All date expressions in text as [(start, end, date)] in order of appearance.
+    Where expressions overlap the longest one wins ("day after tomorrow" over
+    "tomorrow", "oct 7 2026" over "on 7").
+    """
+    anchor = anchor or today()
+    found = []
+    for start, end, d in sorted(_date_matches(text.lower(), anchor), key=lambda c: (c[0] - c[1], c[0])):
+        if all(end <= s or start >= e for s, e, _ in found):
+            found.append((start, end, d))
+    return sorted(found)
+
+
+def parse_date(text, anchor=None):
+    """First date expressed in text, or None."""
+    found = find_dates(text, anchor)
+    return found[0][2] if found else None
+
+
+def parse_date_range(text, anchor=None):
+    """
+    (start, end) for "this/next week|weekend|month" or "<date> to <date>";
+    a single date gives (d, d). None if text has no date.
+    """
+    anchor = anchor or today()
+    lowered = text.lower()
+    m = _RANGE_WORD_RE.search(lowered)
+    if m:
+        which, unit = m.groups()
+        if unit == 'week':
+            start = anchor - timedelta(days=anchor.weekday())
+            if which == 'next':
+                start += timedelta(days=7)
+            return max(start, anchor), start + timedelta(days=6)
+        if unit == 'weekend':
+            saturday = anchor + timedelta(days=(5 - anchor.weekday()) % 7)
+            if which == 'next':
+                saturday += timedelta(days=7)
+            return max(saturday, anchor), saturday + timedelta(days=1)
+        first = anchor.replace(day=1)
+        if which == 'next':
+            first = (first + timedelta(days=32)).replace(day=1)
+        return max(first, anchor), first.replace(day=monthrange(first.year, first.month)[1])
+
+    found = find_dates(lowered, anchor)
+    if not found:
+        return None
+    for (s1, e1, d1), (s2, e2, d2) in zip(found, found[1:]):
+        if _RANGE_JOIN_RE.match(lowered[e1:s2]):
+            return (d1, d2) if d1 <= d2 else (d2, d1)
+    return found[0][2], found[0][2]
+
+
+# --- Times ---
+def _format_time(hour, minute):
+    if 0 <= hour <= 23 and 0 <= minute <= 59:
+        return f"{hour:02d}:{minute:02d}"
+    return None
+
+
+def parse_time(text, assume_pm_before=8):
+    """
+    First time in text as 'HH:MM' (24h), or None. Without am/pm, hours are
+    read as PM when the text says afternoon/evening/tonight, and bare hours
+    below assume_pm_before ('at 5', '5:30', but not '05:30') as afternoon.
+    """
+    lowered = text.lower()
+    m = _TIME_AMPM_RE.search(lowered)
+    if m:
+        hour, minute = int(m.group(1)), int(m.group(2) or 0)
+        if hour > 12:
+            return None
+        if m.group(3).startswith('p') and hour != 12:
+            hour += 12
+        elif m.group(3).startswith('a') and hour == 12:
+            hour = 0
+        return _format_time(hour, minute)
+    m = _TIME_24H_RE.search(lowered) or _TIME_AT_RE.search(lowered)
+    if m:
+        hour_text = m.group(1) or m.group(2)
+        hour = int(hour_text)
+        minute = int(m.group(2)) if m.re is _TIME_24H_RE else 0
+        part_of_day = _PART_OF_DAY_RE.search(lowered)
+        if part_of_day and part_of_day.group(1) == 'morning':
+            pass
+        elif hour < 12 and part_of_day:
+            hour += 12
+        elif hour < assume_pm_before and not hour_text.startswith('0'):
+            hour += 12
+        return _format_time(hour, minute)
+    m = _TIME_WORD_RE.search(lowered)
+    if m:
+        return "00:00" if m.group(1) == 'midnight' else "12:00"
+    return None
+
+
+def parse_part_of_day(text):
+    """Default time for 'morning', 'evening', etc., or None."""
+    m = _PART_OF_DAY_RE.search(text.lower())
+    return PART_OF_DAY_TIMES[m.group(1)] if m else None
+
+
+# --- Events ---
+def resolve_event_when(event, user_message, anchor=None, default_time="09:00"):
+    """
+    Fills event['date'] / event['time'] deterministically. The event's own
+    'when' words take priority, then the LLM's date/time if well-formed, then
+    the message's date when it names just one; otherwise today at default_time.
+    """
+    anchor = anchor or today()
+    when = str(event.pop('when', '') or '')
+
+    event_date = parse_date(when, anchor) if when else None
+    if event_date is None:
+        event_date = _valid_date(event.get('date'))
+    if event_date is None:
+        message_dates = {d for _, _, d in find_dates(user_message, anchor)}
+        event_date = message_dates.pop() if len(message_dates) == 1 else anchor
+
+    event_time = None
+    if when:
+        event_time = parse_time(when) or parse_part_of_day(when)
+    if event_time is None:
+        event_time = _valid_time(event.get('time'))
+    event['date'] = event_date.strftime('%Y-%m-%d')
+    event['time'] = event_time or default_time
+    return event
+
+
+def _valid_date(value):
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _valid_time(value):
+    m = re.fullmatch(r'(\d{1,2}):(\d{2})(?::\d{2})?', str(value or '').strip())
+    return _format_time(int(m.group(1)), int(m.group(2))) if m else None
+
+
+if __name__ == "__main__":
+    import timeit
+
+    samples = [
+        "meeting tomorrow at 10am", "dentist on 7 at 4:30 pm", "lunch with Sam next friday 1pm",
+        "flight on October 15th at 06:45", "gym in 3 days at 7", "standup on the 2nd",
+        "review from oct 7 to oct 10", "dinner day after tomorrow at 8 pm", "call this monday at noon",
+        "hello there, how are you?",
+    ]
+    anchor = date(2026, 10, 17)
+    for s in samples:
+        print(f"{s!r:45} -> {parse_date(s, anchor)} {parse_time(s)} {parse_date_range(s, anchor)}")
+    runs = 2000
+    seconds = timeit.timeit(lambda: [(parse_date(s, anchor), parse_time(s)) for s in samples], number=runs)
+    print(f"\n{runs * len(samples)} parses in {seconds:.3f}s ({seconds / (runs * len(samples)) * 1e6:.1f} µs each)")
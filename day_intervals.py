@@ -0,0 +1,250 @@
+import heapq
+import os
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+from database import db_cursor
+from recurrence import load_occurrences
+
+# Per-day busy intervals for conflict checks. An event occupies
+# [time, time + duration_minutes); rows without a duration (everything
+# written before durations existed) count as DEFAULT_DURATION_MINUTES.
+# A day's intervals are kept sorted by start minute, so an overlap query is
+# two bisects over the starts plus a scan of the events that can actually
+# reach the query window (none longer than the day's longest event).
+DEFAULT_DURATION_MINUTES = int(os.getenv("EVENT_DEFAULT_DURATION_MINUTES", "60"))
+MAX_DURATION_MINUTES = 24 * 60
+FREE_SLOTS_MAX_DAYS = int(os.getenv("FREE_SLOTS_MAX_DAYS", "366"))
+
+
+def to_minutes(hhmm):
+    """'HH:MM' (or 'HH:MM:SS') as minutes after midnight."""
+    hour, minute = str(hhmm).split(':')[:2]
+    return int(hour) * 60 + int(minute)
+
+
+def format_minutes(minutes):
+    """Minutes after midnight as 'HH:MM' (past midnight wraps, e.g. 25:00 -> '01:00')."""
+    minutes %= MAX_DURATION_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def parse_duration(data):
+    """
+    Duration in minutes from a request/event dict: 'duration_minutes', or
+    'end_time' (HH:MM, after 'time'). None if neither is usable.
+    """
+    duration = data.get('duration_minutes')
+    if duration in (None, ''):
+        end_time, start_time = data.get('end_time'), data.get('time')
+        if not end_time or not start_time:
+            return None
+        try:
+            duration = to_minutes(end_time) - to_minutes(start_time)
+        except (ValueError, TypeError):
+            return None
+    try:
+        duration = int(duration)
+    except (ValueError, TypeError):
+        return None
+    return duration if 0 < duration <= MAX_DURATION_MINUTES else None
+
+
+class DayIntervals:
+    """One day's events as [start, end) minute intervals, sorted by start."""
+
+    def __init__(self):
+        self.starts = []
+        self.intervals = []     # (start, end, event), same order as starts
+        self.longest = 0
+
+    def add(self, start, end, event):
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.intervals.insert(i, (start, end, event))
+        self.longest = max(self.longest, end - start)
+
+    def remove(self, start, end, event):
+        """Removes an interval added with add() (longest stays as an upper bound)."""
+        i = bisect_left(self.starts, start)
+        while self.intervals[i][2] is not event:
+            i += 1
+        del self.starts[i]
+        del self.intervals[i]
+
+    def overlapping(self, start, end):
+        """(start, end, event) for every interval overlapping [start, end)."""
+        # Anything starting at or before start - longest has ended by start.
+        lo = bisect_right(self.starts, start - self.longest)
+        hi = bisect_left(self.starts, end)
+        return [interval for interval in self.intervals[lo:hi] if interval[1] > start]
+
+    def __len__(self):
+        return len(self.starts)
+
+
+def _busy_rows(user_ids, first_day, last_day):
+    """
+    Pending, timed events and recurring-event occurrences of the users
+    between the two dates, ordered by (user_id, date, start_minute).
+    day_offset counts days from first_day.
+    """
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute(f"""
+            SELECT id, user_id, title, category, DATE_FORMAT(date, '%Y-%m-%d') AS date,
+                   DATEDIFF(date, %s) AS day_offset, TIME_TO_SEC(time) DIV 60 AS start_minute, duration_minutes
+            FROM events
+            WHERE user_id IN ({", ".join(["%s"] * len(user_ids))}) AND date BETWEEN %s AND %s
+              AND done = FALSE AND time IS NOT NULL
+            ORDER BY user_id, date, time
+        """, (first_day, *user_ids, first_day, last_day))
+        rows = cursor.fetchall()
+
+    # Occurrences of recurring events in the same window, merged into the order above
+    first = date.fromisoformat(str(first_day))
+    occurrences = [
+        dict(occurrence, id=None, day_offset=(date.fromisoformat(occurrence['date']) - first).days)
+        for occurrence in load_occurrences(user_ids, first_day, last_day)
+        if not occurrence['done'] and occurrence['start_minute'] is not None
+    ]
+    if occurrences:
+        rows = sorted(rows + occurrences, key=lambda row: (row['user_id'], row['day_offset'], int(row['start_minute'])))
+    for row in rows:
+        start = int(row['start_minute'])
+        yield row, start, start + (row['duration_minutes'] or DEFAULT_DURATION_MINUTES)
+
+
+def load_days(user_id, dates):
+    """
+    {date: DayIntervals} of the user's pending, timed events on the given
+    dates ('YYYY-MM-DD'), read with one range query over the (user_id, date,
+    done) index. Event dicts carry id, title, time, end_time and category.
+    """
+    wanted = set(dates)
+    days = defaultdict(DayIntervals)
+    if not wanted:
+        return days
+    for row, start, end in _busy_rows([user_id], min(wanted), max(wanted)):
+        if row['date'] not in wanted:
+            continue
+        days[row['date']].add(start, end, {
+            'id': row['id'],
+            'title': row['title'],
+            'time': format_minutes(start),
+            'end_time': format_minutes(end),
+            'category': row['category'],
+            'series_id': row.get('series_id'),
+        })
+    return days
+
+
+def _absolute(rows):
+    """(start, end) in minutes from midnight of the query's first_day, for _busy_rows output."""
+    for row, start, end in rows:
+        offset = int(row['day_offset']) * MAX_DURATION_MINUTES
+        yield offset + start, offset + end
+
+
+def _sweep(intervals, days, day_start, day_end, min_minutes):
+    """
+    Free gaps per day: intervals are busy (start, end) minutes from midnight
+    of day 0, sorted by start (they may overlap). Returns [[(start, end), ...]]
+    for days 0..days-1, in minutes of that day. Busy time carries across
+    midnight, and each interval is looked at once.
+    """
+    intervals = iter(intervals)
+    pending = next(intervals, None)
+    reach = None     # latest end seen so far
+    result = []
+    for day in range(days):
+        base = day * MAX_DURATION_MINUTES
+        lo, hi = base + day_start, base + day_end
+        cursor = lo if reach is None else max(lo, reach)
+        gaps = []
+        while pending is not None and pending[0] < hi:
+            start, end = pending
+            if start - cursor >= min_minutes:
+                gaps.append((cursor - base, start - base))
+            cursor = max(cursor, end)
+            reach = end if reach is None else max(reach, end)
+            pending = next(intervals, None)
+        if hi - cursor >= min_minutes:
+            gaps.append((cursor - base, hi - base))
+        result.append(gaps)
+    return result
+
+
+def free_slots(user_id, first_day, last_day, day_start, day_end, min_minutes):
+    """
+    [(date, [(start, end), ...])] for every day from first_day to last_day
+    (datetime.date): the gaps of at least min_minutes between day_start and
+    day_end (minutes after midnight) not covered by a pending event. One
+    query, then a single sweep over the events in (date, start) order;
+    events running past midnight also block the start of the next day.
+    """
+    return group_free_slots([user_id], first_day, last_day, day_start, day_end, min_minutes)
+
+
+def group_free_slots(user_ids, first_day, last_day, day_start, day_end, min_minutes):
+    """
+    free_slots() for several users at once: the gaps in which none of them
+    has a pending event. One query loads everyone's events; each user's
+    are already in start order, so they are combined with a k-way
+    heapq.merge and fed to the same sweep.
+    """
+    rows = _busy_rows(user_ids, first_day - timedelta(days=1), last_day)
+    per_user = [list(_absolute(group)) for _, group in groupby(rows, key=lambda item: item[0]['user_id'])]
+    busy = heapq.merge(*per_user)
+    days = (last_day - first_day).days + 2
+    gaps = _sweep(busy, days, day_start, day_end, min_minutes)[1:]
+    return [(first_day + timedelta(days=i), day_gaps) for i, day_gaps in enumerate(gaps)]
+
+
+# --- Free-slot endpoints (schedule.py, collaboration.py) ---
+def parse_slot_query(args):
+    """
+    (first_day, last_day, day_start, day_end, min_minutes) from query args
+    start, end (YYYY-MM-DD, end defaults to start), day_start/day_end
+    (HH:MM, default 09:00-18:00) and min_minutes (default 30). Raises
+    ValueError with a message for the client.
+    """
+    if not args.get('start'):
+        raise ValueError("start parameter is required (YYYY-MM-DD)")
+    try:
+        first_day = datetime.strptime(args['start'], '%Y-%m-%d').date()
+        last_day = datetime.strptime(args.get('end') or args['start'], '%Y-%m-%d').date()
+        day_start = to_minutes(args.get('day_start', '09:00'))
+        day_end = to_minutes(args.get('day_end', '18:00')) or MAX_DURATION_MINUTES  # 00:00 = midnight
+        min_minutes = int(args.get('min_minutes', 30))
+    except ValueError:
+        raise ValueError("Use YYYY-MM-DD for start/end, HH:MM for day_start/day_end and an integer min_minutes")
+
+    if last_day < first_day or (last_day - first_day).days >= FREE_SLOTS_MAX_DAYS:
+        raise ValueError(f"end must be on or after start, at most {FREE_SLOTS_MAX_DAYS} days later")
+    if not 0 <= day_start < day_end <= MAX_DURATION_MINUTES or min_minutes < 1:
+        raise ValueError("day_start must be before day_end and min_minutes at least 1")
+    return first_day, last_day, day_start, day_end, min_minutes
+
+
+def _clock(minutes):
+    return "24:00" if minutes == MAX_DURATION_MINUTES else format_minutes(minutes)
+
+
+def slots_reply(first_day, last_day, day_start, day_end, min_minutes, days):
+    """JSON body for free_slots()/group_free_slots() output."""
+    return {
+        "start": first_day.isoformat(),
+        "end": last_day.isoformat(),
+        "day_start": _clock(day_start),
+        "day_end": _clock(day_end),
+        "min_minutes": min_minutes,
+        "days": [
+            {
+                "date": day.isoformat(),
+                "free": [{"start": _clock(start), "end": _clock(end), "minutes": end - start} for start, end in gaps],
+            }
+            for day, gaps in days
+        ],
+    }
@@ -0,0 +1,108 @@
+from collections import Counter
+from database import db_cursor
+
+# Aggregates derived from the events table and kept up to date on write.
+#
+# user_day_summary holds one row per (user, day) with pending/done counts, so
+# calendar views read ~31 tiny rows instead of scanning events. The
+# users.tasks_total / tasks_done counters serve the profile page the same
+# way, whatever the size of the user's history. Every code
+# path that inserts, toggles or deletes an event calls one of the record_*
+# helpers below with its own cursor, *before* committing, so the summary
+# changes in the same transaction as the event itself.
+
+
+def record_insert(cursor, user_id, day, done=False):
+    """Counts a newly inserted event."""
+    _apply(cursor, user_id, day, 0 if done else 1, 1 if done else 0)
+
+
+def record_toggle(cursor, user_id, day, done_now):
+    """Moves one event between the pending and done counts."""
+    delta = 1 if done_now else -1
+    _apply(cursor, user_id, day, -delta, delta)
+
+
+def record_delete(cursor, user_id, day, was_done):
+    """Removes a deleted event from the counts."""
+    _apply(cursor, user_id, day, 0 if was_done else -1, -1 if was_done else 0)
+
+
+def record_inserts(cursor, user_id, days):
+    """Counts several pending events inserted together: one statement per table."""
+    if not user_id or not days:
+        return
+    counts = Counter(str(day) for day in days if day is not None)
+    if counts:
+        cursor.executemany(_DAY_UPSERT, [(user_id, day, n, 0) for day, n in sorted(counts.items())])
+    cursor.execute(_USER_COUNTERS_UPDATE, (len(days), 0, user_id))
+
+
+_DAY_UPSERT = """
+    INSERT INTO user_day_summary (user_id, day, pending_count, done_count)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        pending_count = pending_count + VALUES(pending_count),
+        done_count = done_count + VALUES(done_count)
+"""
+_USER_COUNTERS_UPDATE = """
+    UPDATE users
+    SET tasks_total = tasks_total + %s, tasks_done = tasks_done + %s
+    WHERE user_id = %s
+"""
+
+
+def _apply(cursor, user_id, day, pending_delta, done_delta):
+    if not user_id:
+        # Legacy rows without an owner never show up in any calendar
+        return
+    if day is not None:
+        # Legacy rows whose date couldn't be migrated are in no day's counts
+        cursor.execute(_DAY_UPSERT, (user_id, day, pending_delta, done_delta))
+    cursor.execute(_USER_COUNTERS_UPDATE, (pending_delta + done_delta, done_delta, user_id))
+
+
+def rebuild_day_summary(user_id=None):
+    """
+    Recomputes user_day_summary from events, for every user or just one.
+    Used for the initial backfill and to repair drift. Returns the row count.
+    """
+    user_filter = "AND user_id = %s" if user_id else ""
+    params = (user_id,) if user_id else ()
+
+    with db_cursor() as (conn, cursor):
+        cursor.execute(f"DELETE FROM user_day_summary WHERE 1 = 1 {user_filter}", params)
+        cursor.execute(f"""
+            INSERT INTO user_day_summary (user_id, day, pending_count, done_count)
+            SELECT user_id, date, SUM(done = FALSE), SUM(done = TRUE)
+            FROM events
+            WHERE user_id IS NOT NULL AND date IS NOT NULL {user_filter}
+            GROUP BY user_id, date
+        """, params)
+        rows = cursor.rowcount
+        conn.commit()
+    return rows
+
+
+def repair_user_counters(user_id=None):
+    """
+    Recomputes users.tasks_total / tasks_done from events and fixes any that
+    drifted. Returns the number of users whose counters were corrected.
+    """
+    user_filter = "AND user_id = %s" if user_id else ""
+    params = (user_id, user_id) if user_id else ()
+
+    with db_cursor() as (conn, cursor):
+        cursor.execute(f"""
+            UPDATE users u
+            LEFT JOIN (
+                SELECT user_id, COUNT(*) AS total, SUM(done = TRUE) AS done
+                FROM events WHERE user_id IS NOT NULL {user_filter} GROUP BY user_id
+            ) e ON e.user_id = u.user_id
+            SET u.tasks_total = COALESCE(e.total, 0), u.tasks_done = COALESCE(e.done, 0)
+            WHERE (u.tasks_total <> COALESCE(e.total, 0) OR u.tasks_done <> COALESCE(e.done, 0))
+              {user_filter.replace('user_id', 'u.user_id')}
+        """, params)
+        fixed = cursor.rowcount
+        conn.commit()
+    return fixed
@@ -0,0 +1,59 @@
+from database import db_cursor, notify_events_changed
+from day_intervals import load_days, to_minutes, parse_duration, DEFAULT_DURATION_MINUTES
+from event_aggregates import record_inserts
+
+# Batch path for chat messages that name several events: one query loads
+# the existing events on every target date into per-day interval lists
+# (day_intervals.py), each event's overlaps are looked up in memory, and
+# all accepted events are inserted with one executemany in a single
+# transaction (user_day_summary / users counters included).
+
+# Column order of the rows passed to insert_events()
+INSERT_EVENT_SQL = """
+    INSERT INTO events (user_id, title, description, category, date, time, done, reminder_setting, reminder_datetime,
+                        duration_minutes)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def find_conflicts(user_id, events):
+    """
+    For each event ({'date', 'time', optional 'duration_minutes'/'end_time'}),
+    the user's pending events whose time span overlaps it. One query covers all dates.
+    """
+    try:
+        days = load_days(user_id, [event['date'] for event in events])
+    except Exception as e:
+        print(f"Error checking conflicts: {e}")
+        return [[] for _ in events]
+
+    results = []
+    for event in events:
+        day = days.get(event['date'])
+        try:
+            start = to_minutes(event['time'])
+        except (ValueError, TypeError):
+            day = None
+        if not day:
+            results.append([])
+            continue
+        end = start + (parse_duration(event) or DEFAULT_DURATION_MINUTES)
+        results.append([
+            dict(existing,
+                 time_diff_minutes=abs(start - existing_start),
+                 overlap_minutes=min(end, existing_end) - max(start, existing_start))
+            for existing_start, existing_end, existing in day.overlapping(start, end)
+        ])
+    return results
+
+
+def insert_events(user_id, rows):
+    """Inserts rows (INSERT_EVENT_SQL column order) in one transaction. Returns how many."""
+    if not rows:
+        return 0
+    with db_cursor() as (conn, cursor):
+        cursor.executemany(INSERT_EVENT_SQL, rows)
+        record_inserts(cursor, user_id, [row[4] for row in rows])
+        conn.commit()
+    notify_events_changed(user_id)
+    return len(rows)
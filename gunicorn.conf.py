@@ -0,0 +1,10 @@
+# Read by gunicorn from the working directory (Procfile / render.yaml run
+# `gunicorn app:app` from the repo root).
+
+
+def post_worker_init(worker):
+    # Each gunicorn worker process runs its own JOB_WORKERS job threads,
+    # started after the app (and so every @job_handler) has been imported.
+    # Importing app alone doesn't start them, so flask CLI commands don't.
+    from job_queue import start_workers
+    start_workers()
@@ -1,7 +1,9 @@
 from flask import Blueprint , jsonify, request
-from database import get_db_connection
+from database import get_db_connection, DatabaseUnavailable
+from month_view import get_month_days
+from recurrence import load_occurrences
 from mysql.connector import Error
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # This can be a new Blueprint or part of your main app
 home_bp = Blueprint('home', __name__)
@@ -26,8 +28,15 @@ def get_today_tasks(user_id):
         """
         cursor.execute(query, (user_id, today_date))
         tasks = cursor.fetchall()
+        # Today's occurrences of recurring events, TIME as timedelta like the rows above
+        tasks.extend(
+            {'title': o['title'], 'description': o['description'], 'series_id': o['series_id'],
+             'time': None if o['start_minute'] is None else timedelta(minutes=o['start_minute'])}
+            for o in load_occurrences([user_id], today_date, today_date) if not o['done']
+        )
+        tasks.sort(key=lambda task: (task['time'] is not None, task['time'] or timedelta()))
         return jsonify(tasks)
-    except Error as e:
+    except (Error, DatabaseUnavailable) as e:
         return jsonify({"error": str(e)}), 500
     finally:
         if conn and conn.is_connected():
@@ -44,31 +53,9 @@ def get_events_for_month(user_id):
     if not year or not month:
         return jsonify({"error": "Year and month parameters are required"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
     try:
-        cursor = conn.cursor(dictionary=True)
-        date_pattern = f"{year}-{int(month):02d}-%"
-        cursor.execute("SELECT date, done FROM events WHERE user_id = %s AND date LIKE %s", (user_id, date_pattern))
-        events = cursor.fetchall()
-
-        events_by_day = {}
-        for event in events:
-            day = int(event['date'].split('-')[2])
-            if day not in events_by_day:
-                events_by_day[day] = {'hasPending': False, 'hasCompleted': False}
-            if event['done']:
-                events_by_day[day]['hasCompleted'] = True
-            else:
-                events_by_day[day]['hasPending'] = True
-
-        return jsonify(events_by_day)
+        return jsonify(get_month_days(user_id, year, month))
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
     except Exception as err:
         return jsonify({"error": str(err)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
-
@@ -0,0 +1,255 @@
+import json
+import os
+import socket
+import threading
+import time
+
+from mysql.connector import Error
+
+from database import db_cursor, use_pool, DatabaseUnavailable
+
+# Durable queue for AI work, backed by the jobs table. Request threads only
+# insert a row and return 202 with the job id; a pool of worker threads runs
+# the LLM calls, so slow providers never pin a gunicorn request thread.
+#
+# Each web process runs JOB_WORKERS worker threads (0 leaves the work to a
+# dedicated process: `python job_queue.py`). Workers claim the oldest queued
+# job with SELECT ... FOR UPDATE SKIP LOCKED, so any number of processes can
+# share the table. Submitting is refused with QueueFull (HTTP 429) once
+# JOB_QUEUE_MAX jobs are queued or running; submits count and insert under
+# a named lock, so concurrent ones can't overshoot the limit. Worker threads
+# use their own connection pool (DB_JOB_POOL_SIZE), not the request pool.
+#
+# A job still 'running' after JOB_TIMEOUT seconds lost its worker. Handlers
+# registered with retry=True are requeued (up to JOB_MAX_ATTEMPTS runs);
+# others, e.g. ones that create events, are failed rather than run twice.
+# A result is only recorded by the run that holds the job's current attempt,
+# so a worker that outlived its timeout can't overwrite a requeued run.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "500"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "86400"))
+MAINTENANCE_INTERVAL = 30
+SUBMIT_LOCK_TIMEOUT = 5
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class QueueFull(Exception):
+    """Raised by submit() when JOB_QUEUE_MAX jobs are already waiting."""
+
+
+_handlers = {}          # kind -> (handler(user_id, payload), retry)
+_wakeup = threading.Event()
+_lock = threading.Lock()
+_threads = []
+_owner_pid = None
+_next_maintenance = 0.0
+
+
+def job_handler(kind, retry=False):
+    """Registers handler(user_id, payload) -> JSON-serializable result for a job kind."""
+    def register(handler):
+        _handlers[kind] = (handler, retry)
+        return handler
+    return register
+
+
+def submit(kind, user_id, payload):
+    """Queues a job and returns its id. Raises QueueFull when the queue is at capacity."""
+    if kind not in _handlers:
+        raise ValueError(f"No job handler registered for {kind!r}")
+    max_attempts = JOB_MAX_ATTEMPTS if _handlers[kind][1] else 1
+    with db_cursor() as (conn, cursor):
+        cursor.execute("SELECT GET_LOCK('job_submit', %s)", (SUBMIT_LOCK_TIMEOUT,))
+        if not cursor.fetchone()[0]:
+            raise QueueFull("Job queue is busy, try again shortly")
+        try:
+            conn.commit()  # count from a snapshot taken after the lock
+            cursor.execute("SELECT COUNT(*) FROM jobs WHERE status IN (%s, %s)", (QUEUED, RUNNING))
+            if cursor.fetchone()[0] >= JOB_QUEUE_MAX:
+                raise QueueFull(f"Job queue is full ({JOB_QUEUE_MAX} jobs)")
+            cursor.execute(
+                "INSERT INTO jobs (kind, user_id, status, payload, max_attempts) VALUES (%s, %s, %s, %s, %s)",
+                (kind, user_id, QUEUED, json.dumps(payload, default=str), max_attempts)
+            )
+            job_id = cursor.lastrowid
+            conn.commit()
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK('job_submit')")
+            cursor.fetchone()
+    _wakeup.set()
+    return job_id
+
+
+def get_job(job_id, user_id):
+    """The job as a dict (result decoded), or None if it doesn't exist or isn't the user's."""
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute("""
+            SELECT id, kind, status, result, error, attempts, created_at, started_at, finished_at
+            FROM jobs WHERE id = %s AND user_id = %s
+        """, (job_id, user_id))
+        job = cursor.fetchone()
+    if job and job['result'] is not None:
+        job['result'] = json.loads(job['result'])
+    return job
+
+
+def take_pending(job_id, user_id):
+    """
+    Removes and returns the session values ('pending') in a job's result, so
+    they reach the user's session on one poll only; {} if already taken.
+    """
+    with db_cursor() as (conn, cursor):
+        cursor.execute("SELECT result FROM jobs WHERE id = %s AND user_id = %s FOR UPDATE", (job_id, user_id))
+        row = cursor.fetchone()
+        result = json.loads(row[0]) if row and row[0] is not None else None
+        if not isinstance(result, dict) or not result.get('pending'):
+            conn.commit()
+            return {}
+        pending = result.pop('pending')
+        cursor.execute("UPDATE jobs SET result = %s WHERE id = %s", (json.dumps(result, default=str), job_id))
+        conn.commit()
+    return pending
+
+
+def job_reply(job_id, user_id):
+    """Body of the 202 reply from an endpoint that queued a job."""
+    return {"job_id": job_id, "status": QUEUED, "status_url": f"/api/{user_id}/jobs/{job_id}"}
+
+
+# --- Workers ---
+def start_workers(count=None):
+    """Starts this process's worker threads (once per process)."""
+    global _owner_pid
+    count = JOB_WORKERS if count is None else count
+    with _lock:
+        if _owner_pid == os.getpid() or count <= 0:
+            return
+        _owner_pid = os.getpid()
+        _threads.clear()
+        for i in range(count):
+            name = f"{socket.gethostname()}:{os.getpid()}:{i}"
+            thread = threading.Thread(target=_worker_loop, args=(name,), name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            _threads.append(thread)
+    print(f"🚀 Started {count} job worker(s)")
+
+
+def _worker_loop(name):
+    use_pool('jobs')
+    while True:
+        try:
+            _maybe_maintain()
+            job = _claim(name)
+        except (Error, DatabaseUnavailable) as e:
+            print(f"❌ Job worker {name} database error: {e}")
+            job = None
+        if job is None:
+            _wakeup.wait(JOB_POLL_INTERVAL)
+            _wakeup.clear()
+            continue
+        _run(job)
+
+
+def _claim(name):
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute("""
+            SELECT id, kind, user_id, payload, attempts FROM jobs
+            WHERE status = %s ORDER BY id LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        """, (QUEUED,))
+        job = cursor.fetchone()
+        if job:
+            job['attempts'] += 1
+            cursor.execute("""
+                UPDATE jobs SET status = %s, attempts = attempts + 1, worker = %s, started_at = NOW()
+                WHERE id = %s
+            """, (RUNNING, name, job['id']))
+        conn.commit()
+    return job
+
+
+def _run(job):
+    handler = _handlers.get(job['kind'])
+    started = time.monotonic()
+    try:
+        if handler is None:
+            raise RuntimeError(f"No job handler registered for {job['kind']!r}")
+        result = handler[0](job['user_id'], json.loads(job['payload']))
+        _finish(job, DONE, result=json.dumps(result, default=str))
+        print(f"✅ Job {job['id']} ({job['kind']}) done in {time.monotonic() - started:.2f}s")
+    except Exception as e:
+        print(f"❌ Job {job['id']} ({job['kind']}) failed: {e}")
+        try:
+            _finish(job, FAILED, error=str(e))
+        except (Error, DatabaseUnavailable) as db_error:
+            print(f"❌ Could not record failure of job {job['id']}: {db_error}")
+
+
+def _finish(job, status, result=None, error=None):
+    """Records the outcome, unless the job was failed or requeued (and maybe reclaimed) meanwhile."""
+    with db_cursor() as (conn, cursor):
+        cursor.execute("""
+            UPDATE jobs SET status = %s, result = %s, error = %s, finished_at = NOW()
+            WHERE id = %s AND status = %s AND attempts = %s
+        """, (status, result, error, job['id'], RUNNING, job['attempts']))
+        finished = cursor.rowcount
+        conn.commit()
+    if not finished:
+        print(f"⚠️ Job {job['id']} attempt {job['attempts']} finished after it timed out; outcome dropped")
+
+
+def _maybe_maintain():
+    """Requeues or fails jobs orphaned by a dead worker and purges old results."""
+    global _next_maintenance
+    with _lock:
+        if time.monotonic() < _next_maintenance:
+            return
+        _next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+
+    with db_cursor() as (conn, cursor):
+        cursor.execute("""
+            UPDATE jobs SET status = %s, worker = NULL
+            WHERE status = %s AND started_at < NOW() - INTERVAL %s SECOND AND attempts < max_attempts
+        """, (QUEUED, RUNNING, JOB_TIMEOUT))
+        requeued = cursor.rowcount
+        cursor.execute("""
+            UPDATE jobs SET status = %s, error = 'Job did not finish (worker stopped or timed out)', finished_at = NOW()
+            WHERE status = %s AND started_at < NOW() - INTERVAL %s SECOND
+        """, (FAILED, RUNNING, JOB_TIMEOUT))
+        failed = cursor.rowcount
+        cursor.execute("""
+            DELETE FROM jobs
+            WHERE status IN (%s, %s) AND finished_at < NOW() - INTERVAL %s SECOND
+            LIMIT 1000
+        """, (DONE, FAILED, JOB_RETENTION))
+        conn.commit()
+    if requeued or failed:
+        print(f"⚠️ Orphaned jobs: {requeued} requeued, {failed} failed")
+    if requeued:
+        _wakeup.set()
+
+
+def queue_stats():
+    """Jobs per status, for /health."""
+    stats = {"workers": len(_threads) if _owner_pid == os.getpid() else 0, "queue_max": JOB_QUEUE_MAX}
+    try:
+        with db_cursor() as (conn, cursor):
+            cursor.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+            stats["jobs"] = dict(cursor.fetchall())
+    except (Error, DatabaseUnavailable) as e:
+        stats["error"] = str(e)
+    return stats
+
+
+if __name__ == "__main__":
+    # Dedicated worker process. Handlers register on the imported job_queue
+    # module (not on __main__), so the workers must be started from there too.
+    import ai, ai_assistant, ai_scheduler, task_enhancer, chat_history  # noqa: F401
+    import job_queue
+    job_queue.start_workers(max(JOB_WORKERS, 1))
+    while True:
+        time.sleep(3600)
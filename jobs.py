@@ -0,0 +1,27 @@
+from flask import Blueprint, jsonify, session
+from mysql.connector import Error
+from database import DatabaseUnavailable
+from job_queue import get_job, take_pending
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route("/api/<user_id>/jobs/<int:job_id>")
+def get_job_status(user_id, job_id):
+    """Status of a queued AI job; 'result' is set once status is 'done'."""
+    try:
+        job = get_job(job_id, user_id)
+    except (Error, DatabaseUnavailable) as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    # Workers have no session; values a job leaves for one (e.g. an event
+    # waiting for conflict confirmation) are stored here, on the first poll
+    # that sees them, and cleared from the job so later polls don't restore
+    # a question the user has already answered
+    if isinstance(job['result'], dict) and job['result'].get('pending'):
+        try:
+            session.update(take_pending(job_id, user_id))
+        except (Error, DatabaseUnavailable) as e:
+            return jsonify({"error": f"Database error: {str(e)}"}), 500
+        job['result'].pop('pending')
+    return jsonify(job), 200
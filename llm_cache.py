@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from date_parser import DEFAULT_TZ, seconds_until_midnight
+from llm_router import MODELS, PROVIDER_ORDER
+
+# Response cache for LLM calls whose answer depends only on their inputs
+# (AIScheduler.generate_tasks, ai_enhance_task_data). Keys hash the namespace,
+# the normalized prompt, the configured models and, for date-relative prompts,
+# the IST date the answer was generated for. Dated entries also expire at the
+# next IST midnight, so "tomorrow" is never served from yesterday's answer.
+#
+# Two tiers: an LRU dict per worker, and an optional SQLite file shared by
+# every gunicorn worker on the host (LLM_CACHE_PATH, off when empty). Values
+# are stored as JSON, so callers always get their own copy.
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_SIZE", "1000"))
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_SIZE", "20000"))
+PRUNE_EVERY = 100   # disk writes between LRU prunes
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_prompt(text):
+    """Case, whitespace and trailing punctuation don't change the answer."""
+    return _WHITESPACE_RE.sub(' ', str(text or '')).strip().lower().rstrip('.!?')
+
+
+def _model_fingerprint():
+    return ",".join(f"{p}:{MODELS.get(p, '')}" for p in PROVIDER_ORDER)
+
+
+class LLMCache:
+    def __init__(self, namespace, ttl):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires_at, json value)
+        self._lock = threading.Lock()
+        self._stats = {"hits_memory": 0, "hits_disk": 0, "misses": 0, "stores": 0,
+                       "evictions": 0, "disk_errors": 0}
+
+    def key(self, *parts, anchor=None):
+        """Cache key for the prompt parts; anchor is the date a relative prompt was resolved against."""
+        raw = json.dumps([self.namespace, _model_fingerprint(), str(anchor or ''),
+                          [normalize_prompt(p) for p in parts]])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Returns the cached value for key, or None."""
+        if not CACHE_ENABLED:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._stats["hits_memory"] += 1
+                return json.loads(entry[1])
+            if entry:
+                del self._entries[key]
+
+        entry = self._disk_get(key, now)
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits_disk"] += 1
+            self._remember(key, entry)
+        return json.loads(entry[1])
+
+    def set(self, key, value, anchor=None):
+        """Caches value for ttl seconds; dated (anchor) entries never outlive the IST day."""
+        if not CACHE_ENABLED:
+            return
+        ttl = self.ttl
+        if anchor is not None:
+            ttl = min(ttl, seconds_until_midnight(DEFAULT_TZ))
+        if ttl <= 0:
+            return
+        entry = (time.time() + ttl, json.dumps(value))
+        with self._lock:
+            self._stats["stores"] += 1
+            self._remember(key, entry)
+        self._disk_set(key, entry)
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > CACHE_MAX_ENTRIES:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    # --- Shared SQLite tier ---
+    def _disk_get(self, key, now):
+        if not CACHE_PATH:
+            return None
+        try:
+            conn = _disk_connection()
+            row = conn.execute(
+                "SELECT expires_at, value FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+            return row
+        except sqlite3.Error as e:
+            self._disk_error(e)
+            return None
+
+    def _disk_set(self, key, entry):
+        if not CACHE_PATH:
+            return
+        try:
+            conn = _disk_connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, namespace, expires_at, accessed_at, value) VALUES (?, ?, ?, ?, ?)",
+                (key, self.namespace, entry[0], time.time(), entry[1])
+            )
+            conn.commit()
+            _maybe_prune(conn)
+        except sqlite3.Error as e:
+            self._disk_error(e)
+
+    def _disk_error(self, e):
+        with self._lock:
+            self._stats["disk_errors"] += 1
+        print(f"⚠️ LLM cache disk tier error: {e}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats["hits_memory"] + stats["hits_disk"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits_memory"] + stats["hits_disk"]) / lookups, 3) if lookups else None
+        return stats
+
+
+_local = threading.local()
+_disk_writes = 0
+_disk_lock = threading.Lock()
+
+
+def _disk_connection():
+    """One SQLite connection per thread, reopened after a fork."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid():
+        conn = sqlite3.connect(CACHE_PATH, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                value TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+        conn.commit()
+        _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+
+def _maybe_prune(conn):
+    """Drops expired rows and the least recently used beyond LLM_CACHE_DISK_SIZE."""
+    global _disk_writes
+    with _disk_lock:
+        _disk_writes += 1
+        if _disk_writes % PRUNE_EVERY:
+            return
+    conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+    conn.execute("""
+        DELETE FROM llm_cache WHERE key IN (
+            SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+        )
+    """, (CACHE_DISK_MAX_ENTRIES,))
+    conn.commit()
+
+
+_caches = {}
+
+
+def get_cache(namespace, ttl):
+    """The process-wide cache for namespace."""
+    cache = _caches.get(namespace)
+    if cache is None:
+        cache = _caches.setdefault(namespace, LLMCache(namespace, ttl))
+    return cache
+
+
+def cache_stats():
+    """Hit/miss counters per namespace, for /health."""
+    return {
+        "enabled": CACHE_ENABLED,
+        "shared_tier": bool(CACHE_PATH),
+        "namespaces": {name: cache.stats() for name, cache in _caches.items()},
+    }
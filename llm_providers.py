@@ -0,0 +1,91 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+# Optional imports
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+    print("Warning: google.generativeai not available")
+
+try:
+    import cohere
+except ImportError:
+    cohere = None
+    print("Warning: cohere not available")
+
+try:
+    from groq import Groq
+except ImportError:
+    Groq = None
+    print("Warning: groq not available")
+
+load_dotenv()
+
+# Process-wide LLM clients. Each client is built once per worker and shared by
+# every request, so the HTTP keep-alive pools and TLS sessions inside the
+# Groq/Cohere SDKs survive between calls. Like the DB pool, clients are
+# rebuilt in a forked child rather than sharing the parent's sockets.
+GEMINI_API_KEY = os.getenv("GOOGLE_GEMINI_API_KEY")
+COHERE_API_KEY = os.getenv("COHERE_API_KEY")
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# Per-request timeout, so a hung provider fails over instead of stalling a worker
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+
+_clients = {}           # provider name -> client, or None if unavailable
+_gemini_models = {}     # model name -> genai.GenerativeModel
+_owner_pid = None
+_lock = threading.Lock()
+
+
+def _reset_if_forked():
+    global _owner_pid
+    if _owner_pid != os.getpid():
+        _clients.clear()
+        _gemini_models.clear()
+        _owner_pid = os.getpid()
+
+
+def _get_client(name, factory):
+    with _lock:
+        _reset_if_forked()
+        if name not in _clients:
+            try:
+                _clients[name] = factory()
+            except Exception as e:
+                print(f"Warning: Failed to initialize {name} client: {e}")
+                _clients[name] = None
+        return _clients[name]
+
+
+def get_groq_client():
+    """Returns the shared Groq client, or None if Groq isn't configured."""
+    return _get_client("groq", lambda: Groq(api_key=GROQ_API_KEY, timeout=LLM_TIMEOUT) if GROQ_API_KEY and Groq else None)
+
+
+def get_cohere_client():
+    """Returns the shared Cohere client, or None if Cohere isn't configured."""
+    return _get_client("cohere", lambda: cohere.Client(COHERE_API_KEY, timeout=LLM_TIMEOUT) if COHERE_API_KEY and cohere else None)
+
+
+def gemini_available():
+    """True if Gemini is installed and configured (genai.configure runs once)."""
+    def configure():
+        if not (GEMINI_API_KEY and genai):
+            print("Warning: GOOGLE_GEMINI_API_KEY not found in .env file or genai not available.")
+            return None
+        genai.configure(api_key=GEMINI_API_KEY)
+        return genai
+    return _get_client("gemini", configure) is not None
+
+
+def get_gemini_model(model_name):
+    """Returns a shared GenerativeModel for model_name. Call gemini_available() first."""
+    if not gemini_available():
+        raise RuntimeError("Gemini is not configured")
+    with _lock:
+        model = _gemini_models.get(model_name)
+        if model is None:
+            model = _gemini_models[model_name] = genai.GenerativeModel(model_name)
+        return model
@@ -0,0 +1,465 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from llm_providers import gemini_available, get_gemini_model, get_cohere_client, get_groq_client
+
+# One fallback path for every LLM call. Providers are tried in LLM_PROVIDER_ORDER,
+# except that degraded ones (mostly failing, or slow) move to the back. Each
+# provider has a circuit breaker: after LLM_BREAKER_THRESHOLD consecutive
+# failures it is skipped outright for LLM_BREAKER_COOLDOWN seconds instead of
+# timing out on every request. Once the cooldown passes a single request
+# probes it (half-open); success closes the breaker, failure re-opens it with
+# a doubled cooldown, up to LLM_BREAKER_MAX_COOLDOWN. A reply that is empty or
+# rejected by the caller's parse counts as a failure too ("unusable"), since
+# a provider that answers with garbage is no more use than one that times out.
+PROVIDER_ORDER = [p.strip() for p in os.getenv("LLM_PROVIDER_ORDER", "groq,cohere,gemini").split(",") if p.strip()]
+MODELS = {
+    "groq": os.getenv("LLM_GROQ_MODEL", "llama-3.1-8b-instant"),
+    "cohere": os.getenv("LLM_COHERE_MODEL", "command-r-03-2025"),
+    "gemini": os.getenv("LLM_GEMINI_MODEL", "gemini-1.5-flash"),
+    "fake": "fake",
+}
+BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+BREAKER_MAX_COOLDOWN = float(os.getenv("LLM_BREAKER_MAX_COOLDOWN", "300"))
+SLOW_SECONDS = float(os.getenv("LLM_SLOW_SECONDS", "8"))
+# Offline provider for local runs: add "fake" to LLM_PROVIDER_ORDER. It replies
+# with LLM_FAKE_REPLY (or echoes the last message), streaming one word every
+# LLM_FAKE_TOKEN_DELAY seconds.
+FAKE_REPLY = os.getenv("LLM_FAKE_REPLY", "")
+FAKE_TOKEN_DELAY = float(os.getenv("LLM_FAKE_TOKEN_DELAY", "0.05"))
+EWMA_ALPHA = 0.2
+
+# Hedging (opt-in per call with hedge=True, enabled by LLM_HEDGING): start the
+# next provider when the current one is slower than its LLM_HEDGE_PERCENTILE
+# latency over recent calls (LLM_HEDGE_DELAY until enough samples exist).
+HEDGING_ENABLED = os.getenv("LLM_HEDGING", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "90"))
+HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "1.0"))
+HEDGE_MAX_CONCURRENT = int(os.getenv("LLM_HEDGE_MAX_CONCURRENT", "4"))
+HEDGE_MIN_SAMPLES = 10
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class LLMUnavailable(Exception):
+    """Raised when no provider produced a usable response."""
+
+
+class ProviderHealth:
+    """Failure/latency tracking and circuit breaker state for one provider."""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.cooldown = BREAKER_COOLDOWN
+        self.open_until = 0.0
+        self.probing = False
+        self.latency = None        # EWMA of successful call latency, seconds
+        self.error_rate = 0.0      # EWMA of failures, 0..1
+        self.calls = 0
+        self.failures = 0
+        self.unusable = 0          # replies that came back but failed parsing
+        self.last_error = None
+        self.samples = deque(maxlen=100)  # recent successful latencies
+
+    def try_acquire(self, now):
+        """True if a call may go to this provider now."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now >= self.open_until:
+            self.state = HALF_OPEN
+            self.probing = False
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def degraded(self):
+        return self.error_rate >= 0.5 or (self.latency is not None and self.latency > SLOW_SECONDS)
+
+    def hedge_budget(self):
+        """Seconds to wait for this provider before hedging to the next one."""
+        with _lock:
+            samples = sorted(self.samples)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DELAY
+        return samples[min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE / 100))]
+
+    def record_success(self, elapsed):
+        self.calls += 1
+        self.latency = elapsed if self.latency is None else (1 - EWMA_ALPHA) * self.latency + EWMA_ALPHA * elapsed
+        self.samples.append(elapsed)
+        self.error_rate *= (1 - EWMA_ALPHA)
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            print(f"✅ LLM provider {self.name} recovered; circuit closed")
+        self.state = CLOSED
+        self.probing = False
+        self.cooldown = BREAKER_COOLDOWN
+
+    def record_failure(self, error, now):
+        self.failures += 1
+        self._count_failure(error, now)
+
+    def record_unusable(self, error, now):
+        self.unusable += 1
+        self._count_failure(f"unusable reply: {error}", now)
+
+    def _count_failure(self, error, now):
+        self.calls += 1
+        self.error_rate = (1 - EWMA_ALPHA) * self.error_rate + EWMA_ALPHA
+        self.consecutive_failures += 1
+        self.last_error = str(error)[:200]
+        if self.state == HALF_OPEN:
+            self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+            self._open(now)
+        elif self.state == CLOSED and self.consecutive_failures >= BREAKER_THRESHOLD:
+            self._open(now)
+
+    def _open(self, now):
+        self.state = OPEN
+        self.probing = False
+        self.open_until = now + self.cooldown
+        print(f"⚠️ LLM provider {self.name} circuit open for {self.cooldown:.0f}s after: {self.last_error}")
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "latency_ms": round(self.latency * 1000) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "consecutive_failures": self.consecutive_failures,
+            "calls": self.calls,
+            "failures": self.failures,
+            "unusable": self.unusable,
+            "last_error": self.last_error,
+        }
+
+
+# --- Provider adapters ---
+# Each takes (system, messages, max_tokens, temperature) where messages are
+# [{"role": "user" | "assistant", "content": str}] and returns the reply text.
+def _flatten(system, messages):
+    """Single-prompt form for providers called without native chat history."""
+    if not system and len(messages) == 1:
+        return messages[0]["content"]
+    prompt = (system or "") + "\n\nConversation:\n"
+    for msg in messages:
+        speaker = "User" if msg["role"] == "user" else "Assistant"
+        prompt += f"{speaker}: {msg['content']}\n"
+    return prompt + "Assistant:"
+
+
+def _call_groq(system, messages, max_tokens, temperature):
+    client = get_groq_client()
+    if client is None:
+        return None
+    chat_messages = ([{"role": "system", "content": system}] if system else []) + messages
+    response = client.chat.completions.create(
+        model=MODELS["groq"],
+        messages=chat_messages,
+        max_tokens=max_tokens,
+        temperature=temperature
+    )
+    return response.choices[0].message.content
+
+
+def _call_cohere(system, messages, max_tokens, temperature):
+    client = get_cohere_client()
+    if client is None:
+        return None
+    response = client.chat(
+        model=MODELS["cohere"],
+        message=_flatten(system, messages),
+        max_tokens=max_tokens,
+        temperature=temperature
+    )
+    return response.text
+
+
+def _call_gemini(system, messages, max_tokens, temperature):
+    if not gemini_available():
+        return None
+    response = get_gemini_model(MODELS["gemini"]).generate_content(
+        _flatten(system, messages),
+        generation_config={"max_output_tokens": max_tokens, "temperature": temperature}
+    )
+    return response.text
+
+
+def _call_fake(system, messages, max_tokens, temperature):
+    return FAKE_REPLY or f"(fake provider) You said: {messages[-1]['content']}"
+
+
+# Streaming adapters: same arguments, return an iterator of text chunks
+# (or None if the provider isn't configured).
+def _stream_groq(system, messages, max_tokens, temperature):
+    client = get_groq_client()
+    if client is None:
+        return None
+    chat_messages = ([{"role": "system", "content": system}] if system else []) + messages
+    stream = client.chat.completions.create(
+        model=MODELS["groq"],
+        messages=chat_messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True
+    )
+    return (chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+
+
+def _stream_cohere(system, messages, max_tokens, temperature):
+    client = get_cohere_client()
+    if client is None:
+        return None
+    stream = client.chat_stream(
+        model=MODELS["cohere"],
+        message=_flatten(system, messages),
+        max_tokens=max_tokens,
+        temperature=temperature
+    )
+    return (event.text for event in stream if getattr(event, "event_type", None) == "text-generation")
+
+
+def _stream_gemini(system, messages, max_tokens, temperature):
+    if not gemini_available():
+        return None
+    response = get_gemini_model(MODELS["gemini"]).generate_content(
+        _flatten(system, messages),
+        generation_config={"max_output_tokens": max_tokens, "temperature": temperature},
+        stream=True
+    )
+    return (chunk.text for chunk in response)
+
+
+def _stream_fake(system, messages, max_tokens, temperature):
+    for i, word in enumerate(_call_fake(system, messages, max_tokens, temperature).split(" ")):
+        time.sleep(FAKE_TOKEN_DELAY)
+        yield word if i == 0 else " " + word
+
+
+_ADAPTERS = {"groq": _call_groq, "cohere": _call_cohere, "gemini": _call_gemini, "fake": _call_fake}
+_STREAMERS = {"groq": _stream_groq, "cohere": _stream_cohere, "gemini": _stream_gemini, "fake": _stream_fake}
+_health = {name: ProviderHealth(name) for name in PROVIDER_ORDER if name in _ADAPTERS}
+_lock = threading.Lock()
+_hedge_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_WORKERS", "16")), thread_name_prefix="llm-hedge")
+_hedge_stats = {}   # label -> requests / hedges / wins per provider / concurrency cap
+
+
+def _ranked():
+    """Providers in the order to try them: healthy first, then LLM_PROVIDER_ORDER."""
+    with _lock:
+        return sorted(_health.values(), key=lambda h: (h.degraded(), PROVIDER_ORDER.index(h.name)))
+
+
+class _NotConfigured(Exception):
+    """The provider has no client in this deployment."""
+
+
+def _attempt(health, system, messages, max_tokens, temperature, parse, label):
+    """One call to one provider (already acquired). Returns the parsed result or raises."""
+    started = time.monotonic()
+    try:
+        text = _ADAPTERS[health.name](system, messages, max_tokens, temperature)
+    except Exception as e:
+        with _lock:
+            health.record_failure(e, time.monotonic())
+        print(f"{health.name} {label} failed: {e}")
+        raise
+
+    elapsed = time.monotonic() - started
+    if text is None:
+        with _lock:
+            # Release a half-open probe claimed for an unconfigured provider.
+            health.probing = False
+        raise _NotConfigured(health.name)
+
+    try:
+        text = text.strip()
+        if not text:
+            raise ValueError("empty response")
+        result = text if parse is None else parse(text)
+    except ValueError as e:
+        with _lock:
+            health.record_unusable(e, time.monotonic())
+        print(f"{health.name} {label} returned an unusable response: {e}")
+        raise
+    with _lock:
+        health.record_success(elapsed)
+    return result
+
+
+def _acquire(health):
+    with _lock:
+        return health.try_acquire(time.monotonic())
+
+
+def chat(messages, system=None, max_tokens=500, temperature=0.1, parse=None, label="llm", hedge=False):
+    """
+    Sends a conversation to the healthiest available provider, falling back
+    in order. If parse is given, it is applied to the reply text and a
+    ValueError from it (e.g. bad JSON) moves on to the next provider.
+    hedge=True opts the call into hedging when LLM_HEDGING is enabled.
+    Returns (result, provider_name); raises LLMUnavailable if all fail.
+    """
+    args = (system, messages, max_tokens, temperature, parse, label)
+    if hedge and HEDGING_ENABLED:
+        return _chat_hedged(args, label)
+
+    errors = []
+    for health in _ranked():
+        if not _acquire(health):
+            continue
+        try:
+            result = _attempt(health, *args)
+        except _NotConfigured:
+            continue
+        except Exception as e:
+            errors.append(f"{health.name}: {e}")
+            continue
+        print(f"✓ {label} answered by {health.name}")
+        return result, health.name
+
+    raise LLMUnavailable("; ".join(errors) or "No LLM provider available")
+
+
+def chat_stream(messages, system=None, max_tokens=500, temperature=0.1, label="llm"):
+    """
+    Streaming form of chat(): yields (provider_name, text_chunk) as the reply
+    is produced. Providers are tried in the same order with the same breakers,
+    but fallback only happens before the first chunk; a provider failing
+    mid-stream ends the stream with LLMUnavailable, since sent text can't be
+    taken back. Raises LLMUnavailable if no provider starts a reply.
+    """
+    errors = []
+    for health in _ranked():
+        if not _acquire(health):
+            continue
+        started = time.monotonic()
+        sent = False
+        try:
+            stream = _STREAMERS[health.name](system, messages, max_tokens, temperature)
+            if stream is None:
+                with _lock:
+                    health.probing = False
+                continue
+            for chunk in stream:
+                if chunk:
+                    sent = True
+                    yield health.name, chunk
+            if not sent:
+                raise ValueError("empty response")
+        except GeneratorExit:
+            # Client went away; neither a success nor a provider failure.
+            with _lock:
+                health.probing = False
+            raise
+        except Exception as e:
+            with _lock:
+                health.record_failure(e, time.monotonic())
+            print(f"{health.name} {label} stream failed: {e}")
+            if sent:
+                raise LLMUnavailable(f"{health.name} failed mid-stream: {e}")
+            errors.append(f"{health.name}: {e}")
+            continue
+
+        with _lock:
+            health.record_success(time.monotonic() - started)
+        print(f"✓ {label} streamed by {health.name}")
+        return
+
+    raise LLMUnavailable("; ".join(errors) or "No LLM provider available")
+
+
+def _chat_hedged(args, label):
+    """
+    Like chat(), but if the provider in flight hasn't answered within its
+    latency budget, the next one is started in parallel (at most
+    LLM_HEDGE_MAX_CONCURRENT extra calls per label). The first usable answer
+    wins; slower calls finish in the background and only update health.
+    """
+    candidates = iter(_ranked())
+    pending = {}    # future -> ProviderHealth
+    errors = []
+    stats = _hedge_stats_for(label)
+    with _lock:
+        stats["requests"] += 1
+
+    def launch(as_hedge):
+        for health in candidates:
+            if not _acquire(health):
+                continue
+            future = _hedge_executor.submit(_attempt, health, *args)
+            pending[future] = health
+            if as_hedge:
+                with _lock:
+                    stats["hedges"] += 1
+                future.add_done_callback(lambda _f: stats["semaphore"].release())
+            return health
+        return None
+
+    newest = launch(as_hedge=False)
+    while pending:
+        # Only arm the hedge timer while another provider could still be tried.
+        budget = newest.hedge_budget() if newest is not None else None
+        done, _ = wait(pending, timeout=budget, return_when=FIRST_COMPLETED)
+
+        if not done:
+            if stats["semaphore"].acquire(blocking=False):
+                newest = launch(as_hedge=True)
+                if newest is None:
+                    stats["semaphore"].release()
+            else:
+                newest = None   # cap reached: wait for what's in flight
+            continue
+
+        for future in done:
+            health = pending.pop(future)
+            try:
+                result = future.result()
+            except _NotConfigured:
+                continue
+            except Exception as e:
+                errors.append(f"{health.name}: {e}")
+                continue
+            with _lock:
+                stats["wins"][health.name] = stats["wins"].get(health.name, 0) + 1
+            print(f"✓ {label} answered by {health.name}" + (" (hedged)" if pending else ""))
+            return result, health.name
+
+        if not pending:
+            # Everything in flight failed; fall back to the next provider now.
+            newest = launch(as_hedge=False)
+
+    raise LLMUnavailable("; ".join(errors) or "No LLM provider available")
+
+
+def _hedge_stats_for(label):
+    with _lock:
+        if label not in _hedge_stats:
+            _hedge_stats[label] = {
+                "requests": 0, "hedges": 0, "wins": {},
+                "semaphore": threading.BoundedSemaphore(HEDGE_MAX_CONCURRENT),
+            }
+        return _hedge_stats[label]
+
+
+def generate(prompt, **kwargs):
+    """Single-prompt form of chat()."""
+    return chat([{"role": "user", "content": prompt}], **kwargs)
+
+
+def router_stats():
+    """Per-provider breaker state and health, for /health."""
+    with _lock:
+        stats = {name: h.snapshot() for name, h in _health.items()}
+        if _hedge_stats:
+            stats["hedging"] = {
+                label: {"requests": h["requests"], "hedges": h["hedges"], "wins": dict(h["wins"])}
+                for label, h in _hedge_stats.items()
+            }
+        return stats
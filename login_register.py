@@ -1,80 +1,11 @@
 from flask import Blueprint, request, jsonify
-import os
 import mysql.connector
-from mysql.connector import Error
 from bcrypt import hashpw, gensalt, checkpw
 import uuid
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from database import get_db_connection
 
 auth_bp = Blueprint('auth', __name__)
 
-# --- Database Configuration ---
-DB_HOST = os.getenv("DB_HOST")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_DATABASE = os.getenv("DB_DATABASE")
-
-# --- Database Initialization ---
-def init_db():
-    try:
-        conn = mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD)
-        cursor = conn.cursor()
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_DATABASE}")
-        cursor.close()
-        conn.close()
-
-        conn = mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_DATABASE)
-        cursor = conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id varchar(255) not null UNIQUE,
-            photo_url VARCHAR(255),
-            profile_bio VARCHAR(255) DEFAULT 'Productivity enthusiast and UI/UX designer.',
-            username VARCHAR(255) NOT NULL,
-            email VARCHAR(255) UNIQUE NOT NULL,
-            phone VARCHAR(20) UNIQUE NOT NULL,
-            password VARCHAR(255) NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-        # Updated Events Table Schema
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS events (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id varchar(255),
-            title VARCHAR(255) NOT NULL,
-            description TEXT,
-            Category VARCHAR(255),
-            date VARCHAR(255) NOT NULL,
-            time VARCHAR(50),
-            done BOOLEAN NOT NULL DEFAULT FALSE,
-            reminder_setting VARCHAR(50),
-            reminder_datetime VARCHAR(255),
-            reminde1 boolean,
-            reminde2 boolean,
-            reminde3 boolean,
-            reminde4 boolean,
-            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
-        )
-        """)
-        conn.commit()
-        cursor.close()
-        conn.close()
-        print("✅ DB + Tables ensured.")
-    except Error as e:
-        print(f"❌ DB Init Error: {e}")
-
-def get_db_connection():
-    try:
-        return mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_DATABASE)
-    except Error as e:
-        print(f"❌ DB Connection Error: {e}")
-        return None
-
 # --- Authentication Endpoints ---
 @auth_bp.route('/register', methods=['POST'])
 def register_user():
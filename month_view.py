@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import date, timedelta
+from database import db_cursor, month_bounds, on_events_changed
+from recurrence import load_occurrences
+
+# Shared "which days have pending / completed tasks" aggregation behind every
+# calendar month view. Results are cached per user and month in this worker
+# and dropped whenever that user's events are written. Writes handled by the
+# other gunicorn worker can't reach this cache, so entries also expire after
+# MONTH_VIEW_CACHE_TTL seconds.
+CACHE_TTL = float(os.getenv("MONTH_VIEW_CACHE_TTL", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("MONTH_VIEW_CACHE_SIZE", "5000"))
+
+_cache = OrderedDict()   # (user_id, year, month) -> (generation, expires_at, days)
+_generations = {}        # user_id -> bumped on every write, invalidating older entries
+_holders = Counter()     # user_id -> cached entries + queries in flight
+_lock = threading.Lock()
+# A user's generation is only needed while something can still compare
+# against it, so it is dropped with the user's last entry or query and the
+# dict stays as small as the cache.
+
+
+def get_month_days(user_id, year, month):
+    """
+    Returns {day: {'hasPending': bool, 'hasCompleted': bool}} for every day of
+    the month that has at least one task. The returned dict is shared with the
+    cache and must not be modified.
+    """
+    year, month = int(year), int(month)
+    key = (user_id, year, month)
+
+    with _lock:
+        generation = _generations.get(user_id, 0)
+        entry = _cache.get(key)
+        if entry and entry[0] == generation and entry[1] > time.monotonic():
+            _cache.move_to_end(key)
+            return entry[2]
+        _holders[user_id] += 1
+
+    days = None
+    try:
+        days = _query_month_days(user_id, year, month)
+    finally:
+        with _lock:
+            # Skip caching if the query failed or a write landed meanwhile.
+            if days is not None and _generations.get(user_id, 0) == generation:
+                if key not in _cache:
+                    _holders[user_id] += 1
+                _cache[key] = (generation, time.monotonic() + CACHE_TTL, days)
+                _cache.move_to_end(key)
+                while len(_cache) > CACHE_MAX_ENTRIES:
+                    _release(_cache.popitem(last=False)[0][0])
+            _release(user_id)
+    return days
+
+
+def _release(user_id):
+    """Drops one hold on the user (under _lock), and their generation with the last one."""
+    _holders[user_id] -= 1
+    if _holders[user_id] <= 0:
+        del _holders[user_id]
+        _generations.pop(user_id, None)
+
+
+def _query_month_days(user_id, year, month):
+    """
+    Reads at most one user_day_summary row per day (see event_aggregates.py)
+    plus the month's occurrences of recurring events (see recurrence.py).
+    """
+    start_date, end_date = month_bounds(year, month)
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute("""
+            SELECT DAY(day) AS day,
+                   pending_count > 0 AS has_pending,
+                   done_count > 0 AS has_completed
+            FROM user_day_summary
+            WHERE user_id = %s AND day >= %s AND day < %s
+              AND (pending_count > 0 OR done_count > 0)
+            ORDER BY day
+        """, (user_id, start_date, end_date))
+        rows = cursor.fetchall()
+
+    days = {
+        row['day']: {'hasPending': bool(row['has_pending']), 'hasCompleted': bool(row['has_completed'])}
+        for row in rows
+    }
+
+    # Recurring events aren't in user_day_summary; expand just this month.
+    last_day = date.fromisoformat(end_date) - timedelta(days=1)
+    for occurrence in load_occurrences([user_id], start_date, last_day):
+        day = days.setdefault(int(occurrence['date'][8:]), {'hasPending': False, 'hasCompleted': False})
+        day['hasCompleted' if occurrence['done'] else 'hasPending'] = True
+    return dict(sorted(days.items()))
+
+
+@on_events_changed
+def invalidate_user(user_id):
+    """Drops every cached month for a user."""
+    with _lock:
+        if user_id in _holders:
+            _generations[user_id] = _generations.get(user_id, 0) + 1
@@ -0,0 +1,290 @@
+import re
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from database import db_cursor
+
+# Recurring events. A series (event_series) is stored once with an
+# RRULE-style rule; its occurrences are never written to events. Readers
+# expand only the dates they ask about - a month view, today, the days a
+# conflict check or free-slot query covers, the reminder lookahead window -
+# jumping straight to the window instead of walking from the first date.
+# event_series_overrides holds one row per occurrence that differs from
+# the rule: marked done, or cancelled (an exception date).
+#
+# event_series.next_reminder_at is the fire time of the series' next
+# reminder (see next_reminder_at), so reminders.py range-scans it like
+# events.reminder_datetime instead of expanding every series each tick.
+#
+# Supported rule parts (RFC 5545 names):
+#   FREQ=DAILY|WEEKLY|MONTHLY|YEARLY, INTERVAL=n, BYDAY=MO,WE,... (WEEKLY),
+#   BYMONTHDAY=1,15,-1 (MONTHLY), COUNT=n, UNTIL=YYYYMMDD
+# COUNT is turned into the series' until_date when the series is created.
+MAX_COUNT = 1000
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+_LAST_DAY = date(9999, 12, 31)
+
+
+class Rule:
+    """A parsed recurrence rule (see parse_rrule)."""
+
+    def __init__(self, freq, interval=1, byday=(), bymonthday=(), count=None, until=None):
+        self.freq = freq
+        self.interval = interval
+        self.byday = byday
+        self.bymonthday = bymonthday
+        self.count = count
+        self.until = until
+
+
+@lru_cache(maxsize=4096)
+def parse_rrule(text):
+    """
+    Parses e.g. 'FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE' (an 'RRULE:' prefix is
+    allowed). Raises ValueError for anything outside the supported subset.
+    """
+    text = str(text or '').strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[6:]
+    parts = {}
+    for part in filter(None, text.upper().split(';')):
+        name, _, value = part.partition('=')
+        if not value or name in parts:
+            raise ValueError(f"Bad rule part {part!r}")
+        parts[name] = value
+
+    freq = parts.pop('FREQ', None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    try:
+        interval = int(parts.pop('INTERVAL', 1))
+        count = int(parts['COUNT']) if 'COUNT' in parts else None
+        byday = tuple(sorted({WEEKDAYS.index(day) for day in parts['BYDAY'].split(',')})) if 'BYDAY' in parts else ()
+        bymonthday = tuple(sorted({int(day) for day in parts['BYMONTHDAY'].split(',')})) if 'BYMONTHDAY' in parts else ()
+        until = datetime.strptime(re.sub(r'[^0-9]', '', parts['UNTIL'])[:8], '%Y%m%d').date() if 'UNTIL' in parts else None
+    except ValueError:
+        raise ValueError("INTERVAL/COUNT must be integers, BYDAY weekday codes (MO..SU), "
+                         "BYMONTHDAY day numbers and UNTIL a YYYYMMDD date")
+    parts.pop('COUNT', None)
+    parts.pop('UNTIL', None)
+    if parts.pop('BYDAY', None) and freq != 'WEEKLY':
+        raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+    if parts.pop('BYMONTHDAY', None) and freq != 'MONTHLY':
+        raise ValueError("BYMONTHDAY is only supported with FREQ=MONTHLY")
+    if parts:
+        raise ValueError(f"Unsupported rule parts: {', '.join(sorted(parts))}")
+    if interval < 1 or (count is not None and not 1 <= count <= MAX_COUNT):
+        raise ValueError(f"INTERVAL must be at least 1 and COUNT between 1 and {MAX_COUNT}")
+    if count is not None and until is not None:
+        raise ValueError("Use COUNT or UNTIL, not both")
+    if any(day == 0 or not -31 <= day <= 31 for day in bymonthday):
+        raise ValueError("BYMONTHDAY values must be 1..31 or -31..-1")
+    return Rule(freq, interval, byday, bymonthday, count, until)
+
+
+def _dates(rule, start, lo, hi):
+    """
+    Occurrence dates of rule from start on, ascending, beginning with the
+    first period that can reach lo and stopping once a period starts after hi.
+    (May yield dates before lo in the first period; callers filter.)
+    """
+    n = rule.interval
+    if rule.freq == 'DAILY':
+        day = start + timedelta(days=max(0, -(-(lo - start).days // n)) * n)
+        while day <= hi:
+            yield day
+            day += timedelta(days=n)
+
+    elif rule.freq == 'WEEKLY':
+        weekdays = rule.byday or (start.weekday(),)
+        week = start - timedelta(days=start.weekday())
+        week += timedelta(weeks=max(0, (lo - week).days // 7 // n) * n)
+        while week <= hi:
+            for weekday in weekdays:
+                day = week + timedelta(days=weekday)
+                if day >= start:
+                    yield day
+            week += timedelta(weeks=n)
+
+    elif rule.freq == 'MONTHLY':
+        monthdays = rule.bymonthday or (start.day,)
+        first = start.year * 12 + start.month - 1
+        index = first + max(0, (lo.year * 12 + lo.month - 1 - first) // n) * n
+        while True:
+            year, month = divmod(index, 12)
+            if date(year, month + 1, 1) > hi:
+                return
+            last = monthrange(year, month + 1)[1]
+            # Days a month doesn't have (e.g. the 31st) are skipped, as in RFC 5545
+            for day in sorted({d if d > 0 else last + d + 1 for d in monthdays}):
+                if 1 <= day <= last and date(year, month + 1, day) >= start:
+                    yield date(year, month + 1, day)
+            index += n
+
+    else:  # YEARLY, on the start date's month and day (Feb 29 only in leap years)
+        year = start.year + max(0, (lo.year - start.year) // n) * n
+        while year <= hi.year:
+            if start.month != 2 or start.day != 29 or monthrange(year, 2)[1] == 29:
+                yield date(year, start.month, start.day)
+            year += n
+
+
+def occurrences(rule, start, lo, hi, until=None):
+    """Occurrence dates of a series starting on start, within [lo, hi], ascending."""
+    if until is not None:
+        hi = min(hi, until)
+    if rule.until is not None:
+        hi = min(hi, rule.until)
+    lo = max(lo, start)
+    if lo > hi:
+        return
+    for day in _dates(rule, start, lo, hi):
+        if day > hi:
+            return
+        if day >= lo:
+            yield day
+
+
+def last_occurrence(rule, start):
+    """Date of the series' last occurrence, or None if it never ends (or, with COUNT, never occurs)."""
+    if rule.until is not None:
+        return rule.until
+    if rule.count is None:
+        return None
+    last = None
+    try:
+        for i, day in enumerate(_dates(rule, start, start, _LAST_DAY)):
+            last = day
+            if i + 1 == rule.count:
+                break
+    except (ValueError, OverflowError):
+        pass  # ran past year 9999
+    return last
+
+
+_REMINDER_UNITS = {'minute': 'minutes', 'hour': 'hours', 'day': 'days', 'week': 'weeks'}
+
+
+def reminder_offset(reminder_setting):
+    """
+    '15 minutes' / '1 hour' / '2 days' / '1 week' as a timedelta, read like
+    calculate_reminder_datetime(). None for no reminder or an unparseable one.
+    """
+    if not reminder_setting or reminder_setting in ("none", "No Reminder"):
+        return None
+    parts = str(reminder_setting).lower().split()
+    if len(parts) != 2 or not parts[0].isdigit():
+        return None
+    unit = next((name for prefix, name in _REMINDER_UNITS.items() if prefix in parts[1]), None)
+    return timedelta(**{unit: int(parts[0])}) if unit else None
+
+
+def next_reminder_at(series, after=None):
+    """
+    Fire time (naive wall clock, like events.reminder_datetime) of the first
+    reminder of a series row that comes after `after` (from the first
+    occurrence if None). None if the series has no reminder, no time or no
+    later occurrence. Overrides are not consulted: the dispatcher skips the
+    reminder of an occurrence that is done or cancelled by then.
+    """
+    offset = reminder_offset(series['reminder_setting'])
+    if offset is None or series['start_minute'] is None:
+        return None
+    starts_at = timedelta(minutes=int(series['start_minute']))
+    lo = series['start_date'] if after is None else (after + offset - starts_at).date()
+    try:
+        for day in occurrences(series['rule'], series['start_date'], lo, _LAST_DAY, series['until_date']):
+            fire_at = datetime.combine(day, datetime.min.time()) + starts_at - offset
+            if after is None or fire_at > after:
+                return fire_at
+    except (ValueError, OverflowError):
+        pass  # ran past year 9999
+    return None
+
+
+# --- Loading ---
+_SERIES_COLUMNS = """
+    id, user_id, title, description, category, start_date, rrule, until_date,
+    TIME_FORMAT(time, '%H:%i') AS time, TIME_TO_SEC(time) DIV 60 AS start_minute,
+    duration_minutes, reminder_setting, next_reminder_at
+"""
+
+
+def load_series(cursor, where, params):
+    """event_series rows (dictionary cursor) matching where, with their parsed rule as 'rule'."""
+    cursor.execute(f"SELECT {_SERIES_COLUMNS} FROM event_series WHERE {where}", params)
+    series = []
+    for row in cursor.fetchall():
+        try:
+            row['rule'] = parse_rrule(row['rrule'])
+        except ValueError as e:
+            print(f"⚠️ Skipping series {row['id']} with a bad rule: {e}")
+            continue
+        series.append(row)
+    return series
+
+
+def load_overrides(cursor, series_ids, first_day, last_day):
+    """{(series_id, 'YYYY-MM-DD'): {'done', 'cancelled'}} for the given series and dates."""
+    if not series_ids:
+        return {}
+    cursor.execute(f"""
+        SELECT series_id, DATE_FORMAT(occurrence_date, '%Y-%m-%d') AS date, done, cancelled
+        FROM event_series_overrides
+        WHERE series_id IN ({", ".join(["%s"] * len(series_ids))}) AND occurrence_date BETWEEN %s AND %s
+    """, (*series_ids, first_day, last_day))
+    return {(row['series_id'], row['date']): row for row in cursor.fetchall()}
+
+
+def expand(series, overrides, first_day, last_day):
+    """
+    Occurrence dicts of the series between first_day and last_day, by date:
+    series_id, user_id, title, description, category, date, time,
+    start_minute, duration_minutes, reminder_setting, done. Cancelled
+    occurrences are left out.
+    """
+    result = []
+    for row in series:
+        for day in occurrences(row['rule'], row['start_date'], first_day, last_day, row['until_date']):
+            override = overrides.get((row['id'], day.isoformat()))
+            if override and override['cancelled']:
+                continue
+            result.append({
+                'series_id': row['id'],
+                'user_id': row['user_id'],
+                'title': row['title'],
+                'description': row['description'],
+                'category': row['category'],
+                'date': day.isoformat(),
+                'time': row['time'],
+                'start_minute': None if row['start_minute'] is None else int(row['start_minute']),
+                'duration_minutes': row['duration_minutes'],
+                'reminder_setting': row['reminder_setting'],
+                'done': bool(override and override['done']),
+            })
+    result.sort(key=lambda occ: (occ['date'], occ['start_minute'] is not None, occ['start_minute'] or 0))
+    return result
+
+
+def load_occurrences(user_ids, first_day, last_day):
+    """
+    The users' series occurrences from first_day to last_day (dates or
+    'YYYY-MM-DD'), overrides applied, see expand(). Two indexed queries.
+    """
+    first_day, last_day = _as_date(first_day), _as_date(last_day)
+    user_ids = list(user_ids)
+    if not user_ids or first_day > last_day:
+        return []
+    with db_cursor(dictionary=True) as (conn, cursor):
+        series = load_series(cursor, f"""
+            user_id IN ({", ".join(["%s"] * len(user_ids))})
+            AND start_date <= %s AND (until_date IS NULL OR until_date >= %s)
+        """, (*user_ids, last_day, first_day))
+        overrides = load_overrides(cursor, [row['id'] for row in series], first_day, last_day)
+    return expand(series, overrides, first_day, last_day)
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
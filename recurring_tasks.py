@@ -0,0 +1,149 @@
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify
+from mysql.connector import Error
+
+from database import db_cursor, notify_events_changed, DatabaseUnavailable
+from day_intervals import parse_duration, to_minutes, FREE_SLOTS_MAX_DAYS
+from recurrence import (parse_rrule, last_occurrence, occurrences, next_reminder_at, load_series,
+                        load_overrides, load_occurrences)
+from reminders import local_now
+
+# Recurring events: one event_series row per series, expanded on read (see
+# recurrence.py). Done/cancelled occurrences are stored as sparse overrides.
+recurring_bp = Blueprint('recurring', __name__)
+
+
+def _parse_date(value):
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+
+@recurring_bp.route("/api/<user_id>/tasks/recurring", methods=['POST'])
+def add_recurring_task(user_id):
+    """
+    Creates a series from title, category, date (first occurrence), rrule
+    (e.g. "FREQ=WEEKLY;BYDAY=MO,WE") and optional description, time,
+    duration_minutes/end_time and reminder_setting.
+    """
+    data = request.json or {}
+    title, category, rrule = data.get('title'), data.get('category'), data.get('rrule')
+    if not all([title, category, data.get('date'), rrule]):
+        return jsonify({"error": "title, category, date and rrule are required"}), 400
+    try:
+        start_date = _parse_date(data['date'])
+        time = data.get('time') or None
+        if time:
+            time = datetime.strptime(time, '%H:%M').strftime('%H:%M')
+        rule = parse_rrule(rrule)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid date, time or rrule: {e}"}), 400
+
+    until_date = last_occurrence(rule, start_date)
+    if rule.count is not None and until_date is None:
+        return jsonify({"error": "The rule has no occurrences"}), 400
+    reminder_at = next_reminder_at({'rule': rule, 'start_date': start_date, 'until_date': until_date,
+                                    'start_minute': to_minutes(time) if time else None,
+                                    'reminder_setting': data.get('reminder_setting')}, local_now())
+
+    try:
+        with db_cursor() as (conn, cursor):
+            cursor.execute("""
+                INSERT INTO event_series
+                (user_id, title, description, category, start_date, time, duration_minutes,
+                 rrule, until_date, reminder_setting, next_reminder_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (user_id, title, data.get('description'), category, start_date, time, parse_duration(data),
+                  rrule.strip(), until_date, data.get('reminder_setting'), reminder_at))
+            series_id = cursor.lastrowid
+            conn.commit()
+    except (Error, DatabaseUnavailable) as e:
+        return jsonify({"error": f"Database error: {e}"}), 500
+    notify_events_changed(user_id)
+    return jsonify({"message": "Recurring task added successfully!", "series_id": series_id}), 201
+
+
+@recurring_bp.route("/api/<user_id>/tasks/recurring")
+def get_recurring_tasks(user_id):
+    """The user's series (rules, not occurrences)."""
+    try:
+        with db_cursor(dictionary=True) as (conn, cursor):
+            series = load_series(cursor, "user_id = %s ORDER BY start_date, id", (user_id,))
+    except (Error, DatabaseUnavailable) as e:
+        return jsonify({"error": f"Database error: {e}"}), 500
+    for row in series:
+        del row['rule'], row['start_minute']
+    return jsonify(series), 200
+
+
+@recurring_bp.route("/api/<user_id>/tasks/recurring/<int:series_id>", methods=['DELETE'])
+def delete_recurring_task(user_id, series_id):
+    """Deletes a series with all its occurrences and overrides."""
+    try:
+        with db_cursor() as (conn, cursor):
+            cursor.execute("DELETE FROM event_series WHERE id = %s AND user_id = %s", (series_id, user_id))
+            deleted = cursor.rowcount
+            conn.commit()
+    except (Error, DatabaseUnavailable) as e:
+        return jsonify({"error": f"Database error: {e}"}), 500
+    if not deleted:
+        return jsonify({"error": "Recurring task not found"}), 404
+    notify_events_changed(user_id)
+    return jsonify({"message": "Recurring task deleted."}), 200
+
+
+@recurring_bp.route("/api/<user_id>/tasks/recurring/<int:series_id>/occurrences/<occurrence_date>", methods=['POST'])
+def update_occurrence(user_id, series_id, occurrence_date):
+    """Marks one occurrence done/not done ({"done": bool}) or cancels/restores it ({"cancelled": bool})."""
+    data = request.json or {}
+    if not isinstance(data.get('done', False), bool) or not isinstance(data.get('cancelled', False), bool):
+        return jsonify({"error": "done and cancelled must be true or false"}), 400
+    try:
+        day = _parse_date(occurrence_date)
+    except ValueError:
+        return jsonify({"error": "Use YYYY-MM-DD for the occurrence date"}), 400
+
+    try:
+        with db_cursor(dictionary=True) as (conn, cursor):
+            series = load_series(cursor, "id = %s AND user_id = %s", (series_id, user_id))
+            if not series or day not in occurrences(series[0]['rule'], series[0]['start_date'], day, day,
+                                                    series[0]['until_date']):
+                return jsonify({"error": "Occurrence not found"}), 404
+            current = load_overrides(cursor, [series_id], day, day).get((series_id, day.isoformat())) or {}
+            done = data.get('done', bool(current.get('done')))
+            cancelled = data.get('cancelled', bool(current.get('cancelled')))
+            if done or cancelled:
+                cursor.execute("""
+                    INSERT INTO event_series_overrides (series_id, occurrence_date, done, cancelled)
+                    VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE done = VALUES(done), cancelled = VALUES(cancelled)
+                """, (series_id, day, done, cancelled))
+            else:
+                # Back to what the rule says: no row
+                cursor.execute(
+                    "DELETE FROM event_series_overrides WHERE series_id = %s AND occurrence_date = %s",
+                    (series_id, day)
+                )
+            conn.commit()
+    except (Error, DatabaseUnavailable) as e:
+        return jsonify({"error": f"Database error: {e}"}), 500
+    notify_events_changed(user_id)
+    return jsonify({"series_id": series_id, "date": day.isoformat(), "done": done, "cancelled": cancelled}), 200
+
+
+@recurring_bp.route("/api/<user_id>/tasks/occurrences")
+def get_occurrences(user_id):
+    """Occurrences of the user's recurring tasks from start to end (YYYY-MM-DD, end defaults to start)."""
+    try:
+        first_day = _parse_date(request.args['start'])
+        last_day = _parse_date(request.args.get('end') or request.args['start'])
+    except (KeyError, ValueError):
+        return jsonify({"error": "start (and optional end) parameters are required, as YYYY-MM-DD"}), 400
+    if last_day < first_day or (last_day - first_day).days >= FREE_SLOTS_MAX_DAYS:
+        return jsonify({"error": f"end must be on or after start, at most {FREE_SLOTS_MAX_DAYS} days later"}), 400
+    try:
+        found = load_occurrences([user_id], first_day, last_day)
+    except (Error, DatabaseUnavailable) as e:
+        return jsonify({"error": f"Database error: {e}"}), 500
+    for occurrence in found:
+        del occurrence['user_id'], occurrence['start_minute']
+    return jsonify(found), 200
@@ -0,0 +1,294 @@
+import heapq
+import json
+import os
+import time
+import urllib.request
+from datetime import datetime, timedelta
+
+import pytz
+from mysql.connector import Error
+
+from database import db_cursor, DatabaseUnavailable
+from recurrence import load_series, load_overrides, next_reminder_at, reminder_offset
+
+# Reminder dispatcher, run as its own process (see Procfile):
+#
+#     python reminders.py
+#
+# Every insert path stores reminder_datetime (IST wall clock) with reminde1 =
+# FALSE. Instead of polling the whole table, the scheduler range-scans the
+# (reminde1, reminder_datetime) index for the next REMINDER_LOOKAHEAD seconds,
+# keeps those in a min-heap and sleeps until the earliest one is due. The
+# window is re-scanned every REMINDER_REFILL_INTERVAL seconds to pick up tasks
+# added since, so each scan only touches reminders that are about to fire.
+#
+# Due reminders are re-checked against the table, handed to the sink as one
+# batch and then marked sent with `reminde1 = TRUE WHERE reminde1 = FALSE`.
+# A failed delivery is retried on the next refill; a crash between delivery
+# and the update can repeat a batch but never loses one.
+#
+# Recurring events (recurrence.py) have no events rows. Each series stores
+# the fire time of its next reminder (event_series.next_reminder_at, indexed),
+# which is scanned the same way; sending a reminder, or retiring an overdue
+# one, advances it to the following occurrence. An occurrence marked done or
+# cancelled has its reminder skipped when it comes due.
+REMINDER_TIMEZONE = pytz.timezone(os.getenv("REMINDER_TIMEZONE", "Asia/Kolkata"))
+REMINDER_LOOKAHEAD = int(os.getenv("REMINDER_LOOKAHEAD", "300"))
+REMINDER_REFILL_INTERVAL = int(os.getenv("REMINDER_REFILL_INTERVAL", "30"))
+REMINDER_GRACE = int(os.getenv("REMINDER_GRACE", "3600"))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "200"))
+REMINDER_HEAP_MAX = int(os.getenv("REMINDER_HEAP_MAX", "50000"))
+
+EVENT, SERIES = 0, 1    # heap entry kinds
+
+_REMINDER_COLUMNS = """
+    id, user_id, title, category,
+    DATE_FORMAT(date, '%Y-%m-%d') AS date,
+    TIME_FORMAT(time, '%H:%i') AS time,
+    reminder_setting, reminder_datetime
+"""
+
+
+# --- Sinks ---
+class LogSink:
+    """Prints each reminder. The default, useful in development."""
+
+    def send(self, reminders):
+        for r in reminders:
+            print(f"🔔 Reminder for {r['user_id']}: {r['title']} on {r['date']} {r['time'] or ''} ({r['reminder_setting']})")
+
+
+class WebhookSink:
+    """POSTs each batch as {"reminders": [...]} to REMINDER_WEBHOOK_URL."""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, reminders):
+        body = json.dumps({"reminders": reminders}, default=str).encode("utf-8")
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            if resp.status >= 300:
+                raise RuntimeError(f"Webhook returned HTTP {resp.status}")
+
+
+class MemorySink:
+    """Collects delivered reminders in a list. For tests and local runs."""
+
+    def __init__(self):
+        self.delivered = []
+
+    def send(self, reminders):
+        self.delivered.extend(reminders)
+
+
+def get_sink(name=None):
+    """Builds the sink named by REMINDER_SINK: 'log' (default), 'webhook' or 'memory'."""
+    name = (name or os.getenv("REMINDER_SINK", "log")).lower()
+    if name == "webhook":
+        url = os.getenv("REMINDER_WEBHOOK_URL")
+        if not url:
+            raise ValueError("REMINDER_SINK=webhook requires REMINDER_WEBHOOK_URL")
+        return WebhookSink(url)
+    if name == "memory":
+        return MemorySink()
+    return LogSink()
+
+
+def local_now():
+    """Current naive wall-clock time in REMINDER_TIMEZONE, matching reminder_datetime."""
+    return datetime.now(REMINDER_TIMEZONE).replace(tzinfo=None)
+
+
+# --- Scheduler ---
+class ReminderScheduler:
+    def __init__(self, sink=None):
+        self.sink = sink or get_sink()
+        self._heap = []         # (reminder_datetime, EVENT, event id) or (next_reminder_at, SERIES, series id)
+        self._queued = set()    # (kind, key) of the entries currently in the heap
+        self._next_refill = 0.0
+
+    def refill(self, now):
+        """Loads unsent reminders due within the lookahead window into the heap."""
+        horizon = now + timedelta(seconds=REMINDER_LOOKAHEAD)
+        expired_before = now - timedelta(seconds=REMINDER_GRACE)
+        with db_cursor() as (conn, cursor):
+            # Reminders missed by more than the grace period (worker down,
+            # tasks added with a reminder in the past) are retired unsent so
+            # they stay out of every future scan.
+            cursor.execute("""
+                UPDATE events SET reminde1 = TRUE
+                WHERE reminde1 = FALSE AND reminder_datetime < %s
+            """, (expired_before,))
+            if cursor.rowcount:
+                print(f"⚠️ Skipped {cursor.rowcount} reminder(s) overdue by more than {REMINDER_GRACE}s")
+            conn.commit()
+
+            cursor.execute("""
+                SELECT id, reminder_datetime FROM events
+                WHERE reminde1 = FALSE AND reminder_datetime >= %s AND reminder_datetime < %s
+                ORDER BY reminder_datetime
+                LIMIT %s
+            """, (expired_before, horizon, REMINDER_HEAP_MAX))
+            rows = [(fire_at, EVENT, event_id) for event_id, fire_at in cursor.fetchall()]
+
+        with db_cursor(dictionary=True) as (conn, cursor):
+            # Overdue series reminders move on to the series' next one
+            overdue = load_series(cursor, "next_reminder_at < %s", (expired_before,))
+            self._advance(cursor, [(row, next_reminder_at(row, expired_before)) for row in overdue])
+            if overdue:
+                print(f"⚠️ Skipped {len(overdue)} recurring reminder(s) overdue by more than {REMINDER_GRACE}s")
+            conn.commit()
+
+            cursor.execute("""
+                SELECT id, next_reminder_at FROM event_series
+                WHERE next_reminder_at >= %s AND next_reminder_at < %s
+                ORDER BY next_reminder_at
+                LIMIT %s
+            """, (expired_before, horizon, REMINDER_HEAP_MAX))
+            rows += [(row['next_reminder_at'], SERIES, row['id']) for row in cursor.fetchall()]
+
+        added = 0
+        for fire_at, kind, key in rows:
+            if (kind, key) not in self._queued:
+                heapq.heappush(self._heap, (fire_at, kind, key))
+                self._queued.add((kind, key))
+                added += 1
+        if added:
+            print(f"⏰ Queued {added} reminder(s) due before {horizon:%Y-%m-%d %H:%M:%S}")
+
+    def _series_reminders(self, cursor, series):
+        """
+        (series row, reminder or None) for series rows whose next_reminder_at
+        is due: the reminder of that occurrence, or None when the occurrence
+        is done or cancelled (or the setting is no longer a valid reminder).
+        """
+        due = []
+        for row in series:
+            offset = reminder_offset(row['reminder_setting'])
+            if offset is None or row['start_minute'] is None:
+                due.append((row, None))
+                continue
+            fire_at = row['next_reminder_at']
+            day = (fire_at + offset - timedelta(minutes=int(row['start_minute']))).date()
+            due.append((row, day))
+        days = [day for _, day in due if day is not None]
+        overrides = load_overrides(cursor, [row['id'] for row, _ in due], min(days), max(days)) if days else {}
+
+        found = []
+        for row, day in due:
+            override = day and overrides.get((row['id'], day.isoformat()))
+            if day is None or (override and (override['done'] or override['cancelled'])):
+                found.append((row, None))
+                continue
+            found.append((row, {
+                'id': None, 'series_id': row['id'], 'user_id': row['user_id'], 'title': row['title'],
+                'category': row['category'], 'date': day.isoformat(), 'time': row['time'],
+                'reminder_setting': row['reminder_setting'], 'reminder_datetime': row['next_reminder_at'],
+            }))
+        return found
+
+    def _advance(self, cursor, moves):
+        """
+        Sets next_reminder_at for (series row, new value) pairs, unless another
+        dispatcher or an edit already moved it from the value the row was read with.
+        """
+        if moves:
+            cursor.executemany("""
+                UPDATE event_series SET next_reminder_at = %s
+                WHERE id = %s AND next_reminder_at = %s
+            """, [(fire_at, row['id'], row['next_reminder_at']) for row, fire_at in moves])
+
+    def dispatch_due(self, now):
+        """Delivers up to one batch of due reminders. Returns how many were sent."""
+        due_ids, due_series = [], []
+        while self._heap and self._heap[0][0] <= now and len(due_ids) + len(due_series) < REMINDER_BATCH_SIZE:
+            fire_at, kind, key = heapq.heappop(self._heap)
+            self._queued.discard((kind, key))
+            if kind == EVENT:
+                due_ids.append(key)
+            else:
+                due_series.append(key)
+        if not due_ids and not due_series:
+            return 0
+
+        with db_cursor(dictionary=True) as (conn, cursor):
+            reminders = []
+            if due_ids:
+                # Tasks may have been deleted, completed, re-timed or handled by
+                # another dispatcher since they were queued.
+                cursor.execute(f"""
+                    SELECT {_REMINDER_COLUMNS} FROM events
+                    WHERE id IN ({", ".join(["%s"] * len(due_ids))}) AND reminde1 = FALSE AND done = FALSE
+                      AND reminder_datetime <= %s
+                """, (*due_ids, now))
+                reminders = cursor.fetchall()
+            series_reminders = []
+            if due_series:
+                # Same re-check for series (deleted, or advanced by another dispatcher)
+                series_reminders = self._series_reminders(cursor, load_series(
+                    cursor, f"id IN ({', '.join(['%s'] * len(due_series))}) AND next_reminder_at <= %s",
+                    (*due_series, now)))
+            sendable = {r['id'] for r in reminders}
+            skipped_ids = [event_id for event_id in due_ids if event_id not in sendable]
+            if skipped_ids:
+                # Completed since they were queued: marked like sent ones so no
+                # refill or catch-up query ever picks them up again
+                cursor.execute(f"""
+                    UPDATE events SET reminde1 = TRUE
+                    WHERE id IN ({", ".join(["%s"] * len(skipped_ids))}) AND reminde1 = FALSE AND done = TRUE
+                """, skipped_ids)
+            to_send = reminders + [reminder for _, reminder in series_reminders if reminder]
+            if not to_send and not series_reminders:
+                conn.commit()
+                return 0
+
+            if to_send:
+                try:
+                    self.sink.send(to_send)
+                except Exception as e:
+                    # Left unsent; the next refill queues them again.
+                    print(f"❌ Reminder delivery failed for {len(to_send)} reminder(s): {e}")
+                    conn.commit()  # only the skipped rows' marks so far
+                    return 0
+
+            if reminders:
+                sent_ids = [r['id'] for r in reminders]
+                cursor.execute(f"""
+                    UPDATE events SET reminde1 = TRUE
+                    WHERE id IN ({", ".join(["%s"] * len(sent_ids))}) AND reminde1 = FALSE
+                """, sent_ids)
+            self._advance(cursor, [(row, next_reminder_at(row, row['next_reminder_at'])) for row, _ in series_reminders])
+            conn.commit()
+        return len(to_send)
+
+    def seconds_until_next(self, now):
+        """How long the loop may sleep before a reminder is due or a refill is needed."""
+        wait = self._next_refill - time.monotonic()
+        if self._heap:
+            wait = min(wait, (self._heap[0][0] - now).total_seconds())
+        return max(0.0, wait)
+
+    def run_once(self):
+        now = local_now()
+        if time.monotonic() >= self._next_refill:
+            self.refill(now)
+            self._next_refill = time.monotonic() + REMINDER_REFILL_INTERVAL
+        sent = self.dispatch_due(now)
+        while sent == REMINDER_BATCH_SIZE:
+            sent = self.dispatch_due(now)
+
+    def run_forever(self):
+        print(f"🚀 Reminder scheduler started (sink: {type(self.sink).__name__}, lookahead: {REMINDER_LOOKAHEAD}s)")
+        while True:
+            try:
+                self.run_once()
+            except (Error, DatabaseUnavailable) as e:
+                print(f"❌ Reminder scheduler database error: {e}")
+                self._next_refill = time.monotonic() + REMINDER_REFILL_INTERVAL
+            time.sleep(min(self.seconds_until_next(local_now()), REMINDER_REFILL_INTERVAL))
+
+
+if __name__ == "__main__":
+    ReminderScheduler().run_forever()
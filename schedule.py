@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify, request
-from database import get_db_connection
+from database import get_db_connection, DatabaseUnavailable
+from month_view import get_month_days
+from day_intervals import free_slots, parse_slot_query, slots_reply
 from mysql.connector import Error
 from datetime import datetime
 
@@ -18,7 +20,7 @@ def get_all_tasks(user_id):
         cursor = conn.cursor(dictionary=True)
         # Fetches all tasks and orders them by date and time
         query = """
-            SELECT id, title, description, category, date, time, done, reminder_setting 
+            SELECT id, title, description, category, date, time, duration_minutes, done, reminder_setting, enhancement_status
             FROM events 
             WHERE user_id = %s
             ORDER BY date, time
@@ -46,30 +48,31 @@ def get_events_for_month(user_id):
     if not year or not month:
         return jsonify({"error": "Year and month parameters are required"}), 400
 
-    conn = get_db_connection()
-    if not conn:
+    try:
+        return jsonify(get_month_days(user_id, year, month))
+    except DatabaseUnavailable:
         return jsonify({"error": "Database connection failed"}), 500
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
 
-    try:
-        cursor = conn.cursor(dictionary=True)
-        date_pattern = f"{year}-{int(month):02d}-%"
-        cursor.execute("SELECT date, done FROM events WHERE user_id = %s AND date LIKE %s", (user_id, date_pattern))
-        events = cursor.fetchall()
 
-        events_by_day = {}
-        for event in events:
-            day = int(event['date'].split('-')[2])
-            if day not in events_by_day:
-                events_by_day[day] = {'hasPending': False, 'hasCompleted': False}
-            if event['done']:
-                events_by_day[day]['hasCompleted'] = True
-            else:
-                events_by_day[day]['hasPending'] = True
+@schedule_bp.route("/api/<user_id>/schedule/free-slots")
+def get_free_slots(user_id):
+    """
+    Open slots per day between start and end (YYYY-MM-DD, end defaults to
+    start), within day_start-day_end working hours (HH:MM, default
+    09:00-18:00), at least min_minutes long (default 30).
+    """
+    try:
+        query = parse_slot_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        return jsonify(events_by_day)
+    try:
+        days = free_slots(user_id, *query)
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
     except Error as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
\ No newline at end of file
+
+    return jsonify(slots_reply(*query, days))
@@ -0,0 +1,187 @@
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import timedelta
+
+import date_parser
+from chat_history import estimate_tokens
+from database import db_cursor, on_events_changed
+from recurrence import load_occurrences
+
+# CURRENT SCHEDULE block for chat prompts. A user's upcoming events are read
+# once and kept here as pre-rendered lines (with their token estimates) until
+# the user's events change, the day rolls over, or SCHEDULE_CONTEXT_CACHE_TTL
+# passes (writes handled by another worker). Each turn then picks the lines
+# most relevant to the message - events on the dates it mentions, events
+# sharing its keywords, then the soonest - up to SCHEDULE_CONTEXT_TOKEN_BUDGET.
+TOKEN_BUDGET = int(os.getenv("SCHEDULE_CONTEXT_TOKEN_BUDGET", "400"))
+CACHE_TTL = float(os.getenv("SCHEDULE_CONTEXT_CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("SCHEDULE_CONTEXT_CACHE_SIZE", "2000"))
+MAX_EVENTS = int(os.getenv("SCHEDULE_CONTEXT_MAX_EVENTS", "200"))
+# Without a horizon, recurring-event occurrences are expanded this far ahead
+SERIES_DAYS = int(os.getenv("SCHEDULE_CONTEXT_SERIES_DAYS", "31"))
+
+_WORD_RE = re.compile(r"[a-z0-9']{3,}")
+_STOPWORDS = {
+    'the', 'and', 'for', 'with', 'what', 'when', 'where', 'which', 'who', 'how', 'have', 'has',
+    'had', 'are', 'was', 'were', 'will', 'can', 'could', 'should', 'would', 'about', 'any', 'all',
+    'this', 'that', 'these', 'those', 'from', 'into', 'there', 'their', 'them', 'you', 'your',
+    'my', 'mine', "i'm", 'do', 'does', 'did', 'not', 'but', 'get', 'got', 'today', 'tomorrow',
+    'week', 'next', 'schedule', 'calendar', 'events', 'event', 'tasks', 'task', 'please', 'tell', 'show',
+}
+
+_cache = OrderedDict()   # (user_id, horizon_days) -> (generation, expires_at, anchor, events)
+_generations = {}        # user_id -> bumped on every write; dropped with the user's last entry/load
+_holders = Counter()     # user_id -> cached entries + loads in flight
+_stats = {"hits": 0, "misses": 0}
+_lock = threading.Lock()
+
+
+def _keywords(text):
+    return {w for w in _WORD_RE.findall((text or '').lower()) if w not in _STOPWORDS}
+
+
+def _load_events(user_id, anchor, horizon_days):
+    """
+    Upcoming pending events and recurring-event occurrences as
+    [(date, time, keywords, line, tokens)], cached per user.
+    """
+    key = (user_id, horizon_days)
+    with _lock:
+        generation = _generations.get(user_id, 0)
+        entry = _cache.get(key)
+        if entry and entry[0] == generation and entry[1] > time.monotonic() and entry[2] == anchor:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return entry[3]
+        _stats["misses"] += 1
+        _holders[user_id] += 1
+
+    events = None
+    try:
+        events = _query_events(user_id, anchor, horizon_days)
+    finally:
+        with _lock:
+            # Skip caching if the load failed or a write landed meanwhile.
+            if events is not None and _generations.get(user_id, 0) == generation:
+                if key not in _cache:
+                    _holders[user_id] += 1
+                _cache[key] = (generation, time.monotonic() + CACHE_TTL, anchor, events)
+                _cache.move_to_end(key)
+                while len(_cache) > CACHE_MAX_ENTRIES:
+                    _release(_cache.popitem(last=False)[0][0])
+            _release(user_id)
+    return events
+
+
+def _release(user_id):
+    """Drops one hold on the user (under _lock), and their generation with the last one."""
+    _holders[user_id] -= 1
+    if _holders[user_id] <= 0:
+        del _holders[user_id]
+        _generations.pop(user_id, None)
+
+
+def _query_events(user_id, anchor, horizon_days):
+    """Uncached _load_events."""
+    query = """
+        SELECT title, category, DATE_FORMAT(date, '%Y-%m-%d') AS date, TIME_FORMAT(time, '%H:%i') AS time
+        FROM events
+        WHERE user_id = %s AND date >= %s AND done = FALSE
+    """
+    params = [user_id, anchor]
+    if horizon_days is not None:
+        query += " AND date <= %s"
+        params.append(anchor + timedelta(days=horizon_days))
+    query += " ORDER BY date, time LIMIT %s"
+    params.append(MAX_EVENTS)
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+
+    # Occurrences up to the horizon, or up to the last event that fit in
+    # MAX_EVENTS; without either, SERIES_DAYS ahead
+    if horizon_days is not None:
+        last_day = anchor + timedelta(days=horizon_days)
+    elif len(rows) >= MAX_EVENTS:
+        last_day = rows[-1]['date']
+    else:
+        last_day = anchor + timedelta(days=SERIES_DAYS)
+    occurrences = [occurrence for occurrence in load_occurrences([user_id], anchor, last_day) if not occurrence['done']]
+    if occurrences:
+        rows = sorted(rows + occurrences, key=lambda row: (row['date'], row['time'] or ''))[:MAX_EVENTS]
+
+    events = []
+    for row in rows:
+        line = f"- On {row['date']} at {row['time']}: {row['title']}\n"
+        events.append((row['date'], row['time'] or '', _keywords(f"{row['title']} {row['category'] or ''}"),
+                       line, estimate_tokens(line)))
+    return events
+
+
+def _select(events, message, anchor, budget):
+    """Indexes of the events to show: most relevant first, within budget tokens."""
+    dates, date_range, words = set(), None, _keywords(message)
+    if message:
+        dates = {d.strftime('%Y-%m-%d') for _, _, d in date_parser.find_dates(message.lower(), anchor)}
+        found_range = date_parser.parse_date_range(message, anchor)
+        if found_range and found_range[0] != found_range[1]:
+            date_range = tuple(d.strftime('%Y-%m-%d') for d in found_range)
+
+    def score(i):
+        event_date, _, keywords, _, _ = events[i]
+        relevance = 0
+        if event_date in dates:
+            relevance += 10
+        elif date_range and date_range[0] <= event_date <= date_range[1]:
+            relevance += 6
+        relevance += 3 * len(words & keywords)
+        # Ties go to the soonest event (events are in date order).
+        return (-relevance, i)
+
+    chosen, used = [], 0
+    for i in sorted(range(len(events)), key=score):
+        tokens = events[i][4]
+        if used + tokens > budget:
+            continue
+        chosen.append(i)
+        used += tokens
+    return sorted(chosen)
+
+
+def build_schedule_context(user_id, message="", horizon_days=None, tz_name=None, budget=TOKEN_BUDGET):
+    """
+    CURRENT SCHEDULE text for a chat prompt: the user's upcoming events (within
+    horizon_days if given) most relevant to message, at most budget tokens.
+    tz_name picks the date_parser.today() timezone (None = server local).
+    """
+    anchor = date_parser.today(tz_name)
+    events = _load_events(user_id, anchor, horizon_days)
+    period = f"for the next {horizon_days} days" if horizon_days is not None else ""
+
+    if not events:
+        return f"The user's schedule {period} is clear." if period else "The user's schedule is clear."
+
+    chosen = _select(events, message, anchor, budget)
+    header = f"Here is the user's schedule {period}:\n" if period else "Here is the user's upcoming schedule:\n"
+    context = header + "".join(events[i][3] for i in chosen)
+    hidden = len(events) - len(chosen)
+    if hidden:
+        context += f"\n({hidden} more upcoming events not shown; ask about a date to see them)\n"
+    return context
+
+
+def context_stats():
+    """Cache hit/miss counters, for /health."""
+    with _lock:
+        return dict(_stats, entries=len(_cache))
+
+
+@on_events_changed
+def invalidate_user(user_id):
+    """Drops the user's cached schedule."""
+    with _lock:
+        if user_id in _holders:
+            _generations[user_id] = _generations.get(user_id, 0) + 1
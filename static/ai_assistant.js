@@ -5,6 +5,14 @@ document.addEventListener('DOMContentLoaded', () => {
     const sendButton = document.getElementById('ai-send-btn');
     const logoutBtn = document.getElementById('logout-btn');
 
+    // Page is served at /aiAssistant/<user_id>
+    const userId = decodeURIComponent(window.location.pathname.split('/').filter(Boolean).pop() || '');
+    // Chat history lives on the server; we only keep the conversation id
+    let conversationId = sessionStorage.getItem('scoutConversationId');
+    // Values the stream couldn't put in the session (e.g. a bulk delete waiting
+    // for "yes"); sent back once with the next message
+    let pending = null;
+
     // --- CALENDAR Elements ---
     const calendarGrid = document.getElementById('calendar-grid');
     let calendarDate = new Date();
@@ -21,33 +29,81 @@ document.addEventListener('DOMContentLoaded', () => {
         appendMessage(message, 'outgoing');
 
         const typingIndicator = appendMessage('...', 'incoming', true);
+        const sentPending = pending;
+        pending = null;
 
         try {
-            const response = await fetch('/api/ai/chat', {
+            const response = await fetch('/api/ai/chat/stream', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ message: message }),
+                body: JSON.stringify({ message: message, user_id: userId, conversation_id: conversationId, pending: sentPending }),
             });
 
-            typingIndicator.remove();
-
             if (!response.ok) {
+                typingIndicator.remove();
                 const errorData = await response.json();
                 throw new Error(errorData.error || 'An error occurred.');
             }
 
-            const data = await response.json();
-            appendMessage(data.reply, 'incoming');
+            // Server-Sent Events: render reply tokens as they arrive.
+            let replyBubble = null;
+            let replyText = '';
+            await readEventStream(response, (event, data) => {
+                if (event === 'events' && data.pending && Object.keys(data.pending).length) {
+                    pending = data.pending;
+                }
+                if (event === 'events' && data.creation_message) {
+                    typingIndicator.remove();
+                    appendMessage(data.events_created ? `✅ ${data.creation_message}` : data.creation_message, 'incoming');
+                } else if (event === 'token') {
+                    if (!replyBubble) {
+                        typingIndicator.remove();
+                        replyBubble = appendMessage('', 'incoming');
+                    }
+                    replyText += data.text;
+                    replyBubble.textContent = replyText;
+                    chatWindow.scrollTop = chatWindow.scrollHeight;
+                } else if (event === 'done' && data.conversation_id) {
+                    conversationId = data.conversation_id;
+                    sessionStorage.setItem('scoutConversationId', conversationId);
+                } else if (event === 'error') {
+                    throw new Error(data.error);
+                }
+            });
 
         } catch (error) {
             appendMessage(`Error: ${error.message}`, 'incoming', false, true);
         } finally {
+            typingIndicator.remove();
             inputTextArea.disabled = false;
             sendButton.disabled = false;
             inputTextArea.focus();
         }
     };
 
+    const readEventStream = async (response, onEvent) => {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
+    };
+
     const appendMessage = (text, type, isTyping = false, isError = false) => {
         const messageBubble = document.createElement('div');
         messageBubble.classList.add(type === 'outgoing' ? 'user-message-bubble' : 'ai-message-bubble');
@@ -0,0 +1,89 @@
+import os
+
+from mysql.connector import Error
+
+from database import db_cursor, notify_events_changed, DatabaseUnavailable
+from job_queue import job_handler, submit, QueueFull
+
+# Background AI enhancement for /api/<user_id>/ai/add-task. With
+# AI_ENHANCE_MODE=async the task is inserted right away with the user's own
+# description and enhancement_status = 'pending', and an "enhance_task" job
+# (see job_queue.py) asks the LLM for a better description/category and
+# rewrites the row. The status moves to 'done' (AI answer), 'fallback' (AI
+# failed, template text used) or 'failed'; clients poll
+# GET /api/<user_id>/ai/tasks/<id>/enhancement or re-read their task list,
+# which carries enhancement_status.
+ENHANCE_MODE = os.getenv("AI_ENHANCE_MODE", "sync").lower()
+
+PENDING, DONE, FALLBACK, FAILED, SKIPPED = "pending", "done", "fallback", "failed", "skipped"
+
+
+def enqueue(task_id, user_id, title, description, category):
+    """
+    Queues enhancement for an inserted task. Returns False (and marks the
+    task 'skipped') when the job queue is full or unreachable.
+    """
+    try:
+        submit("enhance_task", user_id, {
+            "task_id": task_id, "title": title, "description": description, "category": category
+        })
+        return True
+    except (QueueFull, Error, DatabaseUnavailable) as e:
+        print(f"⚠️ Could not queue enhancement, task {task_id} keeps its original description: {e}")
+        _set_status(task_id, user_id, SKIPPED)
+        return False
+
+
+# Safe to re-run: the row is only rewritten while still pending.
+@job_handler("enhance_task", retry=True)
+def _enhance_task_job(user_id, payload):
+    from ai_scheduler import ai_enhance_task_data  # ai_scheduler imports this module
+
+    task_id = payload['task_id']
+    description, category = payload['description'], payload['category']
+    try:
+        result = ai_enhance_task_data(payload['title'], description, category)
+    except Exception as e:
+        print(f"❌ Enhancement failed for task {task_id}: {e}")
+        result = None
+
+    if not result or not result.get('success'):
+        _set_status(task_id, user_id, FAILED)
+        return {"task_id": task_id, "enhancement_status": FAILED}
+
+    status = FALLBACK if result.get('fallback_used') else DONE
+    with db_cursor() as (conn, cursor):
+        # Only while still pending, so a task deleted meanwhile isn't touched.
+        cursor.execute("""
+            UPDATE events SET description = %s, category = %s, enhancement_status = %s
+            WHERE id = %s AND user_id = %s AND enhancement_status = %s
+        """, (result.get('enhanced_description', description), result.get('enhanced_category', category),
+              status, task_id, user_id, PENDING))
+        updated = cursor.rowcount
+        conn.commit()
+    if updated:
+        notify_events_changed(user_id)
+        print(f"✨ Task {task_id} enhanced ({status})")
+    return {"task_id": task_id, "enhancement_status": status if updated else None}
+
+
+def _set_status(task_id, user_id, status):
+    try:
+        with db_cursor() as (conn, cursor):
+            cursor.execute(
+                "UPDATE events SET enhancement_status = %s WHERE id = %s AND user_id = %s AND enhancement_status = %s",
+                (status, task_id, user_id, PENDING)
+            )
+            conn.commit()
+    except (Error, DatabaseUnavailable) as e:
+        print(f"❌ Could not update enhancement status for task {task_id}: {e}")
+
+
+def get_enhancement(task_id, user_id):
+    """The task's enhancement status with its current description/category, or None if not found."""
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute("""
+            SELECT id, title, description, category, enhancement_status
+            FROM events WHERE id = %s AND user_id = %s
+        """, (task_id, user_id))
+        return cursor.fetchone()
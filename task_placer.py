@@ -0,0 +1,182 @@
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytz
+
+from day_intervals import DayIntervals, load_days, to_minutes, format_minutes, parse_duration, DEFAULT_DURATION_MINUTES
+
+# Places AI-generated tasks around the user's existing events. The LLM's
+# date/time is only the preferred slot: every task gets candidate starts on
+# a PLACEMENT_STEP_MINUTES grid within PLACEMENT_DAY_START-PLACEMENT_DAY_END
+# on its date and the next PLACEMENT_SEARCH_DAYS - 1 days, ranked
+#   1. the requested time, 2. the category's preferred hours, 3. the rest,
+# nearest to the requested time first. Candidates that hit an existing event
+# are dropped up front; a depth-first search then assigns the most
+# constrained tasks first and backtracks when two new tasks collide. When
+# the search runs out of PLACEMENT_MAX_STEPS it falls back to first-fit.
+# There is no randomness: the same tasks and calendar give the same plan.
+STEP_MINUTES = int(os.getenv("PLACEMENT_STEP_MINUTES", "15"))
+DAY_START = to_minutes(os.getenv("PLACEMENT_DAY_START", "07:00"))
+DAY_END = to_minutes(os.getenv("PLACEMENT_DAY_END", "22:00"))
+SEARCH_DAYS = int(os.getenv("PLACEMENT_SEARCH_DAYS", "3"))
+MAX_STEPS = int(os.getenv("PLACEMENT_MAX_STEPS", "20000"))
+
+KEPT, MOVED, UNPLACED = "kept", "moved", "unplaced"
+
+# Preferred hours per category, as (start, end) minutes after midnight
+CATEGORY_WINDOWS = {
+    'work': [(9 * 60, 18 * 60)],
+    'meeting': [(9 * 60, 18 * 60)],
+    'finance': [(10 * 60, 17 * 60)],
+    'health': [(9 * 60, 17 * 60)],
+    'education': [(9 * 60, 20 * 60)],
+    'learning': [(9 * 60, 20 * 60)],
+    'fitness': [(6 * 60, 9 * 60), (17 * 60, 21 * 60)],
+    'sports': [(6 * 60, 9 * 60), (17 * 60, 21 * 60)],
+    'social': [(18 * 60, 22 * 60)],
+    'fun': [(18 * 60, 22 * 60)],
+    'shopping': [(10 * 60, 20 * 60)],
+    'errands': [(10 * 60, 20 * 60)],
+    'maintenance': [(9 * 60, 18 * 60)],
+}
+
+
+class _OutOfSteps(Exception):
+    pass
+
+
+def _candidates(task, duration, busy, not_before):
+    """
+    (slots, requested_free): the (date, start) slots for a task, best first,
+    that don't hit an existing event, and whether its requested slot is one.
+    """
+    requested_day = datetime.strptime(task['date'], '%Y-%m-%d').date()
+    try:
+        requested = to_minutes(task['time'])
+    except (ValueError, TypeError, KeyError):
+        requested = None
+    windows = CATEGORY_WINDOWS.get(str(task.get('category', '')).lower(), [])
+    first_start = -(-DAY_START // STEP_MINUTES) * STEP_MINUTES  # first grid point at or after DAY_START
+
+    ranked = []
+    for offset in range(SEARCH_DAYS):
+        day = (requested_day + timedelta(days=offset)).isoformat()
+        starts = set(range(first_start, DAY_END - duration + 1, STEP_MINUTES))
+        if offset == 0 and requested is not None:
+            starts.add(requested)
+        for start in starts:
+            if not_before and (day, start) < not_before:
+                continue
+            if busy.get(day) and busy[day].overlapping(start, start + duration):
+                continue
+            if offset == 0 and start == requested:
+                rank = 0
+            elif any(low <= start and start + duration <= high for low, high in windows):
+                rank = 1
+            else:
+                rank = 2
+            distance = abs(start - requested) if requested is not None else 0
+            ranked.append((offset, rank, distance, start, day))
+    ranked.sort()
+    return [(day, start) for _, _, _, start, day in ranked], bool(ranked) and ranked[0][1] == 0
+
+
+def plan(tasks, busy, not_before=None):
+    """
+    Assigns each task a conflict-free slot. tasks need 'date' (YYYY-MM-DD)
+    and may carry 'time', 'category' and 'duration_minutes'/'end_time';
+    busy is {date: DayIntervals} of existing events; not_before is an
+    optional (date, minute) bound for the earliest start. Returns a list,
+    in task order, of (date, start) or None when a task could not be placed.
+    """
+    durations = [parse_duration(task) or DEFAULT_DURATION_MINUTES for task in tasks]
+    candidates, requested_free = zip(*(_candidates(task, durations[i], busy, not_before)
+                                       for i, task in enumerate(tasks))) if tasks else ((), ())
+
+    # Tasks whose requested slot is free claim it first; then the most
+    # constrained (fewest candidates, longest); index breaks ties.
+    order = sorted((i for i in range(len(tasks)) if candidates[i]),
+                   key=lambda i: (not requested_free[i], len(candidates[i]), -durations[i], i))
+    placed = [None] * len(tasks)
+    planned = defaultdict(DayIntervals)
+    steps = 0
+
+    def search(k):
+        nonlocal steps
+        if k == len(order):
+            return True
+        i = order[k]
+        for day, start in candidates[i]:
+            steps += 1
+            if steps > MAX_STEPS:
+                raise _OutOfSteps()
+            end = start + durations[i]
+            if planned[day].overlapping(start, end):
+                continue
+            planned[day].add(start, end, i)
+            placed[i] = (day, start)
+            if search(k + 1):
+                return True
+            planned[day].remove(start, end, i)
+            placed[i] = None
+        return False
+
+    try:
+        if search(0):
+            return placed
+    except _OutOfSteps:
+        pass
+
+    # First fit in the same order; tasks that don't fit stay unplaced.
+    placed = [None] * len(tasks)
+    planned = defaultdict(DayIntervals)
+    for i in order:
+        for day, start in candidates[i]:
+            end = start + durations[i]
+            if not planned[day].overlapping(start, end):
+                planned[day].add(start, end, i)
+                placed[i] = (day, start)
+                break
+    return placed
+
+
+def place_tasks(user_id, tasks, tz_name='Asia/Kolkata'):
+    """
+    Moves generated tasks into free slots of the user's calendar, none
+    earlier than now in tz_name. Returns (tasks, stats): copies of the tasks
+    with date/time set and a 'placement' of kept, moved or unplaced (left
+    at the LLM's slot).
+    """
+    valid = [task for task in tasks if _has_date(task)]
+    dates = set()
+    for task in valid:
+        first = datetime.strptime(task['date'], '%Y-%m-%d').date()
+        dates.update((first + timedelta(days=offset)).isoformat() for offset in range(SEARCH_DAYS))
+    busy = load_days(user_id, dates)
+
+    now = datetime.now(pytz.timezone(tz_name))
+    slots = iter(plan(valid, busy, not_before=(now.date().isoformat(), now.hour * 60 + now.minute)))
+
+    result, stats = [], {KEPT: 0, MOVED: 0, UNPLACED: 0}
+    for task in tasks:
+        slot = next(slots) if _has_date(task) else None
+        task = dict(task)
+        if slot is None:
+            task['placement'] = UNPLACED
+        else:
+            day, start = slot
+            time = format_minutes(start)
+            task['placement'] = KEPT if (day, time) == (task['date'], task.get('time')) else MOVED
+            task['date'], task['time'] = day, time
+        stats[task['placement']] += 1
+        result.append(task)
+    return result, stats
+
+
+def _has_date(task):
+    try:
+        datetime.strptime(str(task.get('date')), '%Y-%m-%d')
+        return True
+    except ValueError:
+        return False
@@ -1,5 +1,8 @@
 from flask import Blueprint, request, jsonify
-from database import get_db_connection
+from database import get_db_connection, notify_events_changed, DatabaseUnavailable
+from month_view import get_month_days
+from event_aggregates import record_insert
+from day_intervals import parse_duration
 from mysql.connector import Error
 from datetime import datetime, timedelta
 import pytz  # You may need to run: pip install pytz
@@ -19,6 +22,7 @@ def add_task(user_id):
     date = data.get('date')
     time = data.get('time')
     reminder_setting = data.get('reminder_setting')
+    duration_minutes = parse_duration(data)  # optional: duration_minutes or end_time
 
     if not all([title, category, date, time, reminder_setting]):
         return jsonify({"error": "Please fill out all required fields."}), 400
@@ -53,18 +57,21 @@ def add_task(user_id):
         query = """
             INSERT INTO events 
             (user_id, title, description, category, date, time, done, 
-             reminder_setting, reminder_datetime, reminde1, reminde2, reminde3, reminde4)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+             reminder_setting, reminder_datetime, reminde1, reminde2, reminde3, reminde4, duration_minutes)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
         values = (
             user_id, title, description, category, date, time, False,
-            reminder_setting, reminder_datetime_str, False, False, False, False
+            reminder_setting, reminder_datetime_str, False, False, False, False, duration_minutes
         )
         
         cursor.execute(query, values)
+        task_id = cursor.lastrowid
+        record_insert(cursor, user_id, date)
         conn.commit()
+        notify_events_changed(user_id)
         
-        return jsonify({"message": "Task added successfully!", "task_id": cursor.lastrowid}), 201
+        return jsonify({"message": "Task added successfully!", "task_id": task_id}), 201
 
     except Error as e:
         return jsonify({"error": f"Database error: {e}"}), 500
@@ -88,46 +95,21 @@ def get_events_for_month(user_id):
     if not year or not month:
         return jsonify({"error": "Year and month parameters are required"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
     try:
-        cursor = conn.cursor(dictionary=True)
-        
-        # Query 1: Get days with at least one PENDING task
-        pending_query = """
-            SELECT DISTINCT DAY(STR_TO_DATE(date, '%Y-%m-%d')) as event_day 
-            FROM events 
-            WHERE user_id = %s AND done = FALSE
-            AND YEAR(STR_TO_DATE(date, '%Y-%m-%d')) = %s 
-            AND MONTH(STR_TO_DATE(date, '%Y-%m-%d')) = %s
-        """
-        cursor.execute(pending_query, (user_id, year, month))
-        pending_days = [row['event_day'] for row in cursor.fetchall()]
+        days = get_month_days(user_id, year, month)
 
-        # Query 2: Get days that ONLY have COMPLETED tasks
-        completed_query = """
-            SELECT DAY(STR_TO_DATE(date, '%Y-%m-%d')) as event_day
-            FROM events
-            WHERE user_id = %s
-              AND YEAR(STR_TO_DATE(date, '%Y-%m-%d')) = %s
-              AND MONTH(STR_TO_DATE(date, '%Y-%m-%d')) = %s
-            GROUP BY date
-            HAVING SUM(CASE WHEN done = FALSE THEN 1 ELSE 0 END) = 0
-        """
-        cursor.execute(completed_query, (user_id, year, month))
-        completed_days = [row['event_day'] for row in cursor.fetchall() if row['event_day'] not in pending_days]
+        # Days with at least one PENDING task
+        pending_days = [day for day, flags in days.items() if flags['hasPending']]
+
+        # Days that ONLY have COMPLETED tasks
+        completed_days = [day for day, flags in days.items() if flags['hasCompleted'] and not flags['hasPending']]
         
         return jsonify({
             "pending": pending_days,
             "completed": completed_days
         })
         
+    except DatabaseUnavailable:
+        return jsonify({"error": "Database connection failed"}), 500
     except Error as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
-
@@ -0,0 +1,96 @@
+import pytest
+
+from chat_intent import (pre_classify, parse_combined_reply, match_delete_targets, needs_delete_confirmation,
+                         delete_confirmation, is_confirmation, PENDING_DELETE_KEY)
+
+EVENTS = [
+    {'id': 1, 'title': 'Team meeting', 'date': '2026-10-17'},
+    {'id': 2, 'title': 'Gym workout', 'date': '2026-10-17'},
+    {'id': 3, 'title': 'Team meeting', 'date': '2026-10-18'},
+    {'id': 4, 'title': 'Dentist', 'date': '2026-10-20'},
+]
+
+
+def ids(events):
+    return [event['id'] for event in events]
+
+
+def test_match_by_title_words():
+    assert ids(match_delete_targets(EVENTS, [{'title': 'gym'}])) == [2]
+    assert ids(match_delete_targets(EVENTS, [{'title': 'team meeting'}])) == [1, 3]
+    assert ids(match_delete_targets(EVENTS, [{'title': 'team gym'}])) == []
+
+
+def test_match_by_title_and_date():
+    assert ids(match_delete_targets(EVENTS, [{'title': 'meeting', 'date': '2026-10-18'}])) == [3]
+    assert ids(match_delete_targets(EVENTS, [{'title': 'null', 'date': '2026-10-17'}])) == [1, 2]
+
+
+def test_match_several_targets_once_each():
+    targets = [{'title': 'gym'}, {'title': 'dentist'}, {'title': 'workout'}]
+    assert ids(match_delete_targets(EVENTS, targets)) == [2, 4]
+
+
+def test_empty_targets_match_nothing():
+    assert match_delete_targets(EVENTS, [{'title': 'null', 'date': 'null'}, {'title': ''}]) == []
+    assert match_delete_targets(EVENTS, []) == []
+
+
+def test_delete_all_matches_everything_and_needs_confirmation():
+    matched = match_delete_targets(EVENTS, [], delete_all=True)
+    assert ids(matched) == [1, 2, 3, 4]
+    assert needs_delete_confirmation(matched, EVENTS, True)
+
+
+def test_confirmation_only_for_bulk_deletes():
+    assert not needs_delete_confirmation(EVENTS[:1], EVENTS, False)
+    assert not needs_delete_confirmation(EVENTS[:3], EVENTS, False)
+    assert needs_delete_confirmation(list(EVENTS), EVENTS, False)
+    assert not needs_delete_confirmation(EVENTS[:1], EVENTS[:1], False)   # a user's only event
+
+
+def test_delete_confirmation_parks_the_ids():
+    question, pending = delete_confirmation('u1', EVENTS)
+    assert "Delete 4 events" in question
+    assert pending == {PENDING_DELETE_KEY: {'user_id': 'u1', 'event_ids': [1, 2, 3, 4]}}
+
+
+@pytest.mark.parametrize("message", ["yes", "Yes!", "y", "ok", "yes please", "yes, delete them",
+                                     "confirm", "go ahead", "  Sure.  "])
+def test_is_confirmation(message):
+    assert is_confirmation(message)
+
+
+@pytest.mark.parametrize("message", ["no", "yesterday", "yes but not the gym", "delete my meeting", "", None])
+def test_is_not_confirmation(message):
+    assert not is_confirmation(message)
+
+
+@pytest.mark.parametrize("message, intent, skip", [
+    ("hi", "NO_EVENTS", True),
+    ("thanks so much!", "NO_EVENTS", True),
+    ("what can you do?", "QUESTION", True),
+    ("lunch with sam tomorrow at 1pm", "EVENTS_FOUND", False),
+    ("cancel my gym session", "DELETE_EVENTS", False),
+])
+def test_pre_classify(message, intent, skip):
+    guessed, _, skip_llm = pre_classify(message)
+    assert (guessed, skip_llm) == (intent, skip)
+
+
+def test_parse_combined_reply_accepts_a_fenced_reply():
+    reply = '```json\n{"intent": "delete_events", "events": [], "delete_targets": [{"title": "gym"}, "x"],' \
+            ' "delete_all": "true"}\n```'
+    assert parse_combined_reply(reply) == {
+        'intent': 'DELETE_EVENTS', 'events': [], 'delete_targets': [{'title': 'gym'}], 'delete_all': False}
+
+
+@pytest.mark.parametrize("reply", [
+    "no json here",
+    '{"intent": "MAYBE"}',
+    '{"intent": "EVENTS_FOUND", "events": [{"description": "untitled"}]}',
+    '{"intent": "NO_EVENTS", "events": {"title": "x"}}',
+])
+def test_parse_combined_reply_rejects_unusable_replies(reply):
+    with pytest.raises(ValueError):
+        parse_combined_reply(reply)
@@ -0,0 +1,83 @@
+from datetime import date
+
+import pytest
+
+from date_parser import parse_date, parse_date_range, parse_time, resolve_event_when
+
+ANCHOR = date(2026, 10, 17)     # a Saturday
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("meeting tomorrow at 10am", date(2026, 10, 18)),
+    ("the day after tomorrow", date(2026, 10, 19)),
+    ("lunch next friday", date(2026, 10, 23)),
+    ("this saturday", date(2026, 10, 17)),
+    ("call on monday", date(2026, 10, 19)),
+    ("in 2 weeks", date(2026, 10, 31)),
+    ("in three days", date(2026, 10, 20)),
+    ("dentist on 7", date(2026, 11, 7)),           # the 7th has passed this month
+    ("on the 20th", date(2026, 10, 20)),
+    ("oct 5", date(2027, 10, 5)),                  # rolled to next year
+    ("5th of december", date(2026, 12, 5)),
+    ("2026-12-31", date(2026, 12, 31)),
+    ("on 31", date(2026, 10, 31)),
+])
+def test_parse_date(text, expected):
+    assert parse_date(text, ANCHOR) == expected
+
+
+def test_parse_date_without_a_date():
+    assert parse_date("call mom at 5", ANCHOR) is None
+    assert parse_date("2026-02-30", ANCHOR) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("this week", (ANCHOR, date(2026, 10, 18))),
+    ("next week", (date(2026, 10, 19), date(2026, 10, 25))),
+    ("next weekend", (date(2026, 10, 24), date(2026, 10, 25))),
+    ("this month", (ANCHOR, date(2026, 10, 31))),
+    ("from monday to friday", (date(2026, 10, 19), date(2026, 10, 23))),
+    ("tomorrow", (date(2026, 10, 18), date(2026, 10, 18))),
+    ("whenever", None),
+])
+def test_parse_date_range(text, expected):
+    assert parse_date_range(text, ANCHOR) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("at 10am", "10:00"),
+    ("4:30 pm", "16:30"),
+    ("12 am", "00:00"),
+    ("12pm", "12:00"),
+    ("at 5", "17:00"),            # bare early hours read as afternoon
+    ("at 5 in the morning", "05:00"),
+    ("at 8 tonight", "20:00"),
+    ("05:30", "05:30"),
+    ("14:15", "14:15"),
+    ("noon", "12:00"),
+    ("midnight", "00:00"),
+    ("13 pm", None),
+    ("on the 5th", None),
+])
+def test_parse_time(text, expected):
+    assert parse_time(text) == expected
+
+
+def test_resolve_event_when_prefers_the_events_own_words():
+    event = {'title': 'Lunch', 'when': 'tomorrow at 1pm', 'date': '2030-01-01', 'time': '09:00'}
+
+    resolve_event_when(event, "lunch tomorrow at 1pm and gym on monday", ANCHOR)
+
+    assert (event['date'], event['time']) == ('2026-10-18', '13:00')
+    assert 'when' not in event
+
+
+def test_resolve_event_when_falls_back_to_the_llm_then_the_message():
+    llm = resolve_event_when({'date': '2026-11-02', 'time': '7:05'}, "sometime", ANCHOR)
+    assert (llm['date'], llm['time']) == ('2026-11-02', '07:05')
+
+    message = resolve_event_when({'when': 'evening'}, "dinner on friday evening", ANCHOR)
+    assert (message['date'], message['time']) == ('2026-10-23', '19:00')
+
+    ambiguous = resolve_event_when({'date': 'soon'}, "on friday or monday", ANCHOR)
+    assert (ambiguous['date'], ambiguous['time']) == ('2026-10-17', '09:00')
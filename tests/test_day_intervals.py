@@ -0,0 +1,127 @@
+from datetime import date
+
+import pytest
+
+import day_intervals
+from day_intervals import (DayIntervals, to_minutes, format_minutes, parse_duration, load_days, free_slots,
+                           group_free_slots, parse_slot_query, slots_reply, DEFAULT_DURATION_MINUTES)
+
+
+def fake_busy_rows(events):
+    """_busy_rows() over (user_id, 'YYYY-MM-DD', 'HH:MM', duration or None) tuples."""
+    def busy_rows(user_ids, first_day, last_day):
+        first = date.fromisoformat(str(first_day))
+        rows = sorted(event for event in events
+                      if event[0] in user_ids and str(first_day) <= event[1] <= str(last_day))
+        for i, (user_id, day, start, duration) in enumerate(rows):
+            row = {'id': i, 'user_id': user_id, 'title': f"Event {i}", 'category': 'work', 'date': day,
+                   'day_offset': (date.fromisoformat(day) - first).days, 'start_minute': to_minutes(start),
+                   'duration_minutes': duration}
+            yield row, to_minutes(start), to_minutes(start) + (duration or DEFAULT_DURATION_MINUTES)
+    return busy_rows
+
+
+def test_minutes_round_trip():
+    assert to_minutes("09:30") == 570 and to_minutes("09:30:59") == 570
+    assert format_minutes(570) == "09:30"
+    assert format_minutes(25 * 60) == "01:00"
+
+
+@pytest.mark.parametrize("data, expected", [
+    ({'duration_minutes': 45}, 45),
+    ({'duration_minutes': '90'}, 90),
+    ({'time': '09:00', 'end_time': '10:15'}, 75),
+    ({'time': '10:00', 'end_time': '09:00'}, None),
+    ({'duration_minutes': 0}, None),
+    ({'duration_minutes': 24 * 60 + 1}, None),
+    ({'duration_minutes': 'long'}, None),
+    ({'time': '09:00'}, None),
+])
+def test_parse_duration(data, expected):
+    assert parse_duration(data) == expected
+
+
+def test_overlapping_treats_intervals_as_half_open():
+    day = DayIntervals()
+    day.add(540, 600, 'a')      # 09:00-10:00
+    day.add(660, 690, 'b')      # 11:00-11:30
+
+    assert day.overlapping(600, 660) == []
+    assert [event for _, _, event in day.overlapping(599, 661)] == ['a', 'b']
+
+
+def test_overlapping_finds_a_long_event_that_started_earlier():
+    day = DayIntervals()
+    day.add(480, 1020, 'all day')   # 08:00-17:00
+    day.add(600, 630, 'short')
+
+    assert [event for _, _, event in day.overlapping(900, 930)] == ['all day']
+
+
+def test_remove_takes_out_only_the_given_event():
+    day = DayIntervals()
+    first, second = {'id': 1}, {'id': 2}
+    day.add(540, 600, first)
+    day.add(540, 600, second)
+
+    day.remove(540, 600, second)
+
+    assert len(day) == 1 and day.overlapping(540, 600)[0][2] is first
+
+
+def test_load_days_keeps_only_the_requested_dates(monkeypatch):
+    monkeypatch.setattr(day_intervals, "_busy_rows", fake_busy_rows([
+        ('u1', '2026-10-05', '09:00', 30), ('u1', '2026-10-06', '10:00', None), ('u1', '2026-10-07', '11:00', 60),
+    ]))
+
+    days = load_days('u1', ['2026-10-05', '2026-10-07'])
+
+    assert sorted(days) == ['2026-10-05', '2026-10-07']
+    (_, _, event), = days['2026-10-05'].overlapping(0, 24 * 60)
+    assert (event['time'], event['end_time']) == ('09:00', '09:30')
+
+
+def test_free_slots_between_events(monkeypatch):
+    monkeypatch.setattr(day_intervals, "_busy_rows", fake_busy_rows([
+        ('u1', '2026-10-05', '10:00', 60), ('u1', '2026-10-05', '10:30', 90), ('u1', '2026-10-05', '15:00', 10),
+    ]))
+
+    (day, gaps), = free_slots('u1', date(2026, 10, 5), date(2026, 10, 5), 9 * 60, 18 * 60, 30)
+
+    assert day == date(2026, 10, 5)
+    assert gaps == [(540, 600), (720, 900), (910, 1080)]
+
+
+def test_event_running_past_midnight_blocks_the_next_morning(monkeypatch):
+    monkeypatch.setattr(day_intervals, "_busy_rows", fake_busy_rows([('u1', '2026-10-04', '23:00', 11 * 60)]))
+
+    (_, gaps), = free_slots('u1', date(2026, 10, 5), date(2026, 10, 5), 9 * 60, 18 * 60, 30)
+
+    assert gaps == [(600, 1080)]
+
+
+def test_group_free_slots_intersects_everyone(monkeypatch):
+    monkeypatch.setattr(day_intervals, "_busy_rows", fake_busy_rows([
+        ('u1', '2026-10-05', '09:00', 60), ('u2', '2026-10-05', '11:00', 60),
+        ('u2', '2026-10-06', '09:00', 9 * 60),
+    ]))
+
+    result = group_free_slots(['u1', 'u2'], date(2026, 10, 5), date(2026, 10, 6), 9 * 60, 18 * 60, 60)
+
+    assert result == [(date(2026, 10, 5), [(600, 660), (720, 1080)]), (date(2026, 10, 6), [])]
+
+
+def test_parse_slot_query_defaults_and_errors():
+    assert parse_slot_query({'start': '2026-10-05'}) == (date(2026, 10, 5), date(2026, 10, 5), 540, 1080, 30)
+    assert parse_slot_query({'start': '2026-10-05', 'day_end': '00:00'})[3] == 24 * 60
+    for args in ({}, {'start': 'tomorrow'}, {'start': '2026-10-05', 'end': '2026-10-04'},
+                 {'start': '2026-10-05', 'day_start': '18:00', 'day_end': '09:00'},
+                 {'start': '2026-10-05', 'min_minutes': '0'}):
+        with pytest.raises(ValueError):
+            parse_slot_query(args)
+
+
+def test_slots_reply_shows_midnight_as_24_00():
+    body = slots_reply(date(2026, 10, 5), date(2026, 10, 5), 0, 24 * 60, 30, [(date(2026, 10, 5), [(1380, 1440)])])
+    assert body['day_end'] == "24:00"
+    assert body['days'][0]['free'] == [{"start": "23:00", "end": "24:00", "minutes": 60}]
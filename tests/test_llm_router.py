@@ -0,0 +1,151 @@
+import threading
+
+import pytest
+
+import llm_router
+from llm_router import ProviderHealth, LLMUnavailable, CLOSED, OPEN, HALF_OPEN
+
+
+def use_providers(monkeypatch, **adapters):
+    """Routes calls to the given name -> adapter(system, messages, max_tokens, temperature), in order."""
+    monkeypatch.setattr(llm_router, "PROVIDER_ORDER", list(adapters))
+    monkeypatch.setattr(llm_router, "_health", {name: ProviderHealth(name) for name in adapters})
+    monkeypatch.setattr(llm_router, "_hedge_stats", {})
+    for name, adapter in adapters.items():
+        monkeypatch.setitem(llm_router._ADAPTERS, name, adapter)
+
+
+def replies(text):
+    return lambda system, messages, max_tokens, temperature: text
+
+
+def fails(system, messages, max_tokens, temperature):
+    raise RuntimeError("provider down")
+
+
+def stats(name):
+    return llm_router.router_stats()[name]
+
+
+def test_fake_provider_echoes_the_last_message(monkeypatch):
+    monkeypatch.setattr(llm_router, "FAKE_REPLY", "")
+    use_providers(monkeypatch, fake=llm_router._call_fake)
+
+    assert llm_router.generate("hello") == ("(fake provider) You said: hello", "fake")
+
+
+def test_fake_provider_streams_its_reply_word_by_word(monkeypatch):
+    monkeypatch.setattr(llm_router, "FAKE_REPLY", "one two three")
+    monkeypatch.setattr(llm_router, "FAKE_TOKEN_DELAY", 0)
+    monkeypatch.setitem(llm_router._STREAMERS, "fake", llm_router._stream_fake)
+    use_providers(monkeypatch, fake=llm_router._call_fake)
+
+    chunks = list(llm_router.chat_stream([{"role": "user", "content": "hi"}]))
+
+    assert chunks == [("fake", "one"), ("fake", " two"), ("fake", " three")]
+    assert stats("fake")["calls"] == 1 and stats("fake")["failures"] == 0
+
+
+def test_fails_over_to_the_next_provider(monkeypatch):
+    use_providers(monkeypatch, a=fails, b=replies("ok"))
+
+    assert llm_router.generate("hi") == ("ok", "b")
+    assert stats("a")["failures"] == 1
+    assert stats("b")["calls"] == 1 and stats("b")["failures"] == 0
+
+
+def test_unconfigured_provider_is_skipped_without_a_failure(monkeypatch):
+    use_providers(monkeypatch, a=replies(None), b=replies("ok"))
+
+    assert llm_router.generate("hi") == ("ok", "b")
+    assert stats("a")["calls"] == 0
+
+
+def test_raises_when_every_provider_fails(monkeypatch):
+    use_providers(monkeypatch, a=fails, b=fails)
+
+    with pytest.raises(LLMUnavailable):
+        llm_router.generate("hi")
+
+
+def test_unusable_reply_counts_against_the_provider(monkeypatch):
+    def parse(text):
+        if text == "garbage":
+            raise ValueError("not JSON")
+        return {"parsed": text}
+
+    use_providers(monkeypatch, a=replies("garbage"), b=replies("good"))
+
+    assert llm_router.generate("hi", parse=parse) == ({"parsed": "good"}, "b")
+    assert stats("a")["unusable"] == 1 and stats("a")["failures"] == 0
+    assert stats("a")["consecutive_failures"] == 1
+    assert stats("a")["latency_ms"] is None     # never recorded as a success
+
+
+def test_breaker_opens_after_consecutive_failures(monkeypatch):
+    calls = []
+
+    def flaky(system, messages, max_tokens, temperature):
+        calls.append(1)
+        raise RuntimeError("timeout")
+
+    use_providers(monkeypatch, a=flaky, b=replies("ok"))
+    for _ in range(llm_router.BREAKER_THRESHOLD + 2):
+        assert llm_router.generate("hi") == ("ok", "b")
+
+    assert len(calls) == llm_router.BREAKER_THRESHOLD
+    assert stats("a")["state"] == OPEN
+
+
+def test_breaker_half_opens_for_one_probe_after_the_cooldown():
+    health = ProviderHealth("a")
+    for _ in range(llm_router.BREAKER_THRESHOLD):
+        health.record_failure(RuntimeError("down"), now=100.0)
+    assert health.state == OPEN and not health.try_acquire(100.0)
+
+    later = 100.0 + llm_router.BREAKER_COOLDOWN
+    assert health.try_acquire(later) and health.state == HALF_OPEN
+    assert not health.try_acquire(later)        # one probe at a time
+
+    health.record_failure(RuntimeError("still down"), now=later)
+    assert health.state == OPEN and health.cooldown == 2 * llm_router.BREAKER_COOLDOWN
+
+    assert health.try_acquire(later + health.cooldown)
+    health.record_success(0.2)
+    assert health.state == CLOSED and health.cooldown == llm_router.BREAKER_COOLDOWN
+
+
+def test_hedged_call_takes_the_faster_provider(monkeypatch):
+    release = threading.Event()
+
+    def slow(system, messages, max_tokens, temperature):
+        release.wait(5)
+        return "slow"
+
+    monkeypatch.setattr(llm_router, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(llm_router, "HEDGE_DELAY", 0.05)
+    use_providers(monkeypatch, a=slow, b=replies("fast"))
+    try:
+        assert llm_router.generate("hi", hedge=True, label="test hedge") == ("fast", "b")
+    finally:
+        release.set()
+
+    hedging = llm_router.router_stats()["hedging"]["test hedge"]
+    assert hedging == {"requests": 1, "hedges": 1, "wins": {"b": 1}}
+
+
+def test_hedging_waits_for_a_provider_within_its_budget(monkeypatch):
+    monkeypatch.setattr(llm_router, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(llm_router, "HEDGE_DELAY", 5)
+    use_providers(monkeypatch, a=replies("first"), b=replies("second"))
+
+    assert llm_router.generate("hi", hedge=True, label="test no hedge") == ("first", "a")
+    assert llm_router.router_stats()["hedging"]["test no hedge"]["hedges"] == 0
+
+
+def test_calls_without_hedge_are_never_hedged(monkeypatch):
+    monkeypatch.setattr(llm_router, "HEDGING_ENABLED", True)
+    use_providers(monkeypatch, a=replies("first"), b=replies("second"))
+
+    assert llm_router.generate("hi") == ("first", "a")
+    assert "hedging" not in llm_router.router_stats()
@@ -0,0 +1,107 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from recurrence import parse_rrule, occurrences, last_occurrence, reminder_offset, next_reminder_at, expand
+
+
+def series(rrule='FREQ=DAILY', start=date(2026, 10, 1), time='09:00', reminder='15 minutes', until=None, **extra):
+    row = {
+        'id': 1, 'user_id': 'u1', 'title': 'Standup', 'description': '', 'category': 'work',
+        'start_date': start, 'rrule': rrule, 'rule': parse_rrule(rrule), 'until_date': until,
+        'time': time, 'start_minute': None if time is None else int(time[:2]) * 60 + int(time[3:]),
+        'duration_minutes': 15, 'reminder_setting': reminder, 'next_reminder_at': None,
+    }
+    row.update(extra)
+    return row
+
+
+@pytest.mark.parametrize("text", ["FREQ=HOURLY", "FREQ=DAILY;BYDAY=MO", "FREQ=WEEKLY;COUNT=2;UNTIL=20270101",
+                                  "FREQ=MONTHLY;BYMONTHDAY=0", "FREQ=DAILY;INTERVAL=0", "FREQ=DAILY;FOO=1"])
+def test_parse_rrule_rejects_unsupported_rules(text):
+    with pytest.raises(ValueError):
+        parse_rrule(text)
+
+
+def test_weekly_byday_with_interval():
+    rule = parse_rrule("RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE")
+    days = list(occurrences(rule, date(2026, 10, 5), date(2026, 10, 1), date(2026, 10, 31)))
+    assert days == [date(2026, 10, 5), date(2026, 10, 7), date(2026, 10, 19), date(2026, 10, 21)]
+
+
+def test_monthly_skips_months_without_the_day_and_counts_from_the_end():
+    rule = parse_rrule("FREQ=MONTHLY;BYMONTHDAY=31,-1")
+    days = list(occurrences(rule, date(2026, 1, 1), date(2026, 1, 1), date(2026, 4, 30)))
+    assert days == [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)]
+
+
+def test_occurrences_jump_straight_to_a_late_window():
+    rule = parse_rrule("FREQ=DAILY;INTERVAL=3")
+    days = list(occurrences(rule, date(2020, 1, 1), date(2026, 10, 1), date(2026, 10, 7)))
+    assert days == [date(2026, 10, 2), date(2026, 10, 5)]
+
+
+def test_last_occurrence_from_count():
+    assert last_occurrence(parse_rrule("FREQ=WEEKLY;COUNT=3"), date(2026, 10, 1)) == date(2026, 10, 15)
+    assert last_occurrence(parse_rrule("FREQ=DAILY"), date(2026, 10, 1)) is None
+
+
+@pytest.mark.parametrize("setting, expected", [
+    ("15 minutes", timedelta(minutes=15)), ("1 hour", timedelta(hours=1)),
+    ("2 days", timedelta(days=2)), ("1 week", timedelta(weeks=1)),
+    ("No Reminder", None), ("soon", None), ("", None),
+])
+def test_reminder_offset(setting, expected):
+    assert reminder_offset(setting) == expected
+
+
+def test_expand_applies_overrides():
+    row = series()
+    overrides = {
+        (1, '2026-10-02'): {'done': True, 'cancelled': False},
+        (1, '2026-10-03'): {'done': False, 'cancelled': True},
+    }
+
+    result = expand([row], overrides, date(2026, 10, 1), date(2026, 10, 4))
+
+    assert [(occ['date'], occ['done']) for occ in result] == [
+        ('2026-10-01', False), ('2026-10-02', True), ('2026-10-04', False)]
+    assert result[0]['series_id'] == 1 and result[0]['start_minute'] == 9 * 60
+
+
+def test_expand_orders_occurrences_by_date_then_time():
+    early = series(time='08:00', id=2)
+    untimed = series(time=None, id=3)
+    late = series(time='18:30', id=4)
+
+    result = expand([late, untimed, early], {}, date(2026, 10, 1), date(2026, 10, 1))
+
+    assert [occ['series_id'] for occ in result] == [3, 2, 4]
+
+
+def test_expand_stops_at_until_date():
+    result = expand([series(until=date(2026, 10, 2))], {}, date(2026, 10, 1), date(2026, 10, 10))
+    assert [occ['date'] for occ in result] == ['2026-10-01', '2026-10-02']
+
+
+def test_next_reminder_at_first_and_following():
+    row = series(rrule='FREQ=WEEKLY;BYDAY=TU,TH', start=date(2026, 10, 1))   # a Thursday
+
+    first = next_reminder_at(row)
+    assert first == datetime(2026, 10, 1, 8, 45)
+    assert next_reminder_at(row, first) == datetime(2026, 10, 6, 8, 45)
+    # After a time between two reminders, the later one
+    assert next_reminder_at(row, datetime(2026, 10, 7, 12, 0)) == datetime(2026, 10, 8, 8, 45)
+
+
+def test_next_reminder_at_day_before_reminder_crosses_midnight():
+    row = series(reminder='1 day', time='07:00')
+    assert next_reminder_at(row, datetime(2026, 10, 10, 6, 59)) == datetime(2026, 10, 10, 7, 0)
+    assert next_reminder_at(row, datetime(2026, 10, 10, 7, 0)) == datetime(2026, 10, 11, 7, 0)
+
+
+def test_next_reminder_at_none_without_reminder_time_or_later_occurrence():
+    assert next_reminder_at(series(reminder='No Reminder')) is None
+    assert next_reminder_at(series(time=None)) is None
+    ended = series(until=date(2026, 10, 3))
+    assert next_reminder_at(ended, datetime(2026, 10, 3, 9, 0)) is None
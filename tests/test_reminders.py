@@ -0,0 +1,260 @@
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import reminders
+from reminders import ReminderScheduler, MemorySink
+
+NOW = datetime(2026, 10, 17, 10, 0)
+
+
+class FakeDB:
+    """
+    In-memory events / event_series / event_series_overrides answering the
+    statements reminders.py and recurrence.py issue. Writes apply at once.
+    """
+
+    def __init__(self):
+        self.events = {}
+        self.series = {}
+        self.overrides = {}
+        self.commits = 0
+
+    def add_event(self, event_id, reminder_datetime, done=False, reminde1=False):
+        self.events[event_id] = {
+            'id': event_id, 'user_id': 'u1', 'title': f"Event {event_id}", 'category': 'work',
+            'date': reminder_datetime.date().isoformat(), 'time': '12:00', 'reminder_setting': '15 minutes',
+            'reminder_datetime': reminder_datetime, 'done': done, 'reminde1': reminde1,
+        }
+
+    def add_series(self, series_id, start_date, next_reminder_at, rrule='FREQ=DAILY', time='09:00'):
+        hour, minute = map(int, time.split(':'))
+        self.series[series_id] = {
+            'id': series_id, 'user_id': 'u1', 'title': f"Series {series_id}", 'description': '',
+            'category': 'work', 'start_date': start_date, 'rrule': rrule, 'until_date': None,
+            'time': time, 'start_minute': hour * 60 + minute, 'duration_minutes': None,
+            'reminder_setting': '15 minutes', 'next_reminder_at': next_reminder_at,
+        }
+
+    def add_override(self, series_id, day, done=False, cancelled=False):
+        self.overrides[(series_id, day)] = {'series_id': series_id, 'date': day.isoformat(),
+                                            'done': done, 'cancelled': cancelled}
+
+    @contextmanager
+    def cursor(self, dictionary=False):
+        yield self, FakeCursor(self, dictionary)
+
+    def commit(self):
+        self.commits += 1
+
+
+class FakeCursor:
+    def __init__(self, db, dictionary):
+        self.db = db
+        self.dictionary = dictionary
+        self.rows = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        db, params = self.db, list(params)
+        self.rows, self.rowcount = [], 0
+
+        if sql.startswith("UPDATE events SET reminde1 = TRUE WHERE reminde1 = FALSE AND reminder_datetime <"):
+            hits = [e for e in db.events.values() if not e['reminde1'] and e['reminder_datetime'] < params[0]]
+        elif sql.startswith("UPDATE events SET reminde1 = TRUE WHERE id IN"):
+            hits = [db.events[i] for i in params if i in db.events and not db.events[i]['reminde1']]
+            if "AND done = TRUE" in sql:
+                hits = [e for e in hits if e['done']]
+        elif sql.startswith("SELECT id, reminder_datetime FROM events"):
+            low, high, limit = params
+            rows = sorted((e for e in db.events.values()
+                           if not e['reminde1'] and low <= e['reminder_datetime'] < high),
+                          key=lambda e: e['reminder_datetime'])[:limit]
+            self.rows = [(e['id'], e['reminder_datetime']) for e in rows]
+            return
+        elif "FROM events WHERE id IN" in sql:
+            *ids, now = params
+            self.rows = [dict(db.events[i]) for i in ids if i in db.events and not db.events[i]['reminde1']
+                         and not db.events[i]['done'] and db.events[i]['reminder_datetime'] <= now]
+            return
+        elif sql.startswith("SELECT id, next_reminder_at FROM event_series"):
+            low, high, limit = params
+            rows = sorted((s for s in db.series.values()
+                           if s['next_reminder_at'] is not None and low <= s['next_reminder_at'] < high),
+                          key=lambda s: s['next_reminder_at'])[:limit]
+            self.rows = [{'id': s['id'], 'next_reminder_at': s['next_reminder_at']} for s in rows]
+            return
+        elif "FROM event_series_overrides" in sql:
+            *ids, first_day, last_day = params
+            self.rows = [dict(o) for (series_id, day), o in db.overrides.items()
+                         if series_id in ids and first_day <= day <= last_day]
+            return
+        elif "FROM event_series WHERE" in sql:
+            where = sql.split("FROM event_series WHERE", 1)[1].strip()
+            if where == "next_reminder_at < %s":
+                match = lambda s: s['next_reminder_at'] is not None and s['next_reminder_at'] < params[0]
+            else:
+                assert where.startswith("id IN") and where.endswith("AND next_reminder_at <= %s"), where
+                *ids, now = params
+                match = lambda s: s['id'] in ids and s['next_reminder_at'] is not None and s['next_reminder_at'] <= now
+            self.rows = [dict(s) for s in db.series.values() if match(s)]
+            return
+        else:
+            raise AssertionError(f"Unexpected SQL: {sql}")
+
+        for event in hits:
+            event['reminde1'] = True
+        self.rowcount = len(hits)
+
+    def executemany(self, sql, seq_params):
+        sql = " ".join(sql.split())
+        assert sql.startswith("UPDATE event_series SET next_reminder_at = %s WHERE id = %s AND next_reminder_at = %s"), sql
+        self.rowcount = 0
+        for fire_at, series_id, old in seq_params:
+            series = self.db.series.get(series_id)
+            if series and series['next_reminder_at'] == old:
+                series['next_reminder_at'] = fire_at
+                self.rowcount += 1
+
+    def fetchall(self):
+        return self.rows
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDB()
+    monkeypatch.setattr(reminders, "db_cursor", fake.cursor)
+    monkeypatch.setattr("recurrence.db_cursor", fake.cursor)
+    monkeypatch.setattr(reminders, "REMINDER_LOOKAHEAD", 300)
+    monkeypatch.setattr(reminders, "REMINDER_GRACE", 3600)
+    monkeypatch.setattr(reminders, "REMINDER_BATCH_SIZE", 200)
+    return fake
+
+
+@pytest.fixture
+def scheduler():
+    return ReminderScheduler(sink=MemorySink())
+
+
+def test_refill_queues_only_the_lookahead_window(db, scheduler):
+    db.add_event(1, NOW + timedelta(minutes=2))
+    db.add_event(2, NOW + timedelta(hours=1))           # beyond the lookahead
+    db.add_event(3, NOW + timedelta(minutes=3), reminde1=True)
+
+    scheduler.refill(NOW)
+
+    assert [(kind, key) for _, kind, key in scheduler._heap] == [(reminders.EVENT, 1)]
+    assert scheduler.dispatch_due(NOW) == 0             # not due yet
+    assert scheduler.dispatch_due(NOW + timedelta(minutes=5)) == 1
+    assert [r['id'] for r in scheduler.sink.delivered] == [1]
+    assert db.events[1]['reminde1'] and not db.events[2]['reminde1']
+
+
+def test_refill_does_not_queue_an_event_twice(db, scheduler):
+    db.add_event(1, NOW + timedelta(minutes=2))
+    scheduler.refill(NOW)
+    scheduler.refill(NOW + timedelta(seconds=30))
+    assert len(scheduler._heap) == 1
+
+
+def test_refill_retires_reminders_past_the_grace_period(db, scheduler):
+    db.add_event(1, NOW - timedelta(hours=2))           # missed by more than REMINDER_GRACE
+    db.add_event(2, NOW - timedelta(minutes=10))        # late, but within it
+
+    scheduler.refill(NOW)
+    sent = scheduler.dispatch_due(NOW)
+
+    assert db.events[1]['reminde1']
+    assert sent == 1 and [r['id'] for r in scheduler.sink.delivered] == [2]
+
+
+def test_refill_moves_an_overdue_series_past_the_grace_period(db, scheduler):
+    db.add_series(7, date(2026, 10, 1), datetime(2026, 10, 17, 6, 45))
+
+    scheduler.refill(NOW)
+
+    assert db.series[7]['next_reminder_at'] == datetime(2026, 10, 18, 8, 45)
+    assert scheduler._heap == []
+    assert scheduler.sink.delivered == []
+
+
+def test_dispatch_skips_and_marks_events_completed_since_queued(db, scheduler):
+    db.add_event(1, NOW + timedelta(minutes=1))
+    db.add_event(2, NOW + timedelta(minutes=1))
+    scheduler.refill(NOW)
+    db.events[1]['done'] = True
+
+    sent = scheduler.dispatch_due(NOW + timedelta(minutes=2))
+
+    assert sent == 1 and [r['id'] for r in scheduler.sink.delivered] == [2]
+    assert db.events[1]['reminde1']
+
+
+def test_dispatch_skips_events_whose_reminder_moved(db, scheduler):
+    db.add_event(1, NOW + timedelta(minutes=1))
+    scheduler.refill(NOW)
+    db.events[1]['reminder_datetime'] = NOW + timedelta(hours=3)
+
+    assert scheduler.dispatch_due(NOW + timedelta(minutes=2)) == 0
+    assert not db.events[1]['reminde1']
+
+
+def test_failed_delivery_is_left_unsent(db, scheduler):
+    class FailingSink:
+        def send(self, reminders):
+            raise RuntimeError("webhook down")
+
+    scheduler.sink = FailingSink()
+    db.add_event(1, NOW + timedelta(minutes=1))
+    scheduler.refill(NOW)
+
+    assert scheduler.dispatch_due(NOW + timedelta(minutes=2)) == 0
+    assert not db.events[1]['reminde1']
+
+
+def test_series_reminder_is_sent_and_advanced(db, scheduler):
+    db.add_series(7, date(2026, 10, 1), datetime(2026, 10, 17, 10, 0) + timedelta(minutes=2), time='10:17')
+    scheduler.refill(NOW)
+
+    sent = scheduler.dispatch_due(NOW + timedelta(minutes=3))
+
+    assert sent == 1
+    reminder = scheduler.sink.delivered[0]
+    assert reminder['series_id'] == 7 and reminder['id'] is None
+    assert reminder['date'] == '2026-10-17' and reminder['time'] == '10:17'
+    assert db.series[7]['next_reminder_at'] == datetime(2026, 10, 18, 10, 2)
+
+
+@pytest.mark.parametrize("override", [{'done': True}, {'cancelled': True}])
+def test_series_reminder_skipped_for_done_or_cancelled_occurrence(db, scheduler, override):
+    db.add_series(7, date(2026, 10, 1), datetime(2026, 10, 17, 10, 2), time='10:17')
+    db.add_override(7, date(2026, 10, 17), **override)
+    scheduler.refill(NOW)
+
+    sent = scheduler.dispatch_due(NOW + timedelta(minutes=3))
+
+    assert sent == 0 and scheduler.sink.delivered == []
+    assert db.series[7]['next_reminder_at'] == datetime(2026, 10, 18, 10, 2)
+
+
+def test_advance_leaves_a_series_moved_by_someone_else(db, scheduler):
+    db.add_series(7, date(2026, 10, 1), datetime(2026, 10, 17, 10, 2), time='10:17')
+    stale = dict(db.series[7])
+    db.series[7]['next_reminder_at'] = datetime(2026, 10, 17, 12, 0)   # edited meanwhile
+
+    with db.cursor() as (conn, cursor):
+        scheduler._advance(cursor, [(stale, datetime(2026, 10, 18, 10, 2))])
+        assert cursor.rowcount == 0
+
+    assert db.series[7]['next_reminder_at'] == datetime(2026, 10, 17, 12, 0)
+
+
+def test_dispatch_skips_a_series_advanced_since_queued(db, scheduler):
+    db.add_series(7, date(2026, 10, 1), datetime(2026, 10, 17, 10, 2), time='10:17')
+    scheduler.refill(NOW)
+    db.series[7]['next_reminder_at'] = datetime(2026, 10, 18, 10, 2)   # another dispatcher sent it
+
+    assert scheduler.dispatch_due(NOW + timedelta(minutes=3)) == 0
+    assert db.series[7]['next_reminder_at'] == datetime(2026, 10, 18, 10, 2)
@@ -0,0 +1,138 @@
+import time
+from collections import defaultdict
+
+import pytest
+
+import task_placer
+from day_intervals import DayIntervals, to_minutes, DEFAULT_DURATION_MINUTES
+from task_placer import plan, place_tasks, KEPT, MOVED, UNPLACED
+
+DAY = '2030-03-04'
+
+
+def busy_calendar(events):
+    """{date: DayIntervals} from (date, 'HH:MM', minutes) tuples."""
+    busy = defaultdict(DayIntervals)
+    for i, (day, start, minutes) in enumerate(events):
+        busy[day].add(to_minutes(start), to_minutes(start) + minutes, {'id': i})
+    return busy
+
+
+def assert_conflict_free(tasks, busy, placed):
+    taken = defaultdict(DayIntervals)
+    for i, (task, slot) in enumerate(zip(tasks, placed)):
+        if slot is None:
+            continue
+        day, start = slot
+        end = start + (task.get('duration_minutes') or DEFAULT_DURATION_MINUTES)
+        assert task_placer.DAY_START <= start and end <= task_placer.DAY_END
+        assert not (busy.get(day) and busy[day].overlapping(start, end)), f"task {i} hits an event"
+        assert not taken[day].overlapping(start, end), f"task {i} hits another task"
+        taken[day].add(start, end, i)
+
+
+@pytest.fixture(autouse=True)
+def placement_settings(monkeypatch):
+    monkeypatch.setattr(task_placer, "STEP_MINUTES", 15)
+    monkeypatch.setattr(task_placer, "DAY_START", to_minutes("07:00"))
+    monkeypatch.setattr(task_placer, "DAY_END", to_minutes("22:00"))
+    monkeypatch.setattr(task_placer, "SEARCH_DAYS", 3)
+    monkeypatch.setattr(task_placer, "MAX_STEPS", 20000)
+
+
+def test_free_requested_slot_is_kept():
+    tasks = [{'date': DAY, 'time': '10:00', 'category': 'work'}]
+    assert plan(tasks, busy_calendar([])) == [(DAY, to_minutes('10:00'))]
+
+
+def test_busy_requested_slot_moves_into_the_category_window():
+    busy = busy_calendar([(DAY, '18:00', 60)])
+    tasks = [{'date': DAY, 'time': '18:00', 'category': 'social', 'duration_minutes': 60}]
+
+    placed = plan(tasks, busy)
+
+    assert placed == [(DAY, to_minutes('19:00'))]     # nearest free start in 18:00-22:00
+
+
+def test_tasks_asking_for_the_same_slot_are_separated():
+    tasks = [{'date': DAY, 'time': '09:00', 'category': 'work'} for _ in range(3)]
+    busy = busy_calendar([(DAY, '10:00', 30)])
+
+    placed = plan(tasks, busy)
+
+    assert placed[0] == (DAY, to_minutes('09:00'))
+    assert all(slot is not None for slot in placed)
+    assert_conflict_free(tasks, busy, placed)
+
+
+def test_nothing_is_placed_before_not_before():
+    tasks = [{'date': DAY, 'time': '08:00', 'category': 'work'}]
+
+    placed = plan(tasks, busy_calendar([]), not_before=(DAY, to_minutes('12:10')))
+
+    assert placed == [(DAY, to_minutes('12:15'))]
+
+
+def test_task_with_no_room_in_the_search_days_is_unplaced():
+    days = ['2030-03-04', '2030-03-05', '2030-03-06']
+    busy = busy_calendar([(day, '07:00', 15 * 60) for day in days])
+    assert plan([{'date': days[0], 'time': '09:00'}], busy) == [None]
+
+
+def test_plan_is_deterministic():
+    busy_events = [(DAY, f"{hour:02d}:00", 45) for hour in range(8, 20, 3)]
+    tasks = [{'date': DAY, 'time': f"{9 + i % 4:02d}:30", 'category': ['work', 'fitness', 'social'][i % 3],
+              'duration_minutes': 30 + 15 * (i % 3)} for i in range(12)]
+
+    first = plan(tasks, busy_calendar(busy_events))
+    again = plan(tasks, busy_calendar(list(reversed(busy_events))))
+
+    assert first == again
+    assert_conflict_free(tasks, busy_calendar(busy_events), first)
+
+
+def test_first_fit_fallback_when_the_search_runs_out_of_steps(monkeypatch):
+    monkeypatch.setattr(task_placer, "MAX_STEPS", 1)
+    tasks = [{'date': DAY, 'time': '09:00'} for _ in range(4)]
+
+    placed = plan(tasks, busy_calendar([]))
+
+    assert all(slot is not None for slot in placed)
+    assert_conflict_free(tasks, busy_calendar([]), placed)
+
+
+def test_placement_benchmark_on_a_synthetic_calendar():
+    # Three busy weekdays (an hour-long event every 90 minutes from 07:30)
+    # and a generated day's worth of tasks, all asking for the same morning.
+    days = ['2030-03-04', '2030-03-05', '2030-03-06']
+    busy = busy_calendar([(day, f"{m // 60:02d}:{m % 60:02d}", 60)
+                          for day in days for m in range(7 * 60 + 30, 21 * 60, 90)])
+    categories = ['work', 'meeting', 'fitness', 'learning', 'errands', 'social']
+    tasks = [{'date': days[0], 'time': '09:00', 'category': categories[i % len(categories)],
+              'duration_minutes': 30} for i in range(25)]
+
+    started = time.perf_counter()
+    placed = plan(tasks, busy)
+    elapsed = time.perf_counter() - started
+
+    assert all(slot is not None for slot in placed)
+    assert_conflict_free(tasks, busy, placed)
+    assert elapsed < 2.0, f"placing {len(tasks)} tasks took {elapsed:.2f}s"
+
+
+def test_place_tasks_reports_kept_moved_and_unplaced(monkeypatch):
+    busy = busy_calendar([(DAY, '14:00', 60)])
+    monkeypatch.setattr(task_placer, "load_days", lambda user_id, dates: busy)
+    tasks = [
+        {'title': 'Report', 'date': DAY, 'time': '10:00', 'category': 'work'},
+        {'title': 'Call', 'date': DAY, 'time': '14:00', 'category': 'work'},
+        {'title': 'Someday', 'date': 'soon', 'time': '09:00'},
+    ]
+
+    placed, stats = place_tasks('u1', tasks)
+
+    assert [task['placement'] for task in placed] == [KEPT, MOVED, UNPLACED]
+    assert placed[1]['date'] == DAY and placed[1]['time'] != '14:00'
+    assert placed[2]['date'] == 'soon'
+    assert stats == {KEPT: 1, MOVED: 1, UNPLACED: 1}
+    assert tasks[1]['time'] == '14:00'      # the input tasks are left as they were
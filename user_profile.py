@@ -1,27 +1,15 @@
-from flask import Blueprint, request, jsonify
 import os
+from flask import Blueprint, request, jsonify
 import mysql.connector
-from mysql.connector import Error
 from bcrypt import hashpw, gensalt, checkpw
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from database import get_db_connection, DatabaseUnavailable
+from month_view import get_month_days
 
 profile_bp = Blueprint('profile', __name__)
 
-# --- Database Configuration ---
-DB_HOST = os.getenv("DB_HOST")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_DATABASE = os.getenv("DB_DATABASE")
-
-def get_db_connection():
-    try:
-        return mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_DATABASE)
-    except Error as e:
-        print(f"❌ DB Connection Error: {e}")
-        return None
+# Read profile stats from the users.tasks_total/tasks_done counters instead of
+# aggregating events per request. Set to "false" to fall back while repairing.
+USE_STATS_COUNTERS = os.getenv("PROFILE_STATS_FROM_COUNTERS", "true").lower() == "true"
 
 # --- API Endpoints for Profile Data ---
 @profile_bp.route('/api/<user_id>/profile', methods=['GET'])
@@ -32,20 +20,32 @@ def get_profile_data(user_id):
     
     cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT username, profile_bio, photo_url, email, phone FROM users WHERE user_id = %s", (user_id,))
+        # One round trip for profile + stats. By default the stats come from the
+        # counters kept on users by event_aggregates; otherwise they are
+        # aggregated from events in the same query.
+        if USE_STATS_COUNTERS:
+            cursor.execute("""
+                SELECT username, profile_bio, photo_url, email, phone,
+                       tasks_total AS total_tasks, tasks_done
+                FROM users WHERE user_id = %s
+            """, (user_id,))
+        else:
+            cursor.execute("""
+                SELECT u.username, u.profile_bio, u.photo_url, u.email, u.phone,
+                       COUNT(e.id) AS total_tasks,
+                       COALESCE(SUM(e.done = TRUE), 0) AS tasks_done
+                FROM users u
+                LEFT JOIN events e ON e.user_id = u.user_id
+                WHERE u.user_id = %s
+                GROUP BY u.id
+            """, (user_id,))
         user_data = cursor.fetchone()
 
         if not user_data: return jsonify({'message': 'User not found'}), 404
 
-        # Updated stat queries
-        cursor.execute("SELECT COUNT(*) as tasks_done FROM events WHERE user_id = %s AND done = TRUE", (user_id,))
-        tasks_done = cursor.fetchone()['tasks_done']
-        
-        cursor.execute("SELECT COUNT(*) as undone_tasks FROM events WHERE user_id = %s AND done = FALSE", (user_id,))
-        undone_tasks = cursor.fetchone()['undone_tasks']
-
-        cursor.execute("SELECT COUNT(*) as total_tasks FROM events WHERE user_id = %s", (user_id,))
-        total_tasks = cursor.fetchone()['total_tasks']
+        total_tasks = int(user_data['total_tasks'])
+        tasks_done = int(user_data['tasks_done'])
+        undone_tasks = total_tasks - tasks_done
 
         profile_data = {
             'username': user_data['username'],
@@ -179,33 +179,10 @@ def get_events_for_month(user_id):
     if not year or not month:
         return jsonify({'message': 'Year and month parameters are required'}), 400
 
-    conn = get_db_connection()
-    if conn is None: return jsonify({'message': 'Database connection error'}), 500
-
-    cursor = conn.cursor(dictionary=True)
     try:
-        # Query for events in the given month and year
-        date_pattern = f"{year}-{int(month):02d}-%"
-        cursor.execute("SELECT date, done FROM events WHERE user_id = %s AND date LIKE %s", (user_id, date_pattern))
-        events = cursor.fetchall()
-
-        events_by_day = {}
-        for event in events:
-            # Assumes date is in 'YYYY-MM-DD' format
-            day = int(event['date'].split('-')[2])
-            if day not in events_by_day:
-                events_by_day[day] = {'hasPending': False, 'hasCompleted': False}
-            
-            if event['done']:
-                events_by_day[day]['hasCompleted'] = True
-            else:
-                events_by_day[day]['hasPending'] = True
-
-        return jsonify(events_by_day)
-
+        return jsonify(get_month_days(user_id, year, month))
+    except DatabaseUnavailable:
+        return jsonify({'message': 'Database connection error'}), 500
     except mysql.connector.Error as err:
         return jsonify({'message': f'Server error: {err}'}), 500
-    finally:
-        cursor.close()
-        conn.close()
 